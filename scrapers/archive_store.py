@@ -0,0 +1,231 @@
+#!/usr/bin/env python3
+"""
+Content-addressed store for archived snapshots.
+
+Payloads are stored once under archives/store/blobs/<sha[:2]>/<sha256>.json,
+addressed by the same SHA-256 the season catalog already records. Named refs
+in archives/store/refs.json point at them:
+
+  seasons/<season>/matches      final match archive of a season
+  seasons/<season>/stats        final standings archive of a season
+  seasons/<season>/teams/<team> final per-team standings
+  latest/<season>/matches       the live season's latest match scrape
+  latest/<season>/stats         the live season's latest standings
+  snapshots/<kind>/<timestamp>  timestamped snapshots (e.g. team_stats)
+  files/<path>                  a data file that compaction replaced with a ref
+
+Identical snapshots share a blob, so keeping another copy of unchanged data
+costs one line in refs.json. `python scrapers/archive_store.py compact` folds
+the existing duplicate files in public/data into the store; the pipeline runs
+it (and gc) after every scrape.
+"""
+import os
+import re
+import glob
+import hashlib
+import argparse
+from datetime import datetime
+
+import json_backend
+from artifact_writer import write_bytes_atomic, write_json_atomic, file_sha256
+
+STORE_DIR = "store"
+REFS_FILE = "refs.json"
+REFS_VERSION = 1
+
+class ArchiveStore:
+    def __init__(self, archives_dir):
+        self.archives_dir = archives_dir
+        self.root = os.path.join(archives_dir, STORE_DIR)
+        self.refs_path = os.path.join(self.root, REFS_FILE)
+        self.refs = {}
+        self.dirty = False
+        # Payloads seen by an in-progress compact() (dry runs don't write blobs)
+        self.pending = set()
+
+        if os.path.exists(self.refs_path):
+            try:
+                data = json_backend.load_file(self.refs_path)
+                if data.get('version') == REFS_VERSION:
+                    self.refs = data.get('refs', {})
+            except Exception as e:
+                print(f"Error reading archive refs {self.refs_path}: {str(e)}")
+
+    def blob_path(self, sha256):
+        return os.path.join(self.root, "blobs", sha256[:2], f"{sha256}.json")
+
+    def has_blob(self, sha256):
+        return os.path.exists(self.blob_path(sha256))
+
+    def put_bytes(self, content):
+        """Store a payload (once) and return its SHA-256"""
+        sha256 = hashlib.sha256(content).hexdigest()
+        if not self.has_blob(sha256):
+            write_bytes_atomic(self.blob_path(sha256), content)
+        return sha256
+
+    def put_file(self, path):
+        """Store a file's contents (once) and return its SHA-256"""
+        sha256 = file_sha256(path)
+        if not self.has_blob(sha256):
+            with open(path, 'rb') as f:
+                write_bytes_atomic(self.blob_path(sha256), f.read())
+        return sha256
+
+    def set_ref(self, name, sha256):
+        entry = {'sha256': sha256, 'size': os.path.getsize(self.blob_path(sha256))}
+        if self.refs.get(name, {}).get('sha256') != sha256:
+            entry['updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            self.refs[name] = entry
+            self.dirty = True
+
+    def resolve(self, name):
+        """Blob path a ref points at, or None"""
+        entry = self.refs.get(name)
+        return self.blob_path(entry['sha256']) if entry else None
+
+    def load(self, name):
+        """Parsed JSON payload of a ref, or None"""
+        path = self.resolve(name)
+        return json_backend.load_file(path) if path else None
+
+    def export(self, name, path):
+        """Write a ref's payload back out as a plain file"""
+        with open(self.resolve(name), 'rb') as f:
+            write_bytes_atomic(path, f.read())
+
+    def list_refs(self, prefix=''):
+        return sorted(name for name in self.refs if name.startswith(prefix))
+
+    def save(self):
+        if not self.dirty:
+            return
+        write_json_atomic(self.refs_path, {'version': REFS_VERSION,
+                                           'refs': {name: self.refs[name] for name in sorted(self.refs)}})
+        self.dirty = False
+
+    def gc(self, dry_run=False):
+        """Delete blobs no ref points at; returns the bytes freed"""
+        live = {entry['sha256'] for entry in self.refs.values()}
+        freed = 0
+        for path in glob.glob(os.path.join(self.root, "blobs", "*", "*.json")):
+            if os.path.splitext(os.path.basename(path))[0] not in live:
+                freed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+        return freed
+
+def season_ref(season_dir_name, kind):
+    """Ref name of a season's final archive ('matches', 'stats' or 'teams/<team>')"""
+    return f"seasons/{season_dir_name}/{kind}"
+
+def archive_season_payload(archives_dir, season_dir_name, kind, content):
+    """Store a season's final archive payload and point its ref at it"""
+    store = ArchiveStore(archives_dir)
+    store.set_ref(season_ref(season_dir_name, kind), store.put_bytes(content))
+    store.save()
+
+def latest_ref(season_dir_name, kind):
+    """Ref name of the live season's latest payload ('matches' or 'stats')"""
+    return f"latest/{season_dir_name}/{kind}"
+
+def record_latest_payload(archives_dir, season_dir_name, kind, content):
+    """Store the live season's latest payload and point its latest ref at it"""
+    store = ArchiveStore(archives_dir)
+    store.set_ref(latest_ref(season_dir_name, kind), store.put_bytes(content))
+    store.save()
+
+def _ingest(store, path, ref, actions, dry_run):
+    sha256 = file_sha256(path)
+    size = os.path.getsize(path)
+    # Bytes freed: the whole file, unless this is the first copy of its payload
+    actions.append((path, ref, size if store.has_blob(sha256) or sha256 in store.pending else 0))
+    store.pending.add(sha256)
+    if dry_run:
+        return
+    store.put_file(path)
+    store.set_ref(ref, sha256)
+    os.remove(path)
+
+def compact(data_dir, archives_dir, dry_run=False):
+    """Move archived and superseded snapshot files into the store, leaving refs behind.
+
+    Covered: each season's FINAL files, timestamped archives/*_<timestamp>.json
+    snapshots, data-dir season copies (all_matches_<season>.json,
+    player_stats_<season>.json; the scrapers keep the live season's under
+    latest/ refs instead), plus the legacy all_matches.json and team_stats.json.
+    The live *_latest.json files and combined/ are left alone.
+    """
+    # season_catalog resolves files through this module, so import it late
+    import season_catalog
+
+    store = ArchiveStore(archives_dir)
+    actions = []
+
+    for season_dir in sorted(glob.glob(os.path.join(archives_dir, "*_*", ""))):
+        season_dir_name = os.path.basename(os.path.normpath(season_dir))
+        for kind, file_name in season_catalog.SEASON_FILES.items():
+            path = os.path.join(season_dir, file_name)
+            if os.path.exists(path):
+                _ingest(store, path, season_ref(season_dir_name, kind), actions, dry_run)
+        for path in sorted(glob.glob(os.path.join(season_dir, "team_*_stats_FINAL.json"))):
+            team = os.path.basename(path)[len("team_"):-len("_stats_FINAL.json")]
+            _ingest(store, path, season_ref(season_dir_name, f"teams/{team}"), actions, dry_run)
+
+    for path in sorted(glob.glob(os.path.join(archives_dir, "*.json"))):
+        match = re.match(r'(.+)_(\d{8}_\d{6})\.json$', os.path.basename(path))
+        if match:
+            _ingest(store, path, f"snapshots/{match.group(1)}/{match.group(2)}", actions, dry_run)
+
+    for path in sorted(glob.glob(os.path.join(data_dir, "*.json"))):
+        file_name = os.path.basename(path)
+        season_copy = re.match(r'(all_matches|player_stats)_(spring|summer|fall)_\d{4}\.json$', file_name)
+        if season_copy or file_name in ("all_matches.json", "team_stats.json"):
+            _ingest(store, path, f"files/{file_name}", actions, dry_run)
+
+    saved = sum(freed for _, _, freed in actions)
+    if actions and not dry_run:
+        store.save()
+        # Season entries now describe their payloads through the store
+        season_catalog.rebuild_catalog(archives_dir)
+
+    return actions, saved
+
+def main():
+    parser = argparse.ArgumentParser(description="Content-addressed archive store")
+    parser.add_argument('--data-dir', default="public/data")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    compact_parser = subparsers.add_parser('compact', help="Fold duplicate snapshot files into the store")
+    compact_parser.add_argument('--dry-run', action='store_true')
+    subparsers.add_parser('refs', help="List refs")
+    export_parser = subparsers.add_parser('export', help="Write a ref's payload to a file")
+    export_parser.add_argument('ref')
+    export_parser.add_argument('path')
+    gc_parser = subparsers.add_parser('gc', help="Delete unreferenced blobs")
+    gc_parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    archives_dir = os.path.join(args.data_dir, "archives")
+    store = ArchiveStore(archives_dir)
+
+    if args.command == 'compact':
+        actions, saved = compact(args.data_dir, archives_dir, args.dry_run)
+        for path, ref, freed in actions:
+            print(f"  {path} -> {ref}" + (f" (duplicate, {freed} bytes)" if freed else ""))
+        if args.dry_run:
+            print(f"Would move {len(actions)} file(s) into the store, saving {saved} bytes")
+        else:
+            print(f"Moved {len(actions)} file(s) into the store, {saved} bytes saved")
+    elif args.command == 'refs':
+        for name in store.list_refs():
+            entry = store.refs[name]
+            print(f"{name}  {entry['sha256'][:12]}  {entry['size']}")
+    elif args.command == 'export':
+        store.export(args.ref, args.path)
+        print(f"Wrote {args.ref} to {args.path}")
+    elif args.command == 'gc':
+        freed = store.gc(args.dry_run)
+        print(f"{'Would free' if args.dry_run else 'Freed'} {freed} bytes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Shared writer for the pipeline's output files.
+
+Every file is written to a temp file in the same directory and renamed into
+place, so readers never see a half-written file. Before writing, the new
+content is compared with what's on disk (size first, then SHA-256) and
+identical files are left alone, keeping their mtime so static hosts and CDNs
+don't see a change. ArtifactBatch collects many small files (e.g. the per-team
+stats) and writes them in one pass with a single directory listing per folder.
+"""
+import os
+import json
+import hashlib
+import tempfile
+
+# mkstemp creates 0600 files; published files should get the usual umask'd mode
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+def encode_json(data, default=None):
+    """Serialize data exactly as json.dump(data, f, indent=2) would"""
+    return json.dumps(data, indent=2, default=default).encode('utf-8')
+
+def file_sha256(path):
+    """Hash a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def is_unchanged(path, content, size=None):
+    """Whether the file at path already holds exactly this content"""
+    if size is None:
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return False
+    if size != len(content):
+        return False
+    return file_sha256(path) == hashlib.sha256(content).hexdigest()
+
+def write_bytes_atomic(path, content):
+    """Write bytes to a temp file next to path and rename it into place"""
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp_', suffix=os.path.splitext(path)[1])
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(content)
+        os.chmod(tmp_path, FILE_MODE)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def write_if_changed(path, content):
+    """Atomically write content unless the file already matches; returns True if written"""
+    if is_unchanged(path, content):
+        return False
+    write_bytes_atomic(path, content)
+    return True
+
+def write_json_atomic(path, data, default=None):
+    """Atomically write data as indented JSON unless unchanged; returns True if written"""
+    return write_if_changed(path, encode_json(data, default))
+
+class ArtifactBatch:
+    """A set of output files staged together and written in one pass"""
+
+    def __init__(self):
+        self.staged = {}
+        self.written = []
+        self.unchanged = []
+
+    def stage_bytes(self, path, content):
+        self.staged[path] = content
+
+    def stage_json(self, path, data, default=None):
+        self.staged[path] = encode_json(data, default)
+
+    def commit(self):
+        """Write every staged file that changed; returns (written, unchanged) path lists"""
+        # One listing per directory gives the sizes needed to rule out most changes
+        sizes = {}
+        for directory in {os.path.dirname(path) or '.' for path in self.staged}:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_file():
+                            sizes[os.path.join(directory, entry.name)] = entry.stat().st_size
+            except FileNotFoundError:
+                pass
+
+        for path, content in self.staged.items():
+            size = sizes.get(os.path.join(os.path.dirname(path) or '.', os.path.basename(path)))
+            if size is not None and is_unchanged(path, content, size):
+                self.unchanged.append(path)
+            else:
+                write_bytes_atomic(path, content)
+                self.written.append(path)
+
+        self.staged = {}
+        return self.written, self.unchanged
+
+    def report(self):
+        print(f"Wrote {len(self.written)} file(s), {len(self.unchanged)} unchanged")
@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Backfill past seasons by season_nameid.
+
+Seasons used to be archived only while they were ending, so older seasons
+never made it into archives/. This crawls a range of season ids: for each id
+it discovers the season's teams from team_standings.php?season_id=<id>,
+scrapes every team page, and fetches that season's individual standings.
+Seasons are crawled concurrently, and every page fetch goes through the
+shared CrawlScheduler, so the host's request budget still holds.
+
+Each complete season is written like a season-end archive: payloads in the
+content-addressed store, archives/<season>/metadata.json (with the
+season_nameid it came from) and a catalog entry, so SeasonDataCombiner
+picks it up on its next run. Seasons already backfilled
+and the live season are skipped.
+
+--time-limit bounds the job: pages not fetched before the deadline are
+journaled as failures, their season is left unarchived, and a --resume run
+continues from the journal.
+"""
+import re
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import season_catalog
+import scraper
+import player_stats_scraper
+from league_store import LeagueStore
+from identity_registry import IdentityRegistry
+from records import PlayerSeasonStat, to_json
+from artifact_writer import write_json_atomic, encode_json
+from archive_store import archive_season_payload
+from crawl_scheduler import CrawlScheduler
+from crawl_journal import CrawlJournal
+from league_config import load_config, select_leagues, league_url, archives_dir as league_archives_dir, build_headers
+
+SEASON_LABEL = re.compile(r'\b(spring|summer|fall)\b\D*?(\d{4})|(\d{4})\D*?\b(spring|summer|fall)\b', re.IGNORECASE)
+
+def parse_season_label(text):
+    """{'name', 'year'} from a title like 'Spring 2025 Season', or None"""
+    match = SEASON_LABEL.search(text or '')
+    if not match:
+        return None
+    name = match.group(1) or match.group(4)
+    year = match.group(2) or match.group(3)
+    return {'name': name.capitalize(), 'year': int(year)}
+
+def season_of_dates(matches):
+    """Season name ('Spring', 'Summer', 'Fall') most of the match dates fall in, or None"""
+    counts = {}
+    for match in matches:
+        key = season_catalog.date_sort_key(match.date)
+        if key is None:
+            continue
+        month_day = f"{key[0]:02d}-{key[1]:02d}"
+        for name, window in scraper.SEASONS.items():
+            if window['start'] <= window['end']:
+                inside = window['start'] <= month_day <= window['end']
+            else:
+                inside = month_day >= window['start'] or month_day <= window['end']
+            if inside:
+                counts[name] = counts.get(name, 0) + 1
+    return max(sorted(counts), key=counts.get) if counts else None
+
+def backfilled_season_ids(archives_dir):
+    """season_nameids of seasons already in the catalog"""
+    catalog = season_catalog.load_catalog(archives_dir) or season_catalog.rebuild_catalog(archives_dir)
+    return {str(entry['metadata'].get('season_nameid')) for entry in catalog['seasons'].values()
+            if entry.get('metadata', {}).get('season_nameid') is not None}
+
+class Deadline:
+    """Wall-clock budget for a backfill run (None: unbounded)"""
+
+    def __init__(self, seconds=None):
+        self.ends = time.monotonic() + seconds if seconds else None
+
+    def passed(self):
+        return self.ends is not None and time.monotonic() >= self.ends
+
+def _scrape_team_before_deadline(team_info, scheduler, headers, journal, deadline):
+    if journal.completed(team_info["url"]) is None and deadline.passed():
+        journal.record_failure(team_info["url"], "time limit reached")
+        return None
+    return scraper.scrape_team_checkpointed(team_info, scheduler, headers, journal)
+
+def _fetch_standings(league, scheduler, season_id, journal, deadline):
+    """A past season's standings rows and session title, or ([], None)"""
+    url = league_url(league, f"individual_standings.php?season_id={season_id}")
+    page = journal.completed(url)
+    if page is not None:
+        return [PlayerSeasonStat.from_dict(row) for row in page['players']], page['session']
+    if deadline.passed():
+        journal.record_failure(url, "time limit reached")
+        return [], None
+
+    try:
+        html = player_stats_scraper.fetch_individual_standings(
+            league, scheduler, f"individual_standings.php?season_id={season_id}")
+    except Exception as e:
+        print(f"[{league['id']}] Failed to fetch standings for season {season_id}: {str(e)}")
+        journal.record_failure(url, str(e))
+        return [], None
+
+    season_info, players = player_stats_scraper.parse_standings(html)
+    journal.record_page(url, {'players': [player.to_dict() for player in players],
+                              'session': season_info.get('session')})
+    return players, season_info.get('session')
+
+def crawl_season(league, scheduler, headers, season_id, journal, deadline):
+    """Crawl one past season; returns (season, teams, matches, players), or None if incomplete or unknown"""
+    teams_url = league_url(league, f"team_standings.php?season_id={season_id}")
+    teams = journal.completed(teams_url)
+    if teams is None:
+        if deadline.passed():
+            journal.record_failure(teams_url, "time limit reached")
+            return None
+        teams = scraper.fetch_teams_directly(league, scheduler, headers, f"team_standings.php?season_id={season_id}")
+        if teams:
+            journal.record_page(teams_url, teams)
+
+    # A missing season can come back as the live standings; keep only its own teams
+    teams = [team for team in teams if scraper.extract_season_id(team['url']) == str(season_id)]
+    if not teams:
+        print(f"[{league['id']}] Season {season_id}: no teams found")
+        return None
+
+    futures = [scheduler.submit(_scrape_team_before_deadline, team_info, scheduler, headers, journal, deadline)
+               for team_info in teams]
+    players, session = _fetch_standings(league, scheduler, season_id, journal, deadline)
+
+    matches = []
+    for future in futures:
+        matches.extend(future.result()[0] if future.result() else [])
+    # Failed pages (or ones cut off by the time limit) are journaled for --resume
+    if any(journal.completed(team_info["url"]) is None for team_info in teams):
+        print(f"[{league['id']}] Season {season_id}: some team pages are missing; left for --resume")
+        return None
+
+    # Team page titles rarely name the season; the standings session usually does
+    titles = [match.season_title for match in matches if parse_season_label(match.season_title)]
+    season = parse_season_label(titles[0] if titles else session)
+    played_in = season_of_dates(matches)
+    if season is None or (played_in and played_in != season['name']):
+        print(f"[{league['id']}] Season {season_id}: could not tell which season it is "
+              f"(standings: {session}, match dates: {played_in}); skipped")
+        return None
+
+    # The standings page may ignore season_id and show the live season instead
+    if players and parse_season_label(session) != season:
+        print(f"[{league['id']}] Season {season_id}: standings are for {session}, not "
+              f"{season['name']} {season['year']}; archiving matches only")
+        players = []
+
+    print(f"[{league['id']}] Season {season_id} is {season['name']} {season['year']}: "
+          f"{len(teams)} teams, {len(matches)} matches, {len(players)} player stats")
+    return season, teams, matches, players
+
+def archive_season(league, season, season_id, teams, matches, players):
+    """Write a backfilled season as a final archive, catalogued and frozen"""
+    output_dir = league['output_dir']
+    archives_dir = league_archives_dir(league)
+    season_str = f"{season['name'].lower()}_{season['year']}"
+
+    identities = IdentityRegistry.for_data_dir(output_dir)
+    for match in matches:
+        identities.annotate_match(match)
+    for player in players:
+        identities.annotate_player_stat(player)
+    identities.save()
+
+    archive_season_payload(archives_dir, season_str, 'matches', encode_json(matches, to_json))
+    if players:
+        archive_season_payload(archives_dir, season_str, 'stats', encode_json(players, to_json))
+
+    metadata = scraper.create_season_archive_info(season)
+    metadata['description'] = f"Backfilled archive of {season['name']} {season['year']} season"
+    metadata['season_nameid'] = str(season_id)
+    write_json_atomic(f"{archives_dir}/{season_str}/metadata.json", metadata)
+
+    season_catalog.update_season(archives_dir, season_str)
+
+    store = LeagueStore.for_league(league)
+    if store:
+        store.upsert_season(season_str, season['name'], season['year'], status='final')
+        store.replace_season_teams(season_str, teams)
+        store.replace_season_matches(season_str, season['name'], [match.to_dict() for match in matches])
+        if players:
+            store.replace_season_player_stats(season_str, [player.to_dict() for player in players])
+
+    print(f"[{league['id']}] Archived {season['name']} {season['year']} to {archives_dir}/{season_str}")
+
+def backfill_league(league, scheduler, season_ids, season_workers=2, resume=False, force=False, deadline=None):
+    """Crawl and archive a league's past seasons; returns the archived season directory names"""
+    deadline = deadline or Deadline()
+    archives_dir = league_archives_dir(league)
+    headers = build_headers(league, scraper.AUTH_COOKIE)
+    # Keyed on the requested range, so --resume finds the journal after some seasons are done
+    run_key = f"{season_ids[0]}-{season_ids[-1]}"
+
+    if not force:
+        done = backfilled_season_ids(archives_dir)
+        skipped = [season_id for season_id in season_ids if str(season_id) in done]
+        if skipped:
+            print(f"[{league['id']}] Already backfilled: {', '.join(map(str, skipped))}")
+        season_ids = [season_id for season_id in season_ids if str(season_id) not in done]
+    if not season_ids:
+        return []
+
+    catalog = season_catalog.load_catalog(archives_dir) or {}
+    journal = CrawlJournal.open(league['id'], 'backfill', run_key, resume)
+    archived = []
+    failed = []
+    saved = False
+    try:
+        # Several seasons in flight at once; their page fetches share the scheduler's budget
+        with ThreadPoolExecutor(max_workers=season_workers) as pool:
+            futures = [(season_id, pool.submit(crawl_season, league, scheduler, headers, season_id, journal, deadline))
+                       for season_id in season_ids]
+
+            # Archive in season id order so new ids are assigned deterministically
+            for season_id, future in futures:
+                try:
+                    result = future.result()
+                    if result is None:
+                        continue
+                    season, teams, matches, players = result
+                    season_str = f"{season['name'].lower()}_{season['year']}"
+                    if catalog.get('current') == season:
+                        print(f"[{league['id']}] Season {season_id} is the live season; not archived")
+                        continue
+                    if season_str in catalog.get('seasons', {}) and not force:
+                        print(f"[{league['id']}] Season {season_id}: {season_str} is already archived; "
+                              f"use --force to replace it")
+                        continue
+                    archive_season(league, season, season_id, teams, matches, players)
+                    archived.append(season_str)
+                except Exception as e:
+                    print(f"[{league['id']}] Error backfilling season {season_id}: {str(e)}")
+                    failed.append(season_id)
+        saved = not failed
+    finally:
+        # The checkpoint is only dropped once every crawled season was written
+        journal.close(keep=not saved)
+
+    return archived
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl and archive past seasons by season_nameid")
+    parser.add_argument('first', type=int, help="First season_nameid to backfill")
+    parser.add_argument('last', type=int, help="Last season_nameid to backfill (inclusive)")
+    parser.add_argument('--leagues', help="Path to the league config (default: scrapers/leagues.json)")
+    parser.add_argument('--league', action='append', help="Only backfill this league id (repeatable)")
+    parser.add_argument('--season-workers', type=int, default=2, help="Seasons crawled at once (default: 2)")
+    parser.add_argument('--time-limit', type=float, help="Stop fetching new pages after this many seconds")
+    parser.add_argument('--resume', action='store_true', help="Reuse pages journaled by an interrupted backfill")
+    parser.add_argument('--force', action='store_true', help="Re-crawl seasons that were already backfilled")
+    args = parser.parse_args()
+
+    if not scraper.AUTH_COOKIE:
+        print("ERROR: Authentication cookie is missing. Please set the AUTH_COOKIE environment variable.")
+        return
+
+    config = load_config(args.leagues)
+    leagues = select_leagues(config, args.league)
+    season_ids = list(range(args.first, args.last + 1))
+    deadline = Deadline(args.time_limit)
+
+    with CrawlScheduler.from_config(config) as scheduler:
+        for league in leagues:
+            archived = backfill_league(league, scheduler, season_ids, args.season_workers,
+                                       args.resume, args.force, deadline)
+            print(f"[{league['id']}] Backfilled {len(archived)} season(s): {', '.join(archived) or 'none'}")
+
+if __name__ == "__main__":
+    main()
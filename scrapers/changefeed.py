@@ -0,0 +1,129 @@
+"""
+Per-run delta changefeed.
+
+Before a scraper replaces its *_latest.json snapshot, the new rows are diffed
+against the snapshot on disk and the differences go to a small numbered file
+in <output dir>/deltas/, listed in deltas/index.json. Matches are keyed by
+their canonical pairing (date plus both sides' team and player, one entry per
+game rather than per scraped copy), so a corrected score or handicap shows up
+as a change instead of a remove plus an add; standings rows are keyed by team
+and player name. Clients that hold seq N apply every later delta in order. A
+delta flagged "reset" starts a new season: drop local data and apply its adds.
+
+Deltas are only recorded for complete crawls. A snapshot missing a failed
+team's page would list that team's matches as removed, and the run that
+fetches the page would add them back.
+"""
+import os
+from datetime import datetime
+
+import json_backend
+from artifact_writer import write_json_atomic
+from match_keys import canonical_match_key, canonical_pairing_key, iter_keyed_matches
+
+DELTAS_DIR = "deltas"
+INDEX_FILE = "index.json"
+DELTA_VERSION = 1
+# Deltas older than this many runs are pruned; clients that far behind re-download the snapshot
+MAX_DELTAS = 200
+
+def _key_text(key):
+    return "|".join('' if part is None else str(part) for part in key)
+
+def _diff(previous, current):
+    """Added, changed and removed rows between two {key: (fingerprint, row)} maps"""
+    added, changed = [], []
+    for key, (fingerprint, row) in current.items():
+        if key not in previous:
+            added.append(dict(row, key=key))
+        elif previous[key][0] != fingerprint:
+            changed.append(dict(row, key=key))
+    removed = [key for key in previous if key not in current]
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+def _keyed_matches(matches):
+    # The orientation of the copy kept can flip between runs, so compare the
+    # orientation-independent full key rather than the raw dicts
+    return {_key_text(key): ((canonical_match_key(match), match.get('forfeit')), match)
+            for key, match in iter_keyed_matches(matches, canonical_pairing_key)}
+
+def _keyed_stats(stats):
+    return {_key_text((row.get('team'), row.get('name'))): (row, row) for row in stats}
+
+def diff_matches(previous, current):
+    """Delta between two lists of scraped match dicts, one entry per game"""
+    return _diff(_keyed_matches(previous), _keyed_matches(current))
+
+def diff_stats(previous, current):
+    """Delta between two lists of standings row dicts"""
+    return _diff(_keyed_stats(previous), _keyed_stats(current))
+
+def load_snapshot(path):
+    """Rows of the snapshot currently on disk (empty if there isn't one yet)"""
+    if not os.path.exists(path):
+        return []
+    try:
+        return json_backend.load_file(path)
+    except Exception as e:
+        print(f"Error reading previous snapshot {path}: {str(e)}")
+        return []
+
+def load_index(output_dir):
+    path = os.path.join(output_dir, DELTAS_DIR, INDEX_FILE)
+    if os.path.exists(path):
+        try:
+            index = json_backend.load_file(path)
+            if index.get('version') == DELTA_VERSION:
+                return index
+        except Exception as e:
+            print(f"Error reading delta index {path}: {str(e)}")
+    return {'version': DELTA_VERSION, 'latest_seq': 0, 'seasons': {}, 'deltas': []}
+
+def record_delta(output_dir, section, season_key, previous, current):
+    """Diff a snapshot against its replacement and append the delta to the changefeed.
+
+    section is 'matches' or 'stats'. Returns the delta's seq, or None when
+    nothing changed (no file is written then).
+    """
+    index = load_index(output_dir)
+    reset = index['seasons'].get(section) not in (None, season_key)
+
+    if reset:
+        previous = []
+    delta = (diff_matches if section == 'matches' else diff_stats)(previous, current)
+    counts = {kind: len(rows) for kind, rows in delta.items()}
+
+    if not any(counts.values()) and not reset:
+        return None
+
+    seq = index['latest_seq'] + 1
+    file_name = f"delta_{seq:06d}.json"
+    created = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    deltas_dir = os.path.join(output_dir, DELTAS_DIR)
+
+    write_json_atomic(os.path.join(deltas_dir, file_name), {
+        'version': DELTA_VERSION,
+        'seq': seq,
+        'created': created,
+        'season': season_key,
+        'reset': reset,
+        section: delta
+    })
+
+    index['latest_seq'] = seq
+    index['seasons'][section] = season_key
+    index['deltas'].append({'seq': seq, 'file': file_name, 'created': created, 'season': season_key,
+                            'section': section, 'reset': reset, 'counts': counts})
+
+    # Keep a rolling window of deltas
+    for entry in index['deltas'][:-MAX_DELTAS]:
+        try:
+            os.remove(os.path.join(deltas_dir, entry['file']))
+        except OSError:
+            pass
+    index['deltas'] = index['deltas'][-MAX_DELTAS:]
+    index['oldest_seq'] = index['deltas'][0]['seq']
+
+    write_json_atomic(os.path.join(deltas_dir, INDEX_FILE), index)
+    print(f"Delta {seq} ({section}): {counts['added']} added, {counts['changed']} changed, {counts['removed']} removed")
+    return seq
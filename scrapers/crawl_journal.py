@@ -0,0 +1,123 @@
+"""
+Crawl checkpoint journal.
+
+Each scraper appends one JSON line per finished page fetch (with the rows
+parsed from it) and one per failed fetch to
+.crawl_journal/<league id>/<scraper>.jsonl. A normal run starts a fresh
+journal; a --resume run replays it, reuses every page that already succeeded
+and only fetches the pages that are missing or failed. The journal is removed
+once a run finishes with no outstanding failures.
+"""
+import os
+import json
+import threading
+from datetime import datetime
+
+JOURNAL_DIR = ".crawl_journal"
+
+class CrawlJournal:
+    def __init__(self, path, run_key):
+        self.path = path
+        self.run_key = run_key
+        self.pages = {}
+        self.failures = {}
+        self.resumed = False
+        self.lock = threading.Lock()
+        self._file = None
+
+    @classmethod
+    def open(cls, league_id, scraper_name, run_key, resume=False, journal_dir=JOURNAL_DIR):
+        """Open a league's journal for one scraper, replaying it first when resuming"""
+        path = os.path.join(journal_dir, league_id, f"{scraper_name}.jsonl")
+        journal = cls(path, run_key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        if resume:
+            journal._replay()
+
+        journal._file = open(path, 'a' if journal.resumed else 'w')
+        if journal.resumed:
+            print(f"Resuming crawl from {path}: {len(journal.pages)} pages done, {len(journal.failures)} to retry")
+        else:
+            journal._append({'event': 'start', 'run_key': run_key,
+                             'started': datetime.now().strftime("%Y-%m-%d %H:%M:%S")})
+        return journal
+
+    def _replay(self):
+        if not os.path.exists(self.path):
+            return
+
+        good_offset = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    # A run killed mid-write leaves a partial last line
+                    break
+                if not line.endswith(b'\n'):
+                    break
+
+                event = entry.get('event')
+                if event == 'start':
+                    if entry.get('run_key') != self.run_key:
+                        print(f"Ignoring crawl journal {self.path} from another run ({entry.get('run_key')})")
+                        return
+                    self.resumed = True
+                elif event == 'page' and self.resumed:
+                    self.pages[entry['url']] = entry['rows']
+                    self.failures.pop(entry['url'], None)
+                elif event == 'failure' and self.resumed:
+                    self.failures[entry['url']] = entry['error']
+                good_offset += len(line)
+
+        if self.resumed:
+            # Drop any torn tail so new entries start on a clean line
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_offset)
+
+    def _append(self, entry):
+        with self.lock:
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+
+    def completed(self, url):
+        """Rows journaled for a page that already succeeded, or None"""
+        return self.pages.get(url)
+
+    def record_page(self, url, rows):
+        """Checkpoint a successfully fetched and parsed page"""
+        self._append({'event': 'page', 'url': url, 'rows': rows})
+        with self.lock:
+            self.pages[url] = rows
+            self.failures.pop(url, None)
+
+    def record_failure(self, url, error):
+        self._append({'event': 'failure', 'url': url, 'error': error})
+        with self.lock:
+            self.failures[url] = error
+
+    def close(self, keep=False):
+        """Close the journal, removing it if nothing is left to retry.
+
+        keep=True holds on to it regardless, e.g. when writing the outputs
+        failed and a --resume run should rebuild them from the journaled pages.
+        """
+        if self._file:
+            self._file.close()
+            self._file = None
+
+        if self.failures:
+            print(f"{len(self.failures)} page(s) failed; journal kept at {self.path}. Rerun with --resume to retry them.")
+            for url, error in self.failures.items():
+                print(f"  - {url}: {error}")
+            return
+        if keep:
+            print(f"Outputs were not saved; journal kept at {self.path}. Rerun with --resume to reuse its pages.")
+            return
+
+        os.remove(self.path)
+        try:
+            os.rmdir(os.path.dirname(self.path))
+        except OSError:
+            pass
@@ -0,0 +1,83 @@
+"""
+Shared crawl scheduler.
+
+All page fetches for every league in a run go through one scheduler: a single
+worker pool plus a per-host budget (minimum spacing between requests and a cap
+on in-flight requests), so leagues on different hosts crawl in parallel while
+each host still sees a polite request rate.
+"""
+import time
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+class PageFetchError(Exception):
+    """A page request that came back with a non-200 status"""
+
+class HostBudget:
+    """Request spacing and concurrency limit for one host"""
+
+    def __init__(self, requests_per_second, max_concurrent):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self.slots = threading.Semaphore(max_concurrent)
+        self.lock = threading.Lock()
+        self.next_allowed = 0.0
+
+    def wait_turn(self):
+        """Block until this host may receive another request"""
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_allowed)
+            self.next_allowed = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+class CrawlScheduler:
+    def __init__(self, requests_per_second=1.0, max_concurrent_per_host=2, max_workers=8, timeout=30):
+        self.requests_per_second = requests_per_second
+        self.max_concurrent_per_host = max_concurrent_per_host
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.session = requests.Session()
+        self.budgets = {}
+        self.budgets_lock = threading.Lock()
+        self.request_count = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a scheduler from the 'host_budget' section of the league config"""
+        budget = config.get('host_budget', {})
+        return cls(requests_per_second=budget.get('requests_per_second', 1.0),
+                   max_concurrent_per_host=budget.get('max_concurrent', 2),
+                   max_workers=budget.get('max_workers', 8),
+                   timeout=budget.get('timeout', 30))
+
+    def _budget(self, host):
+        with self.budgets_lock:
+            if host not in self.budgets:
+                self.budgets[host] = HostBudget(self.requests_per_second, self.max_concurrent_per_host)
+            return self.budgets[host]
+
+    def fetch(self, url, headers=None):
+        """GET a URL within its host's budget"""
+        budget = self._budget(urllib.parse.urlparse(url).netloc)
+        with budget.slots:
+            budget.wait_turn()
+            self.request_count += 1
+            return self.session.get(url, headers=headers, timeout=self.timeout)
+
+    def submit(self, fn, *args, **kwargs):
+        """Run a task on the shared worker pool"""
+        return self.executor.submit(fn, *args, **kwargs)
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,323 @@
+"""
+Persistent player and team identity registry.
+
+Every player and team gets a stable integer id keyed by its canonical name
+(quotes dropped, whitespace collapsed, case folded), and every raw spelling
+seen is kept as an alias of that id. The scrapers stamp the ids onto their
+records and the combiner groups by id, so spelling variants stop splitting a
+player's or team's stats and joins are on ints rather than long strings.
+
+Variants that canonicalizing can't fold (misspellings, renamed teams) are
+merged afterwards (see name_reconciliation): the merged entity keeps its id
+with a 'merged_into' pointer, so ids already stamped on old records still
+resolve to the surviving entity.
+
+Because stamped ids outrank names, the registry is never silently restarted
+from 1: an unreadable file is an error, and a missing one is rebuilt from the
+ids stamped on the league's records.
+
+    python scrapers/identity_registry.py --data-dir public/data --rebuild
+"""
+import os
+import re
+import argparse
+import unicodedata
+
+import json_backend
+from artifact_writer import write_json_atomic
+
+REGISTRY_FILE = "identity_registry.json"
+REGISTRY_VERSION = 1
+KINDS = ('players', 'teams')
+# Record fields holding stamped ids, by kind
+ID_FIELDS = {'players': ('homePlayerId', 'awayPlayerId', 'playerId'),
+             'teams': ('homeTeamId', 'awayTeamId', 'teamId')}
+
+QUOTE_CHARS = '"“”„″'
+# (name field, id field) pairs stamped on match and stat records, by kind
+STAMPED_FIELDS = {'players': (('homePlayer', 'homePlayerId'), ('awayPlayer', 'awayPlayerId'), ('name', 'playerId')),
+                  'teams': (('homeTeam', 'homeTeamId'), ('awayTeam', 'awayTeamId'), ('team', 'teamId'))}
+
+class RegistryError(Exception):
+    """The registry file exists but can't be used; ids stamped on records would be misread"""
+
+def canonicalize(name):
+    """Canonical form of a player or team name used for identity matching"""
+    text = unicodedata.normalize('NFKC', name or '')
+    text = ''.join(ch for ch in text if ch not in QUOTE_CHARS)
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.casefold()
+
+class IdentityRegistry:
+    def __init__(self, path=None):
+        self.path = path
+        self.dirty = False
+        self.entities = {kind: {} for kind in KINDS}
+        self.next_id = {kind: 1 for kind in KINDS}
+        # canonical name -> id, plus a raw spelling -> id cache so hot loops skip canonicalizing
+        self._by_canonical = {kind: {} for kind in KINDS}
+        self._by_raw = {kind: {} for kind in KINDS}
+        # merged id -> surviving id
+        self.redirects = {kind: {} for kind in KINDS}
+
+    @classmethod
+    def load(cls, path):
+        """Load the registry from disk, starting empty if it doesn't exist yet.
+
+        Raises RegistryError if the file can't be read or is another version:
+        starting over would hand its ids to other names.
+        """
+        registry = cls(path)
+        if not path or not os.path.exists(path):
+            return registry
+
+        try:
+            data = json_backend.load_file(path)
+        except Exception as e:
+            raise RegistryError(f"Error reading identity registry {path}: {str(e)}; "
+                                f"restore it, or move it aside and run identity_registry.py --rebuild") from e
+
+        if not isinstance(data, dict) or data.get('version') != REGISTRY_VERSION:
+            raise RegistryError(f"Identity registry {path} is not version {REGISTRY_VERSION}; "
+                                f"restore it, or move it aside and run identity_registry.py --rebuild")
+
+        for kind in KINDS:
+            section = data.get(kind, {})
+            registry.next_id[kind] = section.get('next_id', 1)
+            for entity_id, entity in section.get('entities', {}).items():
+                entity_id = int(entity_id)
+                registry.entities[kind][entity_id] = entity
+                if entity.get('merged_into'):
+                    registry.redirects[kind][entity_id] = entity['merged_into']
+                    continue
+                for alias in [entity['name']] + entity.get('aliases', []):
+                    registry._by_canonical[kind][canonicalize(alias)] = entity_id
+
+        return registry
+
+    @classmethod
+    def for_data_dir(cls, data_dir="public/data"):
+        """The data folder's registry, rebuilt from its stamped records if the file is missing"""
+        path = os.path.join(data_dir, REGISTRY_FILE)
+        if os.path.exists(path):
+            return cls.load(path)
+
+        registry = cls.rebuild(data_dir)
+        if registry.dirty:
+            print(f"Identity registry {path} was missing; rebuilt it from the ids stamped on the records")
+            registry.save()
+        return registry
+
+    @classmethod
+    def rebuild(cls, data_dir="public/data", archives_dir=None):
+        """Recreate the registry from the (name, id) pairs stamped on every season's records.
+
+        The latest spelling seen for an id becomes its display name. When one
+        canonical name was stamped with several ids (records from before a
+        merge), the older ids are merged into the latest one. Merges whose
+        spellings never overlap can't be recovered; reconciliation proposes
+        them again.
+        """
+        # Imported here: the combiner itself loads the registry
+        from season_combiner import SeasonDataCombiner
+        registry = cls(os.path.join(data_dir, REGISTRY_FILE))
+        combiner = SeasonDataCombiner(data_dir=data_dir, archives_dir=archives_dir or os.path.join(data_dir, "archives"),
+                                      identities=cls())
+
+        spellings = {kind: {} for kind in KINDS}
+        latest = {kind: {} for kind in KINDS}
+        merges = {kind: {} for kind in KINDS}
+        for _, _, record in combiner.iter_season_records():
+            for kind, fields in STAMPED_FIELDS.items():
+                for name_field, id_field in fields:
+                    name, entity_id = record.get(name_field), record.get(id_field)
+                    if not name or not entity_id:
+                        continue
+                    names = spellings[kind].setdefault(entity_id, [])
+                    if name in names:
+                        names.remove(name)
+                    names.append(name)
+                    canonical = canonicalize(name)
+                    previous = latest[kind].get(canonical)
+                    if previous is not None and previous != entity_id:
+                        merges[kind][previous] = entity_id
+                    latest[kind][canonical] = entity_id
+
+        for kind in KINDS:
+            for entity_id, names in spellings[kind].items():
+                registry.entities[kind][entity_id] = {'name': names[-1], 'aliases': names[:-1]}
+                for name in names:
+                    registry._by_canonical[kind][canonicalize(name)] = entity_id
+            registry.next_id[kind] = max(spellings[kind], default=0) + 1
+            for source_id, target_id in merges[kind].items():
+                registry.merge(kind, source_id, target_id)
+            # Later spellings win a canonical name that two ids shared
+            for canonical, entity_id in latest[kind].items():
+                registry._by_canonical[kind][canonical] = registry.resolve_id(kind, entity_id)
+            registry.dirty = registry.dirty or bool(spellings[kind])
+        return registry
+
+    def save(self):
+        """Persist the registry atomically if anything changed"""
+        if not self.dirty or not self.path:
+            return
+
+        data = {'version': REGISTRY_VERSION}
+        for kind in KINDS:
+            data[kind] = {
+                'next_id': self.next_id[kind],
+                'entities': {str(entity_id): entity
+                             for entity_id, entity in sorted(self.entities[kind].items())}
+            }
+
+        write_json_atomic(self.path, data)
+        self.dirty = False
+
+    def _resolve(self, kind, name, prefer=False):
+        if not name:
+            return None
+
+        entity_id = self._by_raw[kind].get(name)
+        if entity_id is not None and not prefer:
+            return entity_id
+
+        canonical = canonicalize(name)
+        if not canonical:
+            return None
+
+        entity_id = self._by_canonical[kind].get(canonical)
+        if entity_id is None:
+            entity_id = self.next_id[kind]
+            self.next_id[kind] += 1
+            self.entities[kind][entity_id] = {'name': name, 'aliases': []}
+            self._by_canonical[kind][canonical] = entity_id
+            self.dirty = True
+
+        entity = self.entities[kind][entity_id]
+        if name != entity['name'] and name not in entity['aliases']:
+            entity['aliases'].append(name)
+            self.dirty = True
+
+        # The latest scrape's spelling becomes the display name
+        if prefer and entity['name'] != name:
+            entity['aliases'].remove(name)
+            entity['aliases'].append(entity['name'])
+            entity['name'] = name
+            self.dirty = True
+
+        self._by_raw[kind][name] = entity_id
+        return entity_id
+
+    def player_id(self, name, prefer=False):
+        """Integer id for a player name, registering it if it's new"""
+        return self._resolve('players', name, prefer)
+
+    def team_id(self, name, prefer=False):
+        """Integer id for a team name, registering it if it's new"""
+        return self._resolve('teams', name, prefer)
+
+    def player_name(self, player_id):
+        return self.entities['players'][self.resolve_id('players', player_id)]['name']
+
+    def team_name(self, team_id):
+        return self.entities['teams'][self.resolve_id('teams', team_id)]['name']
+
+    def spellings(self, kind, entity_id):
+        """Display name plus every alias recorded for an id"""
+        entity = self.entities[kind][self.resolve_id(kind, entity_id)]
+        return [entity['name']] + entity['aliases']
+
+    def resolve_id(self, kind, entity_id):
+        """The surviving id for an id that may have been merged into another"""
+        return self.redirects[kind].get(entity_id, entity_id)
+
+    def has_merges(self):
+        return any(self.redirects.values())
+
+    def resolve_record_ids(self, record):
+        """Point the ids stamped on a raw match or stat dict at the surviving entities"""
+        for kind, fields in ID_FIELDS.items():
+            redirects = self.redirects[kind]
+            for field in fields:
+                entity_id = record.get(field)
+                if entity_id in redirects:
+                    record[field] = redirects[entity_id]
+        return record
+
+    def merge(self, kind, source_id, target_id):
+        """Fold one entity into another: its spellings become aliases of the target"""
+        source_id = self.resolve_id(kind, source_id)
+        target_id = self.resolve_id(kind, target_id)
+        if source_id == target_id:
+            return
+
+        source = self.entities[kind][source_id]
+        target = self.entities[kind][target_id]
+        for alias in [source['name']] + source['aliases']:
+            if alias != target['name'] and alias not in target['aliases']:
+                target['aliases'].append(alias)
+            self._by_canonical[kind][canonicalize(alias)] = target_id
+        source['aliases'] = []
+        source['merged_into'] = target_id
+
+        # Earlier merges into the source now point straight at the target
+        for merged_id, surviving_id in list(self.redirects[kind].items()):
+            if surviving_id == source_id:
+                self.redirects[kind][merged_id] = target_id
+                self.entities[kind][merged_id]['merged_into'] = target_id
+        self.redirects[kind][source_id] = target_id
+        self._by_raw[kind] = {raw: i for raw, i in self._by_raw[kind].items() if i != source_id}
+        self.dirty = True
+
+    def add_alias(self, kind, alias, entity_id):
+        """Point an extra spelling at an existing id (e.g. a manually reconciled variant)"""
+        canonical = canonicalize(alias)
+        previous = self._by_canonical[kind].get(canonical)
+        if previous == entity_id:
+            return
+
+        entity = self.entities[kind][entity_id]
+        if alias != entity['name'] and alias not in entity['aliases']:
+            entity['aliases'].append(alias)
+
+        self._by_canonical[kind][canonical] = entity_id
+        self._by_raw[kind] = {raw: i for raw, i in self._by_raw[kind].items() if canonicalize(raw) != canonical}
+        self.dirty = True
+
+    def annotate_match(self, match, prefer=False):
+        """Stamp a MatchRecord with player and team ids"""
+        match.home_team_id = self.team_id(match.home_team, prefer)
+        match.away_team_id = self.team_id(match.away_team, prefer)
+        match.home_player_id = self.player_id(match.home_player, prefer)
+        match.away_player_id = self.player_id(match.away_player, prefer)
+        return match
+
+    def annotate_player_stat(self, stat, prefer=False):
+        """Stamp a PlayerSeasonStat with player and team ids"""
+        stat.team_id = self.team_id(stat.team, prefer)
+        stat.player_id = self.player_id(stat.name, prefer)
+        return stat
+
+def main():
+    parser = argparse.ArgumentParser(description="Player and team identity registry")
+    parser.add_argument('--data-dir', default="public/data")
+    parser.add_argument('--archives-dir', help="Default: <data-dir>/archives")
+    parser.add_argument('--rebuild', action='store_true',
+                        help="Recreate a missing registry from the ids stamped on the records")
+    args = parser.parse_args()
+
+    path = os.path.join(args.data_dir, REGISTRY_FILE)
+    if args.rebuild:
+        if os.path.exists(path):
+            print(f"{path} exists; move it aside before rebuilding")
+            return
+        registry = IdentityRegistry.rebuild(args.data_dir, args.archives_dir)
+        registry.save()
+    else:
+        registry = IdentityRegistry.load(path)
+    for kind in KINDS:
+        merged = len(registry.redirects[kind])
+        print(f"{kind}: {len(registry.entities[kind]) - merged} ({merged} merged), next id {registry.next_id[kind]}")
+
+if __name__ == "__main__":
+    main()
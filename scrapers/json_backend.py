@@ -0,0 +1,24 @@
+"""
+JSON decoding backend for the data pipeline.
+Uses orjson when it is installed and falls back to the standard library json module.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Name of the decoder in use, reported alongside load timings
+BACKEND = 'orjson' if orjson is not None else 'json'
+
+def loads(data):
+    """Decode a JSON document from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def load_file(path):
+    """Read and decode a whole JSON file"""
+    with open(path, 'rb') as f:
+        return loads(f.read())
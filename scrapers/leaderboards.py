@@ -0,0 +1,182 @@
+"""
+Precomputed, paged leaderboards for the frontend.
+
+Each board is a sorted index over the players in player_summary.json:
+
+  rating          skill model rating (ELO-like rating without NumPy)
+  recent_win_pct  win % over the last 10 non-forfeit games
+  rating_change   rating change over the last 10 games ("most improved")
+  handicap_<h>    rating leaders among players currently at handicap h
+
+Every board has a minimum number of games. Boards are published under
+combined/leaderboards/ as <board>/<page>.json files of PAGE_SIZE ranked
+entries, plus an index.json listing the boards and their page counts, so a
+leaderboard page is one small request with no client-side sorting.
+
+Between runs the boards are maintained incrementally. The previous run's
+pages are the sorted index: only players whose entry changed are removed and
+re-inserted by binary search, and only pages from the first changed rank on
+are re-encoded.
+"""
+import os
+import bisect
+
+import json_backend
+
+LEADERBOARD_DIR = "leaderboards"
+INDEX_FILE = "index.json"
+PAGE_SIZE = 50
+INDEX_VERSION = 1
+
+BOARDS = {
+    'rating': {'title': "Top rated", 'min_games': 10},
+    'recent_win_pct': {'title': "Best recent win %", 'min_games': 10},
+    'rating_change': {'title': "Most improved", 'min_games': 10},
+}
+HANDICAP_MIN_GAMES = 5
+
+def _rating(player):
+    """(rating, games) from the skill model, falling back to the ELO-like rating"""
+    skill = player.get('skill')
+    if skill:
+        return skill['rating'], skill['games']
+    return player['elo_rating'], player['rolling']['career']['games']
+
+def board_values(player):
+    """{board: (value, games)} for every board a player can appear on"""
+    rolling = player['rolling']
+    recent = rolling.get('last', {}).get('10', rolling['career'])
+    rating = _rating(player)
+    values = {
+        'rating': rating,
+        'recent_win_pct': (recent['win_pct'], recent['games']),
+        'rating_change': (player.get('rating_change', 0), rolling['career']['games']),
+    }
+    if player.get('current_handicap') is not None:
+        values[f"handicap_{player['current_handicap']}"] = rating
+    return values
+
+def _board_config(board):
+    if board.startswith('handicap_'):
+        return {'title': f"Handicap {board[len('handicap_'):]} leaders", 'min_games': HANDICAP_MIN_GAMES}
+    return BOARDS[board]
+
+def _sort_key(entry):
+    """Highest value first, then name and id so the order is total"""
+    return (-entry['value'], entry['name'], entry['id'])
+
+def build_entries(player_summary):
+    """{board: {player id: entry}} for the qualifying players of every board"""
+    boards = {board: {} for board in BOARDS}
+    for name, player in player_summary.items():
+        for board, (value, games) in board_values(player).items():
+            if games < _board_config(board)['min_games']:
+                continue
+            boards.setdefault(board, {})[player['id']] = {
+                'id': player['id'],
+                'name': name,
+                'team': player.get('current_team'),
+                'handicap': player.get('current_handicap'),
+                'value': value,
+                'games': games
+            }
+    return boards
+
+def load_board(board_dir, pages):
+    """The previous run's sorted entries of one board, or None when its pages can't be read"""
+    entries = []
+    try:
+        for page in range(1, pages + 1):
+            entries.extend(json_backend.load_file(os.path.join(board_dir, f"{page}.json"))['entries'])
+    except Exception as e:
+        print(f"Error reading leaderboard {board_dir}: {str(e)}")
+        return None
+    for entry in entries:
+        entry.pop('rank', None)
+    return entries
+
+def update_board(previous, current):
+    """Bring a sorted entry list up to date; returns (entries, first changed position)"""
+    if previous is None:
+        return sorted(current.values(), key=_sort_key), 0
+
+    entries = previous
+    keys = [_sort_key(entry) for entry in entries]
+    first_change = len(entries)
+    old = {entry['id']: entry for entry in entries}
+
+    for player_id, entry in old.items():
+        if current.get(player_id) != entry:
+            position = bisect.bisect_left(keys, _sort_key(entry))
+            del keys[position]
+            del entries[position]
+            first_change = min(first_change, position)
+    for player_id, entry in current.items():
+        if old.get(player_id) != entry:
+            key = _sort_key(entry)
+            position = bisect.bisect_left(keys, key)
+            keys.insert(position, key)
+            entries.insert(position, entry)
+            first_change = min(first_change, position)
+    return entries, first_change
+
+def stage_leaderboards(batch, output_dir, player_summary):
+    """Stage every board's changed pages and the index on an ArtifactBatch.
+
+    Returns the paths of pages that no longer exist (a board shrank or went
+    away), to be removed once the batch is committed.
+    """
+    leaderboard_dir = os.path.join(output_dir, LEADERBOARD_DIR)
+    index_path = os.path.join(leaderboard_dir, INDEX_FILE)
+    previous_index = {}
+    if os.path.exists(index_path):
+        try:
+            data = json_backend.load_file(index_path)
+            if data.get('version') == INDEX_VERSION:
+                previous_index = data['boards']
+        except Exception as e:
+            print(f"Error reading leaderboard index {index_path}: {str(e)}")
+
+    index = {'version': INDEX_VERSION, 'page_size': PAGE_SIZE, 'boards': {}}
+    stale = []
+    for board, current in sorted(build_entries(player_summary).items()):
+        board_dir = os.path.join(leaderboard_dir, board)
+        previous_pages = previous_index.get(board, {}).get('pages', 0)
+        previous = load_board(board_dir, previous_pages) if board in previous_index else None
+        entries, first_change = update_board(previous, current)
+
+        pages = (len(entries) + PAGE_SIZE - 1) // PAGE_SIZE
+        config = _board_config(board)
+        index['boards'][board] = {
+            'title': config['title'],
+            'min_games': config['min_games'],
+            'entries': len(entries),
+            'pages': pages
+        }
+        # Pages before the first changed rank are byte-for-byte the same
+        for page in range(first_change // PAGE_SIZE + 1, pages + 1):
+            start = (page - 1) * PAGE_SIZE
+            batch.stage_json(os.path.join(board_dir, f"{page}.json"), {
+                'board': board,
+                'page': page,
+                'pages': pages,
+                'entries': [dict(entry, rank=start + offset + 1)
+                            for offset, entry in enumerate(entries[start:start + PAGE_SIZE])]
+            })
+        stale.extend(os.path.join(board_dir, f"{page}.json") for page in range(pages + 1, previous_pages + 1))
+
+    for board, info in previous_index.items():
+        if board not in index['boards']:
+            stale.extend(os.path.join(leaderboard_dir, board, f"{page}.json") for page in range(1, info['pages'] + 1))
+
+    batch.stage_json(index_path, index)
+    return stale
+
+def remove_stale_pages(paths):
+    """Delete pages dropped from the boards, and board folders left empty"""
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+        directory = os.path.dirname(path)
+        if os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
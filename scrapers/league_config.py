@@ -0,0 +1,58 @@
+"""
+League configuration.
+
+scrapers/leagues.json lists every league root to crawl, where each league's
+output tree goes, and the per-host request budget shared by the whole run.
+The first league is the primary one; its outputs stay in public/data where
+the app reads them, other leagues default to public/data/leagues/<id>.
+"""
+import os
+import json
+import urllib.parse
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "leagues.json")
+
+USER_AGENT = 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36'
+
+def load_config(path=None):
+    """Load the league config with defaults filled in for each league"""
+    with open(path or DEFAULT_CONFIG_PATH, 'r') as f:
+        config = json.load(f)
+
+    for i, league in enumerate(config.get('leagues', [])):
+        if not league['root'].endswith('/'):
+            league['root'] += '/'
+        league['primary'] = i == 0
+        league.setdefault('name', league['id'])
+        league.setdefault('output_dir', "public/data" if i == 0 else f"public/data/leagues/{league['id']}")
+        league.setdefault('fallback_teams', [])
+
+    return config
+
+def select_leagues(config, league_ids=None):
+    """The configured leagues, optionally filtered to the given ids"""
+    leagues = config.get('leagues', [])
+    if league_ids:
+        leagues = [league for league in leagues if league['id'] in league_ids]
+    return leagues
+
+def league_url(league, page):
+    """Absolute URL of a page (or relative link) under a league's root"""
+    return urllib.parse.urljoin(league['root'], page)
+
+def archives_dir(league):
+    return os.path.join(league['output_dir'], "archives")
+
+def build_headers(league, auth_cookie):
+    """Browser-like request headers for a league, with the authentication cookie"""
+    return {
+        'User-Agent': USER_AGENT,
+        'Referer': league_url(league, 'index.php?foo=bar'),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+        'Accept-Language': 'en-US,en;q=0.9',
+        'Upgrade-Insecure-Requests': '1',
+        'sec-ch-ua': '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
+        'sec-ch-ua-mobile': '?0',
+        'sec-ch-ua-platform': '"macOS"',
+        'Cookie': auth_cookie
+    }
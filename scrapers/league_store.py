@@ -0,0 +1,341 @@
+"""
+Optional embedded SQLite store for league data.
+
+Both scrapers write into it when LEAGUE_DB_PATH is set, and SeasonDataCombiner
+can read from it instead of the JSON files. Seasons archived before the store
+existed are copied in from the season catalog by import_catalog(). Matches, player stats, teams and
+ratings are indexed by player, team, season and date so single-player, team or
+season lookups don't need to load the whole history.
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+import json_backend
+import season_catalog
+from season_catalog import date_sort_key
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS seasons (
+    season_key TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    year INTEGER NOT NULL,
+    status TEXT NOT NULL DEFAULT 'active',
+    updated TEXT
+);
+
+CREATE TABLE IF NOT EXISTS teams (
+    season_key TEXT NOT NULL,
+    name TEXT NOT NULL,
+    team_id TEXT,
+    url TEXT,
+    PRIMARY KEY (season_key, name)
+);
+
+CREATE TABLE IF NOT EXISTS matches (
+    season_key TEXT NOT NULL,
+    season_id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    home_team TEXT NOT NULL,
+    away_team TEXT NOT NULL,
+    home_player TEXT NOT NULL,
+    away_player TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    date_order INTEGER,
+    home_hcp INTEGER,
+    home_score INTEGER,
+    away_hcp INTEGER,
+    away_score INTEGER,
+    forfeit INTEGER,
+    winner TEXT,
+    winner_team TEXT,
+    winner_hcp INTEGER,
+    season_title TEXT,
+    PRIMARY KEY (season_key, season_id, date, home_team, away_team, home_player, away_player, seq)
+);
+
+CREATE INDEX IF NOT EXISTS idx_matches_home_player ON matches (home_player);
+CREATE INDEX IF NOT EXISTS idx_matches_away_player ON matches (away_player);
+CREATE INDEX IF NOT EXISTS idx_matches_home_team ON matches (home_team);
+CREATE INDEX IF NOT EXISTS idx_matches_away_team ON matches (away_team);
+CREATE INDEX IF NOT EXISTS idx_matches_season_date ON matches (season_key, date_order);
+
+CREATE TABLE IF NOT EXISTS player_stats (
+    season_key TEXT NOT NULL,
+    team TEXT NOT NULL,
+    name TEXT NOT NULL,
+    handicap INTEGER,
+    wins INTEGER,
+    losses INTEGER,
+    total INTEGER,
+    win_percentage TEXT,
+    division TEXT,
+    PRIMARY KEY (season_key, team, name)
+);
+
+CREATE INDEX IF NOT EXISTS idx_player_stats_name ON player_stats (name);
+CREATE INDEX IF NOT EXISTS idx_player_stats_team ON player_stats (team, season_key);
+
+CREATE TABLE IF NOT EXISTS ratings (
+    player TEXT PRIMARY KEY,
+    elo_rating REAL,
+    rating_trend TEXT,
+    recent_win_percentage REAL,
+    current_team TEXT,
+    current_handicap INTEGER,
+    updated TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_ratings_elo ON ratings (elo_rating);
+CREATE INDEX IF NOT EXISTS idx_ratings_team ON ratings (current_team);
+"""
+
+# Column order of match rows as they are inserted
+MATCH_COLUMNS = ('season_key', 'season_id', 'date', 'home_team', 'away_team', 'home_player',
+                 'away_player', 'seq', 'date_order', 'home_hcp', 'home_score', 'away_hcp',
+                 'away_score', 'forfeit', 'winner', 'winner_team', 'winner_hcp', 'season_title')
+
+def _season_index(season_name):
+    """Numeric index of a season name for chronological ordering"""
+    return {'spring': 1, 'summer': 2, 'fall': 3}.get((season_name or '').lower(), 0)
+
+def _date_order(date_text, season_name):
+    key = date_sort_key(date_text, season_name)
+    return key[0] * 100 + key[1] if key else None
+
+class LeagueStore:
+    def __init__(self, path):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Open the store named by LEAGUE_DB_PATH, or return None if it isn't configured"""
+        path = os.environ.get('LEAGUE_DB_PATH', '')
+        return cls(path) if path else None
+
+    @classmethod
+    def for_league(cls, league):
+        """Store for a league: LEAGUE_DB_PATH for the primary league, a sibling file per other league"""
+        path = os.environ.get('LEAGUE_DB_PATH', '')
+        if not path:
+            return None
+        if not league.get('primary', True):
+            base, ext = os.path.splitext(path)
+            path = f"{base}_{league['id']}{ext or '.db'}"
+        return cls(path)
+
+    def close(self):
+        self.conn.close()
+
+    # ----- Writes -----
+
+    def upsert_season(self, season_key, name, year, status='active'):
+        """Create or update a season row"""
+        with self.conn:
+            self.conn.execute(
+                """INSERT INTO seasons (season_key, name, year, status, updated) VALUES (?, ?, ?, ?, ?)
+                   ON CONFLICT (season_key) DO UPDATE SET
+                       name = excluded.name, year = excluded.year,
+                       status = excluded.status, updated = excluded.updated""",
+                (season_key, name, year, status, datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+    def replace_season_teams(self, season_key, teams):
+        """Replace the season's team list ({'name', 'url'} dicts as used by the scraper)"""
+        rows = []
+        for team in teams:
+            url = team.get('url') or ''
+            team_id = None
+            if 'team_id=' in url:
+                team_id = url.split('team_id=')[1].split('&')[0]
+            rows.append((season_key, team['name'], team_id, url))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM teams WHERE season_key = ?", (season_key,))
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO teams (season_key, name, team_id, url) VALUES (?, ?, ?, ?)", rows)
+
+    def replace_season_matches(self, season_key, season_name, matches):
+        """Replace a season's match rows with a fresh scrape of the whole season.
+
+        Rows are keyed by the page they were scraped from (homeTeam is always the
+        team whose page it was) plus a sequence number for repeated pairings. The
+        season's old rows are deleted in the same transaction, so a game whose
+        date or names were corrected on the site doesn't linger under its old key.
+        """
+        seen = {}
+        rows = []
+        for match in matches:
+            identity = (match.get('seasonId') or 'unknown', match.get('date') or '',
+                        match.get('homeTeam'), match.get('awayTeam'),
+                        match.get('homePlayer'), match.get('awayPlayer'))
+            seq = seen.get(identity, 0)
+            seen[identity] = seq + 1
+
+            rows.append(identity + (
+                seq,
+                _date_order(match.get('date'), season_name),
+                match.get('homeHCP'), match.get('homeScore'),
+                match.get('awayHCP'), match.get('awayScore'),
+                1 if match.get('forfeit') else 0,
+                match.get('winner'), match.get('winnerTeam'), match.get('winnerHCP'),
+                match.get('seasonTitle')))
+
+        with self.conn:
+            self.conn.execute("DELETE FROM matches WHERE season_key = ?", (season_key,))
+            self.conn.executemany(
+                f"""INSERT INTO matches ({', '.join(MATCH_COLUMNS)})
+                    VALUES ({', '.join('?' * len(MATCH_COLUMNS))})""",
+                [(season_key,) + row for row in rows])
+
+        return len(rows)
+
+    def replace_season_player_stats(self, season_key, players):
+        """Replace a season's player standings rows; rows no longer in the standings are dropped"""
+        with self.conn:
+            self.conn.execute("DELETE FROM player_stats WHERE season_key = ?", (season_key,))
+            self.conn.executemany(
+                """INSERT OR REPLACE INTO player_stats (season_key, team, name, handicap, wins, losses,
+                                             total, win_percentage, division)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+                [(season_key, p.get('team'), p.get('name'), p.get('handicap'), p.get('wins'),
+                  p.get('losses'), p.get('total'), p.get('winPercentage'), p.get('division'))
+                 for p in players])
+
+        return len(players)
+
+    def upsert_ratings(self, player_history):
+        """Upsert the combiner's current per-player ratings"""
+        updated = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        with self.conn:
+            self.conn.executemany(
+                """INSERT INTO ratings (player, elo_rating, rating_trend, recent_win_percentage,
+                                        current_team, current_handicap, updated)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)
+                   ON CONFLICT (player) DO UPDATE SET
+                       elo_rating = excluded.elo_rating, rating_trend = excluded.rating_trend,
+                       recent_win_percentage = excluded.recent_win_percentage,
+                       current_team = excluded.current_team,
+                       current_handicap = excluded.current_handicap, updated = excluded.updated""",
+                [(name, h['elo_rating'], h['rating_trend'], h['recent_win_percentage'],
+                  h['current_team'], h['current_handicap'], updated)
+                 for name, h in player_history.items()])
+
+    def import_catalog(self, archives_dir):
+        """Copy in catalogued seasons the store doesn't have yet; returns their keys"""
+        catalog = season_catalog.load_catalog(archives_dir) or season_catalog.rebuild_catalog(archives_dir)
+        stored = {row['season_key'] for row in self.list_seasons()}
+        imported = []
+        for season_key, entry in catalog['seasons'].items():
+            if season_key in stored:
+                continue
+            matches_path = season_catalog.season_file_path(archives_dir, entry, 'matches')
+            stats_path = season_catalog.season_file_path(archives_dir, entry, 'stats')
+            if matches_path:
+                self.replace_season_matches(season_key, entry['name'], json_backend.load_file(matches_path))
+            if stats_path:
+                self.replace_season_player_stats(season_key, json_backend.load_file(stats_path))
+            # The season row goes in last, so an interrupted import is retried next time
+            self.upsert_season(season_key, entry['name'], entry['year'], status='final')
+            imported.append(season_key)
+        return imported
+
+    # ----- Queries -----
+
+    def list_seasons(self):
+        """All seasons in chronological order, active seasons last"""
+        rows = [dict(r) for r in self.conn.execute("SELECT * FROM seasons")]
+        rows.sort(key=lambda s: (s['status'] == 'active', s['year'], _season_index(s['name'])))
+        return rows
+
+    def _match_record(self, row):
+        """Convert a matches row back into the scraper's JSON record shape"""
+        record = {
+            "homeTeam": row['home_team'],
+            "awayTeam": row['away_team'],
+            "homePlayer": row['home_player'],
+            "homeHCP": row['home_hcp'],
+            "homeScore": row['home_score'],
+            "awayPlayer": row['away_player'],
+            "awayHCP": row['away_hcp'],
+            "awayScore": row['away_score'],
+            "date": row['date'],
+            "forfeit": bool(row['forfeit']),
+            "winner": row['winner'],
+            "winnerTeam": row['winner_team'],
+            "winnerHCP": row['winner_hcp'],
+            "seasonId": row['season_id']
+        }
+        if row['season_title'] is not None:
+            record["seasonTitle"] = row['season_title']
+        return record
+
+    def _stat_record(self, row):
+        """Convert a player_stats row back into the scraper's JSON record shape"""
+        return {
+            "team": row['team'],
+            "name": row['name'],
+            "handicap": row['handicap'],
+            "wins": row['wins'],
+            "losses": row['losses'],
+            "total": row['total'],
+            "winPercentage": row['win_percentage'],
+            "division": row['division']
+        }
+
+    def iter_matches(self, season_key):
+        """Yield a season's match records in insertion order"""
+        cursor = self.conn.execute(
+            "SELECT * FROM matches WHERE season_key = ? ORDER BY rowid", (season_key,))
+        for row in cursor:
+            yield self._match_record(row)
+
+    def iter_player_stats(self, season_key):
+        """Yield a season's player stat records in insertion order"""
+        cursor = self.conn.execute(
+            "SELECT * FROM player_stats WHERE season_key = ? ORDER BY rowid", (season_key,))
+        for row in cursor:
+            yield self._stat_record(row)
+
+    def player_matches(self, *spellings):
+        """(season_key, record) pairs for every match any spelling of a player appears in"""
+        # SQLite answers the OR with both player indexes
+        marks = ', '.join('?' * len(spellings))
+        cursor = self.conn.execute(
+            f"SELECT * FROM matches WHERE home_player IN ({marks}) OR away_player IN ({marks}) ORDER BY rowid",
+            spellings + spellings)
+        return [(row['season_key'], self._match_record(row)) for row in cursor]
+
+    def player_stats(self, *spellings):
+        """(season_key, record) pairs for the standings rows of any spelling of a player"""
+        marks = ', '.join('?' * len(spellings))
+        cursor = self.conn.execute(
+            f"SELECT * FROM player_stats WHERE name IN ({marks}) ORDER BY rowid", spellings)
+        return [(row['season_key'], self._stat_record(row)) for row in cursor]
+
+    def team_matches(self, team_name, season_key=None):
+        """Match records scraped for or against a team, optionally for one season"""
+        query = "SELECT * FROM matches WHERE (home_team = ? OR away_team = ?)"
+        params = [team_name, team_name]
+        if season_key:
+            query += " AND season_key = ?"
+            params.append(season_key)
+        query += " ORDER BY season_key, date_order, rowid"
+        return [self._match_record(row) for row in self.conn.execute(query, params)]
+
+    def team_roster(self, team_name, season_key):
+        """Player stat records for a team in a season"""
+        cursor = self.conn.execute(
+            "SELECT * FROM player_stats WHERE team = ? AND season_key = ? ORDER BY rowid",
+            (team_name, season_key))
+        return [self._stat_record(row) for row in cursor]
+
+    def rating(self, player_name):
+        """Stored rating row for a player, or None"""
+        row = self.conn.execute("SELECT * FROM ratings WHERE player = ?", (player_name,)).fetchone()
+        return dict(row) if row else None
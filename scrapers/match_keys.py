@@ -0,0 +1,52 @@
+"""
+Canonical match identity.
+
+Every game is scraped twice: once from each team's scouting report, with
+homeTeam always set to the team whose page it was. The canonical key is the
+same for both copies, so stages that need each game once can deduplicate.
+seasonId is left out because it comes from each team's link and can differ
+between the two copies; keys are therefore only unique within one season.
+"""
+
+def _side_sort_key(side):
+    return tuple('' if value is None else str(value) for value in side)
+
+def canonical_match_key(match):
+    """Orientation-independent key for a scraped match record"""
+    home = (match.get('homeTeam'), match.get('homePlayer'), match.get('homeHCP'), match.get('homeScore'))
+    away = (match.get('awayTeam'), match.get('awayPlayer'), match.get('awayHCP'), match.get('awayScore'))
+    first, second = sorted((home, away), key=_side_sort_key)
+    return (match.get('date'),) + first + second
+
+def canonical_pairing_key(match):
+    """Orientation-independent key for who played whom on a date, ignoring handicaps and scores"""
+    home = (match.get('homeTeam'), match.get('homePlayer'))
+    away = (match.get('awayTeam'), match.get('awayPlayer'))
+    first, second = sorted((home, away), key=_side_sort_key)
+    return (match.get('date'),) + first + second
+
+def iter_keyed_matches(matches, key_fn=canonical_match_key):
+    """Yield (key, match) for each distinct game, keeping the first copy seen.
+
+    A pairing that legitimately repeats on the same night shows up several
+    times on each team's page, so occurrences are counted per source page and
+    the n-th copy from one page pairs with the n-th copy from the other.
+    """
+    occurrences = {}
+    seen = set()
+
+    for match in matches:
+        key = key_fn(match)
+        source = (key, match.get('homeTeam'))
+        occurrence = occurrences.get(source, 0)
+        occurrences[source] = occurrence + 1
+
+        full_key = key + (occurrence,)
+        if full_key in seen:
+            continue
+        seen.add(full_key)
+        yield full_key, match
+
+def dedupe_matches(matches):
+    """Each distinct game once, in first-seen order"""
+    return [match for _, match in iter_keyed_matches(matches)]
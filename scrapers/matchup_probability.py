@@ -0,0 +1,164 @@
+"""
+Python port of the frontend's win probability model (src/utils/probability.js).
+
+Players are the enriched team stats rows the app builds in DataLoader.js
+(handicap plus handicapTrend, handicapChangedRecently, seasonsPlayed and
+ratingTrend from player_summary.json). Matches are indexed by player once, so
+each probability only looks at the two players' own matches.
+"""
+import math
+
+def enrich_player_stats(stats, player_summary):
+    """Merge player_summary fields into standings rows the same way DataLoader.js does"""
+    enriched = []
+    for player in stats:
+        history = player_summary.get(player.get('name'), {})
+        row = dict(player)
+        row.update({
+            'handicapTrend': history.get('handicap_trend') or 'stable',
+            'eloRating': history.get('elo_rating') or 1500,
+            'ratingTrend': history.get('rating_trend') or 'stable',
+            'handicapChangedRecently': history.get('handicap_changed_recently') or False,
+            'seasonsPlayed': history.get('seasons_played') or 1,
+            'teamHistory': history.get('team_history') or [player.get('team')]
+        })
+        enriched.append(row)
+    return enriched
+
+class MatchIndex:
+    """Matches grouped by player name for the probability calculations"""
+
+    def __init__(self, matches):
+        self.by_player = {}
+        for match in matches:
+            for player in {match.get('homePlayer'), match.get('awayPlayer')}:
+                if player:
+                    self.by_player.setdefault(player, []).append(match)
+
+    def player_matches(self, player_name):
+        return self.by_player.get(player_name, [])
+
+def get_handicap_performance(player_name, handicap_relation, match_index):
+    """How a player performs against opponents with a lower/higher/equal handicap"""
+    player_matches = match_index.player_matches(player_name)
+    if not player_matches:
+        return {'winRate': 0.5, 'matchCount': 0}
+
+    relevant = []
+    for match in player_matches:
+        if match.get('homePlayer') == player_name:
+            player_hcp, opponent_hcp = match.get('homeHCP'), match.get('awayHCP')
+        else:
+            player_hcp, opponent_hcp = match.get('awayHCP'), match.get('homeHCP')
+
+        if handicap_relation == 'lower':
+            keep = player_hcp < opponent_hcp
+        elif handicap_relation == 'higher':
+            keep = player_hcp > opponent_hcp
+        else:
+            keep = player_hcp == opponent_hcp
+        if keep:
+            relevant.append(match)
+
+    if not relevant:
+        return {'winRate': 0.5, 'matchCount': 0}
+
+    wins = sum(1 for match in relevant if match.get('winner') == player_name)
+    return {'winRate': wins / len(relevant), 'matchCount': len(relevant)}
+
+def get_head_to_head_record(player1, player2, match_index):
+    """Head-to-head record between two players (case-insensitive, forfeits excluded)"""
+    def normalize(name):
+        return (name or '').lower().strip()
+
+    player1_norm = normalize(player1)
+    player2_norm = normalize(player2)
+    record = {'player1Wins': 0, 'player2Wins': 0, 'totalMatches': 0}
+
+    for match in match_index.player_matches(player1):
+        home_norm = normalize(match.get('homePlayer'))
+        away_norm = normalize(match.get('awayPlayer'))
+        if match.get('forfeit') or {home_norm, away_norm} != {player1_norm, player2_norm}:
+            continue
+
+        record['totalMatches'] += 1
+        winner_norm = normalize(match.get('winner'))
+        if winner_norm == player1_norm:
+            record['player1Wins'] += 1
+        elif winner_norm == player2_norm:
+            record['player2Wins'] += 1
+
+    return record
+
+def calculate_win_probability(home_name, away_name, players_by_name, match_index):
+    """Probability (0.1-0.9) that the home player beats the away player"""
+    home_player = players_by_name.get(home_name)
+    away_player = players_by_name.get(away_name)
+    if not home_player or not away_player:
+        return 0.5
+
+    home_hcp = home_player.get('handicap')
+    away_hcp = away_player.get('handicap')
+    if home_hcp < away_hcp:
+        relation = 'lower'
+    elif home_hcp > away_hcp:
+        relation = 'higher'
+    else:
+        relation = 'equal'
+    inverse_relation = {'higher': 'lower', 'lower': 'higher'}.get(relation, 'equal')
+
+    home_performance = get_handicap_performance(home_name, relation, match_index)
+    away_performance = get_handicap_performance(away_name, inverse_relation, match_index)
+
+    probability = 0.5
+
+    # Each player's record in this handicap scenario, weighted up to 0.3 at 10+ matches
+    if home_performance['matchCount'] > 0:
+        home_weight = min(0.3, home_performance['matchCount'] / 10 * 0.3)
+        probability = probability * (1 - home_weight) + home_performance['winRate'] * home_weight
+
+    if away_performance['matchCount'] > 0:
+        away_weight = min(0.3, away_performance['matchCount'] / 10 * 0.3)
+        probability = probability * (1 - away_weight) + (1 - away_performance['winRate']) * away_weight
+
+    # 1% per handicap point
+    probability += (home_hcp - away_hcp) * 0.01
+
+    # Recent handicap changes
+    if home_player.get('handicapChangedRecently'):
+        if home_player.get('handicapTrend') == 'increasing':
+            probability -= 0.03
+        elif home_player.get('handicapTrend') == 'decreasing':
+            probability += 0.02
+
+    if away_player.get('handicapChangedRecently'):
+        if away_player.get('handicapTrend') == 'increasing':
+            probability += 0.03
+        elif away_player.get('handicapTrend') == 'decreasing':
+            probability -= 0.02
+
+    # Experience, with diminishing returns
+    home_experience = home_player.get('seasonsPlayed') or 1
+    away_experience = away_player.get('seasonsPlayed') or 1
+    probability += 0.02 * math.log(home_experience / away_experience + 1)
+
+    # Rating trends
+    if home_player.get('ratingTrend') == 'improving':
+        probability += 0.03
+    elif home_player.get('ratingTrend') == 'declining':
+        probability -= 0.03
+
+    if away_player.get('ratingTrend') == 'improving':
+        probability -= 0.03
+    elif away_player.get('ratingTrend') == 'declining':
+        probability += 0.03
+
+    # Blend in head-to-head history at 30%
+    head_to_head = [m for m in match_index.player_matches(home_name)
+                    if (m.get('homePlayer') == home_name and m.get('awayPlayer') == away_name)
+                    or (m.get('homePlayer') == away_name and m.get('awayPlayer') == home_name)]
+    if head_to_head:
+        home_wins = sum(1 for m in head_to_head if m.get('winner') == home_name)
+        probability = probability * 0.7 + (home_wins / len(head_to_head)) * 0.3
+
+    return max(0.1, min(0.9, probability))
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Fuzzy reconciliation of player and team names across pages and seasons.
+
+The identity registry already folds case, quotes and whitespace. This stage
+catches the variants it can't: one-letter misspellings, punctuation drift
+("Lock,Chalk" / "Lock, Chalk") and team names that picked up or lost a prefix
+or suffix ("Catzilla Because 7 8 9" / "Catzilla").
+
+Candidates come from indexes instead of comparing every pair of names:
+  - a trigram index probed with each name's rarest trigrams (prefix
+    filtering), so only names sharing enough trigrams are compared
+  - for teams, an index on the first and last word for prefix/suffix variants
+Every candidate pair is then verified: the names must be equal once
+punctuation is dropped, or within one edit, or (for teams) one must be a
+whole-word prefix or suffix of the other. Two names that both appear in one
+season's standings are different people or teams and are never merged.
+
+Accepted pairs are merged in the identity registry (IdentityRegistry.merge),
+which persists the alias map; the combiner then resolves every spelling and
+every previously stamped id to the surviving entity.
+"""
+import re
+import argparse
+
+from identity_registry import canonicalize
+
+TRIGRAM_SIMILARITY = 0.5
+MIN_EDIT_LENGTH = 8
+MIN_AFFIX_LENGTH = 5
+# Placeholder names the site uses for forfeited games are never reconciled
+PLACEHOLDER = re.compile(r'\bforfeit\b|^bye$')
+
+def match_form(name):
+    """Canonical name with punctuation dropped, used for comparisons"""
+    return re.sub(r'\s+', ' ', re.sub(r'[^\w\s]', ' ', canonicalize(name))).strip()
+
+def trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def within_one_edit(a, b):
+    """Whether a and b differ by at most one insertion, deletion, substitution or adjacent swap"""
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+
+    i = 0
+    while i < len(a) and a[i] == b[i]:
+        i += 1
+    if len(a) < len(b):
+        return a[i:] == b[i + 1:]
+    if a[i + 1:] == b[i + 1:]:
+        return True
+    return i + 1 < len(a) and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+
+def is_affix_variant(short, long):
+    """Whether the shorter team name is a whole-word prefix or suffix of the longer one"""
+    short_words = short.split()
+    long_words = long.split()
+    if len(short_words) >= len(long_words) or len(short.replace(' ', '')) < MIN_AFFIX_LENGTH:
+        return False
+    return long_words[:len(short_words)] == short_words or long_words[-len(short_words):] == short_words
+
+class NameIndex:
+    """Trigram and word indexes over one kind of names"""
+
+    def __init__(self, forms):
+        # forms: entity id -> match form
+        self.forms = forms
+        self.grams = {entity_id: trigrams(form) for entity_id, form in forms.items()}
+        self.postings = {}
+        self.edge_words = {}
+        for entity_id, grams in self.grams.items():
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(entity_id)
+            words = forms[entity_id].split()
+            if words:
+                for word in {words[0], words[-1]}:
+                    self.edge_words.setdefault(word, []).append(entity_id)
+
+    def similar(self, entity_id, threshold=TRIGRAM_SIMILARITY):
+        """Ids sharing enough trigrams to reach the Dice threshold, found via the rarest trigrams"""
+        grams = sorted(self.grams[entity_id], key=lambda gram: (len(self.postings[gram]), gram))
+        # Dice >= t needs an overlap of at least t/2 * |grams|, so probing all but
+        # that many - 1 of the rarest trigrams can't miss a qualifying name
+        needed = max(1, int(threshold / 2 * len(grams) + 0.999))
+        candidates = set()
+        for gram in grams[:len(grams) - needed + 1]:
+            candidates.update(self.postings[gram])
+        candidates.discard(entity_id)
+
+        size = len(self.grams[entity_id])
+        for candidate in candidates:
+            other = self.grams[candidate]
+            if 2 * len(self.grams[entity_id] & other) / (size + len(other)) >= threshold:
+                yield candidate
+
+    def affix_candidates(self, entity_id):
+        """Ids whose name starts or ends with the same word"""
+        words = self.forms[entity_id].split()
+        candidates = set()
+        if words:
+            for word in {words[0], words[-1]}:
+                candidates.update(self.edge_words.get(word, ()))
+        candidates.discard(entity_id)
+        return candidates
+
+def _is_variant(kind, a, b):
+    if a.replace(' ', '') == b.replace(' ', ''):
+        return True
+    if min(len(a), len(b)) >= MIN_EDIT_LENGTH and within_one_edit(a, b):
+        return True
+    if kind == 'teams':
+        short, long = sorted((a, b), key=len)
+        return is_affix_variant(short, long)
+    return False
+
+def find_merges(registry, kind, standings_seasons):
+    """Proposed (source id, target id) merges for one kind of names.
+
+    standings_seasons maps an id to the seasons its name appears in the
+    standings; the surviving id is the one seen in more recent standings,
+    then the older id.
+    """
+    forms = {}
+    for entity_id, entity in registry.entities[kind].items():
+        if entity.get('merged_into'):
+            continue
+        form = match_form(entity['name'])
+        if form and not PLACEHOLDER.search(form):
+            forms[entity_id] = form
+
+    index = NameIndex(forms)
+    neighbours = {}
+    for entity_id in forms:
+        candidates = set(index.similar(entity_id))
+        if kind == 'teams':
+            candidates |= index.affix_candidates(entity_id)
+        for candidate in candidates:
+            if candidate < entity_id:
+                continue
+            if standings_seasons.get(entity_id, set()) & standings_seasons.get(candidate, set()):
+                continue
+            if _is_variant(kind, forms[entity_id], forms[candidate]):
+                neighbours.setdefault(entity_id, set()).add(candidate)
+                neighbours.setdefault(candidate, set()).add(entity_id)
+
+    def rank(entity_id):
+        seasons = standings_seasons.get(entity_id, set())
+        return (max(seasons) if seasons else (), len(seasons), -entity_id)
+
+    merges = []
+    for entity_id, linked in sorted(neighbours.items()):
+        for other in sorted(linked):
+            # A name that fits several others (e.g. a combined "A B" team name) is ambiguous
+            if other < entity_id or len(linked) > 1 or len(neighbours[other]) > 1:
+                continue
+            source, target = sorted((entity_id, other), key=rank)
+            merges.append((source, target))
+    return merges
+
+def reconcile(registry, standings_seasons=None, dry_run=False):
+    """Find and apply merges for players and teams; returns {kind: [(source name, target name)]}"""
+    standings_seasons = standings_seasons or {}
+    report = {}
+    for kind in ('players', 'teams'):
+        merges = find_merges(registry, kind, standings_seasons.get(kind, {}))
+        report[kind] = []
+        for source, target in merges:
+            source_id = registry.resolve_id(kind, source)
+            target_id = registry.resolve_id(kind, target)
+            if source_id == target_id:
+                continue
+            report[kind].append((registry.entities[kind][source_id]['name'], registry.entities[kind][target_id]['name']))
+            if not dry_run:
+                registry.merge(kind, source_id, target_id)
+    return report
+
+def collect_names(combiner):
+    """Register every name in the combiner's records and note the standings seasons of each id"""
+    identities = combiner.identities
+    standings_seasons = {'players': {}, 'teams': {}}
+    for record_type, season, record in combiner.iter_season_records():
+        season_key = (season['year'], combiner._season_index(season['name']))
+        if record_type == 'match':
+            for field in ('homePlayer', 'awayPlayer'):
+                identities.player_id(record.get(field))
+            for field in ('homeTeam', 'awayTeam'):
+                identities.team_id(record.get(field))
+            continue
+        player_id = identities.player_id(record.get('name'))
+        team_id = identities.team_id(record.get('team'))
+        if player_id is not None:
+            standings_seasons['players'].setdefault(player_id, set()).add(season_key)
+        if team_id is not None:
+            standings_seasons['teams'].setdefault(team_id, set()).add(season_key)
+    return standings_seasons
+
+def reconcile_league(data_dir, archives_dir, dry_run=False, store=None, combiner=None):
+    """Reconciliation stage for one league's data folder; merges are saved to its identity registry
+
+    A combiner passed in (e.g. the watch daemon's warm one) is read instead of
+    a fresh one, and its registry is the one merged into.
+    """
+    # Imported here: the combiner applies the registry this stage writes
+    from season_combiner import SeasonDataCombiner
+
+    combiner = combiner or SeasonDataCombiner(data_dir=data_dir, archives_dir=archives_dir, store=store)
+    standings_seasons = collect_names(combiner)
+    report = reconcile(combiner.identities, standings_seasons, dry_run)
+
+    for kind, merges in report.items():
+        for source, target in merges:
+            print(f"{'Would merge' if dry_run else 'Merged'} {kind[:-1]} '{source}' into '{target}'")
+    if not dry_run:
+        combiner.identities.save()
+    print(f"Name reconciliation: {sum(len(m) for m in report.values())} merge(s)")
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge spelling variants of player and team names")
+    parser.add_argument('--data-dir', default="public/data")
+    parser.add_argument('--archives-dir', help="Default: <data-dir>/archives")
+    parser.add_argument('--dry-run', action='store_true', help="Only print the merges that would be made")
+    args = parser.parse_args()
+    reconcile_league(args.data_dir, args.archives_dir or f"{args.data_dir}/archives", args.dry_run)
+
+if __name__ == "__main__":
+    main()
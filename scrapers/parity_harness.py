@@ -0,0 +1,487 @@
+#!/usr/bin/env python3
+"""
+Differential correctness and speed harness for the pipeline's fast paths.
+
+Every alternative engine is run side by side with the reference
+implementation over the same inputs. Its output is normalized and must be
+identical to the reference output; the report gives each engine's time and
+its speedup over the reference.
+
+Parsers (reference: BeautifulSoup's html.parser)
+  extract_match_data via parse_team_page, and extract_player_stats via
+  parse_standings, on team and standings pages rendered from the recorded
+  seasons and from a synthetic league. Other tree builders (lxml, html5lib)
+  are compared when they are installed. The reference is also checked to
+  round-trip the records the pages were rendered from.
+
+Combiner (reference: SeasonDataCombiner.generate_player_history, streaming
+the JSON files with the stdlib decoder on one process)
+  orjson, threaded and process season decoding, the SQLite store (filled
+  once, re-scraped over a misspelled earlier scrape, and holding only the
+  live season with the archives imported from the catalog) and sharded
+  history workers. The player histories, team aggregates and skill model
+  games must all match.
+
+Schedule (reference: remaining_fixtures on the live season's own spellings)
+  the same schedule with a team renamed and dates written differently must
+  leave the same fixtures unplayed.
+
+Inputs are the recorded data folder (copied, never modified) and a seeded
+synthetic league of any size. Exits non-zero if any engine differs.
+
+    python scrapers/parity_harness.py --players 2000 --seasons 8 --repeat 3
+"""
+import os
+import sys
+import time
+import json
+import html
+import random
+import shutil
+import argparse
+import tempfile
+import contextlib
+
+import json_backend
+import season_catalog
+from artifact_writer import encode_json, write_json_atomic
+from identity_registry import IdentityRegistry
+from league_store import LeagueStore
+from records import MatchRecord, PlayerSeasonStat, to_history_json
+from season_combiner import SeasonDataCombiner
+from season_simulator import current_season_label, remaining_fixtures
+from scraper import SEASONS, parse_team_page
+from player_stats_scraper import parse_standings
+
+PARSER_ENGINES = ('html.parser', 'lxml', 'html5lib')
+GAMES_PER_NIGHT = 5
+
+# ----- Synthetic league -----
+
+def _ordinal(day):
+    suffix = 'th' if 10 <= day % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')
+    return f"{day}{suffix}"
+
+def _week_date(season_name, week):
+    start_month, start_day = (int(part) for part in SEASONS[season_name]['start'].split('-'))
+    day_of_season = start_day + 7 * week
+    month = (start_month + (day_of_season - 1) // 28 - 1) % 12
+    day = (day_of_season - 1) % 28 + 1
+    return f"{season_catalog.MONTHS[month].capitalize()} {_ordinal(day)}"
+
+def synthetic_season(rng, season_name, season_id, rosters, handicaps, weeks):
+    """(match dicts, standings dicts) for one season; every game appears on both teams' pages"""
+    teams = sorted(rosters)
+    matches = []
+    records = {}
+    for week in range(weeks):
+        date = _week_date(season_name, week)
+        order = teams[:]
+        rng.shuffle(order)
+        for team, opponent in zip(order[::2], order[1::2]):
+            for _ in range(GAMES_PER_NIGHT):
+                player = rng.choice(rosters[team])
+                rival = rng.choice(rosters[opponent])
+                winner_score = rng.randint(2, 7)
+                loser_score = rng.randint(0, winner_score - 1)
+                player_wins = rng.random() < 0.5 + 0.05 * (handicaps[player] - handicaps[rival])
+                scores = (winner_score, loser_score) if player_wins else (loser_score, winner_score)
+                for side in ((team, player, scores[0], opponent, rival, scores[1]),
+                             (opponent, rival, scores[1], team, player, scores[0])):
+                    home_team, home, home_score, away_team, away, away_score = side
+                    won = home_score > away_score
+                    matches.append(MatchRecord(
+                        home_team, away_team, home, handicaps[home], home_score, away, handicaps[away],
+                        away_score, date, home_score == 0 or away_score == 0, home if won else away,
+                        home_team if won else away_team, handicaps[home] if won else handicaps[away],
+                        str(season_id)).to_dict())
+                for name, won in ((player, player_wins), (rival, not player_wins)):
+                    record = records.setdefault(name, [0, 0])
+                    record[0 if won else 1] += 1
+
+    stats = []
+    for team in teams:
+        for name in rosters[team]:
+            wins, losses = records.get(name, [0, 0])
+            total = wins + losses
+            stats.append(PlayerSeasonStat(team, name, handicaps[name], wins, losses, total,
+                                          f"{round(wins / total * 100, 1) if total else 0}%",
+                                          f"Division {'AB'[teams.index(team) % 2]}").to_dict())
+    return matches, stats
+
+def build_synthetic_league(data_dir, players=400, teams=40, seasons=6, weeks=14, seed=2025):
+    """Write a synthetic league (archived seasons plus a live one) into data_dir"""
+    rng = random.Random(seed)
+    archives_dir = os.path.join(data_dir, "archives")
+    names = [f"Player {i:05d}" for i in range(players)]
+    team_names = [f"Team {i:03d}" for i in range(teams)]
+    handicaps = {name: rng.randint(2, 9) for name in names}
+
+    labels = []
+    year = 2020
+    while len(labels) < seasons + 1:
+        for season_name in ('Spring', 'Summer', 'Fall'):
+            labels.append((season_name, year))
+        year += 1
+    labels = labels[:seasons + 1]
+
+    for index, (season_name, season_year) in enumerate(labels):
+        # Rosters drift a little between seasons
+        shuffled = names[:]
+        rng.shuffle(shuffled)
+        rosters = {team: shuffled[i::teams] for i, team in enumerate(team_names)}
+        for name in rng.sample(names, max(1, players // 20)):
+            handicaps[name] = min(9, max(2, handicaps[name] + rng.choice((-1, 1))))
+        matches, stats = synthetic_season(rng, season_name, 200 + index, rosters, handicaps, weeks)
+
+        if index == len(labels) - 1:
+            write_json_atomic(os.path.join(data_dir, "all_matches_latest.json"), matches)
+            write_json_atomic(os.path.join(data_dir, "player_stats_latest.json"), stats)
+            continue
+        season_dir = os.path.join(archives_dir, f"{season_name.lower()}_{season_year}")
+        write_json_atomic(os.path.join(season_dir, season_catalog.SEASON_FILES['matches']), matches)
+        write_json_atomic(os.path.join(season_dir, season_catalog.SEASON_FILES['stats']), stats)
+        write_json_atomic(os.path.join(season_dir, "metadata.json"),
+                          {'season': season_name, 'year': season_year, 'status': 'final'})
+
+    catalog = season_catalog.rebuild_catalog(archives_dir)
+    catalog['current'] = {'name': labels[-1][0], 'year': labels[-1][1]}
+    season_catalog.save_catalog(archives_dir, catalog)
+
+# ----- Page fixtures -----
+
+def render_team_pages(matches):
+    """Team scouting report pages (team name -> html) holding each team's scraped rows"""
+    nights = {}
+    for match in matches:
+        night = nights.setdefault(match['homeTeam'], {}).setdefault((match['date'], match['awayTeam']), [])
+        night.append(match)
+
+    pages = {}
+    for team, team_nights in nights.items():
+        parts = [f"<html><body><h4>Full Season Schedule for {html.escape(team)} (Download)</h4>",
+                 '<table class="tableteir2"><tr><td>Week</td><td>Date</td><td>Opponent</td></tr>']
+        for week, (date, opponent) in enumerate(team_nights, 1):
+            parts.append(f"<tr><td>{week}</td><td>{html.escape(date)}</td><td>{html.escape(opponent)}</td></tr>")
+        parts.append("</table>")
+        for (date, opponent), rows in team_nights.items():
+            parts.append(f'<table class="tableteir2"><tr><td>{html.escape(team)} vs. {html.escape(opponent)}</td>'
+                         f'<td>{html.escape(date)}</td></tr>'
+                         '<tr><td>Player</td><td>H</td><td>S</td><td>Player</td><td>H</td><td>S</td></tr>')
+            for row in rows:
+                parts.append(''.join(f"<td>{html.escape(str(row[field]))}</td>" for field in
+                                     ('homePlayer', 'homeHCP', 'homeScore', 'awayPlayer', 'awayHCP', 'awayScore'))
+                             .join(('<tr>', '</tr>')))
+            parts.append("<tr><td>TOTALS</td><td></td><td></td><td></td><td></td><td></td></tr></table>")
+        parts.append("</body></html>")
+        pages[team] = '\n'.join(parts)
+    return pages
+
+def render_standings(stats, session="Spring 2025"):
+    """An individual standings page holding the given standings rows"""
+    parts = [f"<html><body><table><tr><td>Team 8-Ball League - {session} Session Updated on today</td></tr></table>"]
+    division = None
+    teams = {}
+    for stat in stats:
+        teams.setdefault((stat.get('division'), stat['team']), []).append(stat)
+    for (team_division, team), rows in teams.items():
+        if team_division and team_division != division:
+            division = team_division
+            parts.append(f'<table class="tableteir2"><tr><td bgcolor="#C0C0C0">{html.escape(division)}</td></tr></table>')
+        parts.append(f'<table class="tableteir2"><tr><td class="data_level_1_nobg" style="color:#970000">'
+                     f'{html.escape(team)}</td></tr><tr>' + '<td class="data_level_3">-</td>' * 10 + '</tr>')
+        for i, row in enumerate(rows, 1):
+            cells = [i, row['name'], row['handicap'], '', '', row['wins'], row['losses'], row['total'],
+                     row['winPercentage'], '']
+            parts.append(''.join(f"<td>{html.escape(str(cell))}</td>" for cell in cells).join(('<tr>', '</tr>')))
+        parts.append("</table>")
+    parts.append("</body></html>")
+    return '\n'.join(parts)
+
+# ----- Runs -----
+
+def _timed(fn, repeat):
+    """(result of the last run, best wall time in seconds)"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+@contextlib.contextmanager
+def stdlib_json():
+    """Decode with the standard library json module for the duration"""
+    saved = json_backend.orjson
+    json_backend.orjson = None
+    try:
+        yield
+    finally:
+        json_backend.orjson = saved
+
+def parser_available(engine):
+    from bs4 import BeautifulSoup
+    try:
+        BeautifulSoup("<p></p>", engine)
+        return True
+    except Exception:
+        return False
+
+def parse_fixture(pages, standings, engine):
+    """Normalized parse of every team page and the standings page with one tree builder"""
+    matches = []
+    schedule = []
+    for team, page in pages.items():
+        matches.extend(match.to_dict() for match in parse_team_page(page, team, None, schedule, parser=engine))
+    session, players = parse_standings(standings, parser=engine)
+    return {'matches': matches, 'schedule': schedule, 'session': session,
+            'players': [player.to_dict() for player in players]}
+
+def _round_trip_fields(match):
+    return {key: match.get(key) for key in ('homeTeam', 'awayTeam', 'homePlayer', 'homeHCP', 'homeScore',
+                                            'awayPlayer', 'awayHCP', 'awayScore', 'date', 'forfeit',
+                                            'winner', 'winnerTeam', 'winnerHCP')}
+
+def check_parsers(label, matches, stats, repeat, report):
+    """Compare every installed tree builder against html.parser on pages rendered from the records"""
+    pages = render_team_pages(matches)
+    standings = render_standings(stats)
+    reference, reference_time = _timed(lambda: parse_fixture(pages, standings, PARSER_ENGINES[0]), repeat)
+
+    # The reference must reproduce the records the pages were rendered from
+    source_rows = sorted(json.dumps(_round_trip_fields(m), sort_keys=True) for m in matches)
+    parsed_rows = sorted(json.dumps(_round_trip_fields(m), sort_keys=True) for m in reference['matches'])
+    source_players = [{key: value for key, value in stat.items() if key not in ('teamId', 'playerId')}
+                      for stat in stats]
+    report.add(label, 'parse', PARSER_ENGINES[0], reference_time, reference_time,
+               source_rows == parsed_rows and source_players == reference['players'])
+
+    for engine in PARSER_ENGINES[1:]:
+        if not parser_available(engine):
+            report.skip(label, 'parse', engine, "not installed")
+            continue
+        output, elapsed = _timed(lambda: parse_fixture(pages, standings, engine), repeat)
+        report.add(label, 'parse', engine, elapsed, reference_time, output == reference)
+
+def _combine(data_dir, registry_path, **options):
+    """Normalized player histories, team aggregates and skill games from one combiner configuration"""
+    combiner = SeasonDataCombiner(data_dir=data_dir, archives_dir=os.path.join(data_dir, "archives"),
+                                  identities=IdentityRegistry.load(registry_path), **options)
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        history = combiner.generate_player_history()
+    skill_games = combiner.skill_games
+    return {
+        'player_history': json.loads(encode_json(history, to_history_json)),
+        'team_summary': combiner.team_aggregates.team_summary(),
+        'team_pairs': combiner.team_aggregates.team_pairs(),
+        'skill_games': sorted(zip(skill_games.players, skill_games.opponents,
+                                  skill_games.outcomes, skill_games.handicap_diffs))
+    }
+
+def _misspelled(records, fields):
+    """Copies of records with every third one's names misspelled, like a scrape the site later corrected"""
+    copies = []
+    for position, record in enumerate(records):
+        record = dict(record)
+        if position % 3 == 0:
+            for field in fields:
+                if record.get(field):
+                    record[field] += 'x'
+        copies.append(record)
+    return copies
+
+def _fill_store(data_dir, registry_path, db_path, rescrape=False, live_only=False):
+    """A SQLite store holding the same seasons as the data folder.
+
+    With rescrape, each season is first written with misspelled names and then
+    written again as recorded, as when a corrected page is scraped again. With
+    live_only, only the live season is written and the archived ones are
+    imported from the catalog, as for a store created after they were archived.
+    """
+    store = LeagueStore(db_path)
+    combiner = SeasonDataCombiner(data_dir=data_dir, archives_dir=os.path.join(data_dir, "archives"),
+                                  identities=IdentityRegistry.load(registry_path), load_workers=1)
+    current = combiner.catalog.get('current') or {}
+    by_season = {}
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        for record_type, season, record in combiner.iter_season_records():
+            rows = by_season.setdefault(season['dir'], (season, [], []))
+            rows[1 if record_type == 'match' else 2].append(record)
+    for key, (season, matches, stats) in by_season.items():
+        active = key == 'current'
+        if live_only and not active:
+            continue
+        name = current.get('name', 'Current') if active else season['name']
+        store.upsert_season(key, name, season['year'], status='active' if active else 'final')
+        if rescrape:
+            store.replace_season_matches(key, name, _misspelled(matches, ('homePlayer', 'awayPlayer')))
+            store.replace_season_player_stats(key, _misspelled(stats, ('name',)))
+        store.replace_season_matches(key, name, matches)
+        store.replace_season_player_stats(key, stats)
+    if live_only:
+        store.import_catalog(os.path.join(data_dir, "archives"))
+    return store
+
+def check_combiner(label, data_dir, repeat, report, history_workers=2):
+    """Compare every combiner engine against the streaming stdlib-json reference on one data folder"""
+    registry_path = os.path.join(data_dir, "identity_registry.json")
+    # Register every name once so all engines see the same ids
+    with stdlib_json():
+        with contextlib.redirect_stdout(open(os.devnull, 'w')):
+            combiner = SeasonDataCombiner(data_dir=data_dir, archives_dir=os.path.join(data_dir, "archives"),
+                                          load_workers=1)
+            for _, _, record in combiner.iter_season_records():
+                for field in ('homePlayer', 'awayPlayer', 'name'):
+                    combiner.identities.player_id(record.get(field))
+                for field in ('homeTeam', 'awayTeam', 'team'):
+                    combiner.identities.team_id(record.get(field))
+        combiner.identities.save()
+        reference, reference_time = _timed(lambda: _combine(data_dir, registry_path, load_workers=1), repeat)
+    report.add(label, 'combine', 'reference', reference_time, reference_time, True)
+
+    engines = [
+        ('orjson', lambda: _combine(data_dir, registry_path, load_workers=1), json_backend.orjson is not None),
+        ('threaded-load', lambda: _combine(data_dir, registry_path, load_workers=4), True),
+        ('process-load', lambda: _combine(data_dir, registry_path, load_workers=4, load_executor='process'), True),
+        ('sharded-history', lambda: _combine(data_dir, registry_path, load_workers=1,
+                                             history_workers=history_workers), True),
+    ]
+    for engine, run, available in engines:
+        if not available:
+            report.skip(label, 'combine', engine, "not installed")
+            continue
+        output, elapsed = _timed(run, repeat)
+        report.add(label, 'combine', engine, elapsed, reference_time, output == reference)
+
+    for engine, db_file, rescrape, live_only in (('sqlite-store', "league.db", False, False),
+                                                 ('sqlite-rescrape', "league_rescrape.db", True, False),
+                                                 ('sqlite-import', "league_import.db", False, True)):
+        store = _fill_store(data_dir, registry_path, os.path.join(data_dir, db_file), rescrape, live_only)
+        try:
+            output, elapsed = _timed(lambda: _combine(data_dir, registry_path, store=store), repeat)
+            report.add(label, 'combine', engine, elapsed, reference_time, output == reference)
+        finally:
+            store.close()
+
+def _schedule_fixture(data_dir, registry_path):
+    """(team summary, schedule, unplayed fixtures): the live season's played nights plus one more week"""
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        team_summary = _combine(data_dir, registry_path, load_workers=1)['team_summary']
+    label = current_season_label(team_summary)
+    schedule = []
+    for name, team in sorted(team_summary.items()):
+        weeks = team['seasons'].get(label, {}).get('weeks', []) if label else []
+        for week, night in enumerate(weeks, 1):
+            schedule.append({'week': week, 'date': night['date'], 'team': name, 'opponent': night['opponent']})
+    unplayed = [dict(fixture, week=fixture['week'] + 100, date="December 31st") for fixture in schedule]
+    return team_summary, schedule + unplayed, unplayed
+
+def check_schedule(label, data_dir, repeat, report):
+    """Unplayed fixtures must not depend on how the schedule spells team names and dates"""
+    registry_path = os.path.join(data_dir, "identity_registry.json")
+    team_summary, schedule, unplayed = _schedule_fixture(data_dir, registry_path)
+    if not unplayed:
+        report.skip(label, 'schedule', 'reference', "no live results")
+        return
+    season_label = current_season_label(team_summary)
+    reference, reference_time = _timed(
+        lambda: remaining_fixtures(schedule, team_summary, season_label, IdentityRegistry.load(registry_path)), repeat)
+    report.add(label, 'schedule', 'reference', reference_time, reference_time, reference == unplayed)
+
+    # One team renamed on the site (reconciliation recorded the new spelling as an
+    # alias) and dates written without ordinal suffixes
+    identities = IdentityRegistry.load(registry_path)
+    renamed_from = schedule[0]['team']
+    renamed_to = f"The {renamed_from}"
+    identities.add_alias('teams', renamed_to, identities.team_id(renamed_from))
+    respelled = [dict(fixture, date=fixture['date'].rstrip('stndrh'),
+                      team=renamed_to if fixture['team'] == renamed_from else fixture['team'],
+                      opponent=renamed_to if fixture['opponent'] == renamed_from else fixture['opponent'])
+                 for fixture in schedule]
+    output, elapsed = _timed(lambda: remaining_fixtures(respelled, team_summary, season_label, identities), repeat)
+    expected = [respelled[schedule.index(fixture)] for fixture in unplayed]
+    report.add(label, 'schedule', 'renamed-team', elapsed, reference_time, output == expected)
+
+class Report:
+    def __init__(self):
+        self.rows = []
+
+    def add(self, fixture, stage, engine, elapsed, reference_time, identical):
+        self.rows.append((fixture, stage, engine, elapsed, reference_time / elapsed if elapsed else None,
+                          'identical' if identical else 'DIFFERS'))
+
+    def skip(self, fixture, stage, engine, reason):
+        self.rows.append((fixture, stage, engine, None, None, f"skipped ({reason})"))
+
+    @property
+    def failed(self):
+        return [row for row in self.rows if row[5] == 'DIFFERS']
+
+    def print(self):
+        print(f"{'fixture':<12} {'stage':<8} {'engine':<16} {'time':>10} {'speedup':>8}  result")
+        for fixture, stage, engine, elapsed, speedup, result in self.rows:
+            time_text = f"{elapsed * 1000:.1f} ms" if elapsed is not None else '-'
+            speedup_text = f"{speedup:.2f}x" if speedup is not None else '-'
+            print(f"{fixture:<12} {stage:<8} {engine:<16} {time_text:>10} {speedup_text:>8}  {result}")
+
+def _season_records(data_dir):
+    """(matches, stats) of the data folder's latest season that has both"""
+    seasons = {}
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        combiner = SeasonDataCombiner(data_dir=data_dir, archives_dir=os.path.join(data_dir, "archives"),
+                                      load_workers=1)
+        for record_type, season, record in combiner.iter_season_records():
+            rows = seasons.setdefault(season['dir'], ([], []))
+            rows[0 if record_type == 'match' else 1].append(record)
+    complete = [rows for rows in seasons.values() if rows[0] and rows[1]]
+    matches, stats = complete[-1] if complete else next(iter(seasons.values()), ([], []))
+    strip = ('homeTeamId', 'awayTeamId', 'homePlayerId', 'awayPlayerId')
+    return ([{key: value for key, value in match.items() if key not in strip} for match in matches],
+            [{key: value for key, value in stat.items() if key not in ('teamId', 'playerId')} for stat in stats])
+
+def main():
+    parser = argparse.ArgumentParser(description="Check fast pipeline paths against the reference implementations")
+    parser.add_argument('--data-dir', default="public/data", help="Recorded data folder (copied, not modified)")
+    parser.add_argument('--players', type=int, default=400, help="Synthetic league size")
+    parser.add_argument('--teams', type=int, default=40)
+    parser.add_argument('--seasons', type=int, default=6, help="Archived synthetic seasons (plus a live one)")
+    parser.add_argument('--weeks', type=int, default=14)
+    parser.add_argument('--seed', type=int, default=2025)
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per engine; the best time is reported")
+    parser.add_argument('--history-workers', type=int, default=2)
+    parser.add_argument('--skip-recorded', action='store_true')
+    parser.add_argument('--skip-synthetic', action='store_true')
+    args = parser.parse_args()
+
+    report = Report()
+    work_dir = tempfile.mkdtemp(prefix="parity_")
+    try:
+        fixtures = []
+        if not args.skip_recorded and os.path.isdir(args.data_dir):
+            recorded = os.path.join(work_dir, "recorded")
+            shutil.copytree(args.data_dir, recorded, ignore=shutil.ignore_patterns("combined", "*.db"))
+            fixtures.append(('recorded', recorded))
+        if not args.skip_synthetic:
+            synthetic = os.path.join(work_dir, "synthetic")
+            build_synthetic_league(synthetic, args.players, args.teams, args.seasons, args.weeks, args.seed)
+            fixtures.append(('synthetic', synthetic))
+
+        for label, data_dir in fixtures:
+            print(f"Checking {label} data ({data_dir})...")
+            matches, stats = _season_records(data_dir)
+            check_parsers(label, matches, stats, args.repeat, report)
+            check_combiner(label, data_dir, args.repeat, report, args.history_workers)
+            check_schedule(label, data_dir, args.repeat, report)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report.print()
+    if report.failed:
+        print(f"{len(report.failed)} engine(s) differ from the reference output.")
+        sys.exit(1)
+    print("Every engine matches the reference output.")
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,25 @@
-import requests
+import argparse
 from bs4 import BeautifulSoup
 import json
 import re
-import time
 import os
-import urllib.parse
 from datetime import datetime
 
+import season_catalog
+import changefeed
+import profiling
+from league_store import LeagueStore
+from identity_registry import IdentityRegistry
+from records import PlayerSeasonStat, to_json
+from artifact_writer import ArtifactBatch, encode_json
+from archive_store import archive_season_payload, record_latest_payload, season_ref, latest_ref
+from crawl_scheduler import CrawlScheduler, PageFetchError
+from crawl_journal import CrawlJournal
+from league_config import load_config, select_leagues, league_url, archives_dir as league_archives_dir, build_headers
+
 # Get authentication cookie from environment variable
 AUTH_COOKIE = os.environ.get('AUTH_COOKIE', '')
 
-# Headers with authentication
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-    'Referer': 'https://leagues3.amsterdambilliards.com/8ball/abc/index.php?foo=bar',
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-    'Accept-Language': 'en-US,en;q=0.9',
-    'Upgrade-Insecure-Requests': '1',
-    'sec-ch-ua': '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
-    'sec-ch-ua-mobile': '?0',
-    'sec-ch-ua-platform': '"macOS"',
-    'Cookie': AUTH_COOKIE
-}
-
 # Season date definitions
 SEASONS = {
     'Spring': {'start': '01-15', 'end': '05-19'},
@@ -82,22 +79,17 @@ def create_season_archive_info(current_season):
         "description": f"Final archive of {current_season['name']} {current_season['year']} season"
     }
 
-def fetch_individual_standings():
-    """Fetch the individual standings page"""
-    print("Fetching individual standings page...")
+def fetch_individual_standings(league, scheduler, page="individual_standings.php"):
+    """Fetch a league's individual standings page (or a past season's, via page)"""
+    print(f"[{league['id']}] Fetching individual standings page...")
     
-    url = "https://leagues3.amsterdambilliards.com/8ball/abc/individual_standings.php"
+    url = league_url(league, page)
     
-    try:
-        response = requests.get(url, headers=HEADERS)
-        if response.status_code != 200:
-            print(f"Error accessing {url}: Status code {response.status_code}")
-            return None
-        
-        return response.text
-    except Exception as e:
-        print(f"Error fetching individual standings: {str(e)}")
-        return None
+    response = scheduler.fetch(url, headers=build_headers(league, AUTH_COOKIE))
+    if response.status_code != 200:
+        raise PageFetchError(f"Error accessing {url}: Status code {response.status_code}")
+    
+    return response.text
 
 def extract_season_info(soup):
     """Extract the season information from the page"""
@@ -183,69 +175,52 @@ def extract_player_stats(soup):
                 # If conversion fails, skip this row
                 continue
             
-            player_data = {
-                "team": team_name,
-                "name": player_name,
-                "handicap": handicap,
-                "wins": wins,
-                "losses": losses,
-                "total": total_games,
-                "winPercentage": f"{win_percentage}%",
-                "division": current_division
-            }
+            player_data = PlayerSeasonStat(
+                team_name, player_name, handicap, wins, losses, total_games,
+                f"{win_percentage}%", current_division
+            )
             
             all_players.append(player_data)
     
     return all_players
 
-def main():
-    # Create output directory
-    os.makedirs("public/data", exist_ok=True)
-    
-    # Create archives directory
-    archives_dir = "public/data/archives"
+def parse_standings(html_content, parser='html.parser'):
+    """Season info and player rows from an individual standings page"""
+    soup = BeautifulSoup(html_content, parser)
+    return extract_season_info(soup), extract_player_stats(soup)
+
+def save_league_stats(league, players, current_season, identities=None):
+    """Write a league's standings files (and season archive) under its output directory"""
+    output_dir = league['output_dir']
+    archives_dir = league_archives_dir(league)
+    os.makedirs(output_dir, exist_ok=True)
     os.makedirs(archives_dir, exist_ok=True)
     
-    # Determine current season
-    current_season = determine_current_season()
-    print(f"Current season: {current_season['name']} {current_season['year']}")
-    
-    # Verify authentication cookie is present
-    if not AUTH_COOKIE:
-        print("WARNING: Authentication cookie is missing. Results may be limited.")
-    
-    # Fetch individual standings page
-    html_content = fetch_individual_standings()
-    if not html_content:
-        print("Failed to fetch individual standings page. Exiting.")
-        return
-    
-    # Parse HTML
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    # Extract season information
-    season_info = extract_season_info(soup)
-    print(f"Season: {season_info.get('session', 'Unknown')}")
-    print(f"Last Updated: {season_info.get('updated', 'Unknown')}")
-    
-    # Extract player statistics
-    players = extract_player_stats(soup)
-    
-    if not players:
-        print("No player data found. Check the page structure or authentication.")
-        return
+    # Stamp stable player/team ids; the standings spelling is the display name
+    identities = identities or IdentityRegistry.for_data_dir(output_dir)
+    for player in players:
+        identities.annotate_player_stat(player, prefer=True)
+    identities.save()
     
     # Get current season as string
     current_season_str = f"{current_season['name'].lower()}_{current_season['year']}"
     
+    # All outputs are staged and written together; unchanged files are skipped
+    batch = ArtifactBatch()
+    players_json = encode_json(players, to_json)
+    
     # Save latest version (always updated regardless of season ending)
-    with open("public/data/player_stats_latest.json", 'w') as f:
-        json.dump(players, f, indent=2)
+    latest_file = f"{output_dir}/player_stats_latest.json"
+    batch.stage_bytes(latest_file, players_json)
+    
+    # Diff against the snapshot being replaced and append it to the changefeed
+    changefeed.record_delta(output_dir, 'stats', current_season_str,
+                            changefeed.load_snapshot(latest_file), [p.to_dict() for p in players])
     
     # Group players by team
     teams = {}
     for player in players:
-        team_name = player.get("team")
+        team_name = player.team
         if team_name not in teams:
             teams[team_name] = []
         teams[team_name].append(player)
@@ -256,16 +231,23 @@ def main():
         safe_team_name = re.sub(r'[^\w\s-]', '', team_name).strip().replace(' ', '_')
         
         # Latest version
-        with open(f"data/team_{safe_team_name}_stats_latest.json", 'w') as f:
-            json.dump(team_players, f, indent=2)
+        batch.stage_json(f"{output_dir}/team_{safe_team_name}_stats_latest.json", team_players, to_json)
+    
+    # The season's copy lives in the archive store (stored once per distinct payload)
+    record_latest_payload(archives_dir, current_season_str, 'stats', players_json)
+    
+    # Record which season the latest files belong to
+    season_catalog.record_current_season(archives_dir, current_season)
     
-    # Save current season version
-    current_season_file = f"public/data/player_stats_{current_season_str}.json"
-    with open(current_season_file, 'w') as f:
-        json.dump(players, f, indent=2)
+    # Mirror the standings into the SQLite store when one is configured
+    store = LeagueStore.for_league(league)
+    if store:
+        store.upsert_season(current_season_str, current_season['name'], current_season['year'])
+        store.replace_season_player_stats(current_season_str, [p.to_dict() for p in players])
         
     # Check if the season is ending soon
-    if is_season_ending_soon():
+    season_ending = is_season_ending_soon()
+    if season_ending:
         print(f"NOTICE: The {current_season['name']} {current_season['year']} season is ending soon!")
         print("Creating final season archive...")
         
@@ -273,10 +255,9 @@ def main():
         season_archive_dir = f"{archives_dir}/{current_season_str}"
         os.makedirs(season_archive_dir, exist_ok=True)
         
-        # Archive the data with FINAL tag
-        archive_file = f"{season_archive_dir}/player_stats_FINAL.json"
-        with open(archive_file, 'w') as f:
-            json.dump(players, f, indent=2)
+        # Archive the data with FINAL tag (stored once in the content-addressed store)
+        archive_ref = season_ref(current_season_str, 'stats')
+        archive_season_payload(archives_dir, current_season_str, 'stats', players_json)
         
         # Create metadata file with archive info or update if exists
         metadata_file = f"{season_archive_dir}/metadata.json"
@@ -290,33 +271,112 @@ def main():
             metadata = create_season_archive_info(current_season)
             metadata['player_stats_archived'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             
-        with open(metadata_file, 'w') as f:
-            json.dump(metadata, f, indent=2)
+        batch.stage_json(metadata_file, metadata)
         
-        print(f"Final season player stats archived to {archive_file}")
+        print(f"Final season player stats archived to {archive_ref}")
         
         # Also archive team-specific files in the archive directory
         for team_name, team_players in teams.items():
             safe_team_name = re.sub(r'[^\w\s-]', '', team_name).strip().replace(' ', '_')
-            team_archive_file = f"{season_archive_dir}/team_{safe_team_name}_stats_FINAL.json"
-            with open(team_archive_file, 'w') as f:
-                json.dump(team_players, f, indent=2)
+            archive_season_payload(archives_dir, current_season_str, f"teams/{safe_team_name}",
+                                   encode_json(team_players, to_json))
+        batch.commit()
+        
+        # Refresh the season catalog so the combiner picks up the new archive
+        season_catalog.update_season(archives_dir, current_season_str)
+        if store:
+            store.upsert_season(current_season_str, current_season['name'], current_season['year'], status='final')
+    
+    batch.commit()
     
     # Print summary
-    print(f"Scraping completed.")
+    print(f"[{league['id']}] Scraping completed.")
     print(f"Total players collected: {len(players)}")
     print(f"Total teams found: {len(teams)}")
+    batch.report()
     print(f"Data saved to:")
-    print(f"  - data/player_stats_latest.json")
-    print(f"  - {current_season_file}")
+    print(f"  - {output_dir}/player_stats_latest.json")
+    print(f"  - {archives_dir}/store ({latest_ref(current_season_str, 'stats')})")
     
     for team_name in teams.keys():
         safe_team_name = re.sub(r'[^\w\s-]', '', team_name).strip().replace(' ', '_')
-        print(f"  - data/team_{safe_team_name}_stats_latest.json")
+        print(f"  - {output_dir}/team_{safe_team_name}_stats_latest.json")
         
-    if is_season_ending_soon():
-        print(f"  - {archives_dir}/{current_season_str}/player_stats_FINAL.json (Season Archive)")
+    if season_ending:
+        print(f"  - {archives_dir}/store ({season_ref(current_season_str, 'stats')}, Season Archive)")
         print(f"  - {archives_dir}/{current_season_str}/metadata.json")
 
+def scrape_league(league, scheduler, current_season, journal):
+    """Fetch, parse and save one league's individual standings"""
+    url = league_url(league, "individual_standings.php")
+    
+    rows = journal.completed(url)
+    if rows is not None:
+        players = [PlayerSeasonStat.from_dict(row) for row in rows]
+        print(f"[{league['id']}] Reusing {len(players)} journaled standings rows")
+        save_league_stats(league, players, current_season)
+        return
+    
+    # Fetch individual standings page
+    try:
+        html_content = fetch_individual_standings(league, scheduler)
+    except Exception as e:
+        print(f"[{league['id']}] Failed to fetch individual standings page: {str(e)}")
+        journal.record_failure(url, str(e))
+        return
+    
+    season_info, players = parse_standings(html_content)
+    print(f"[{league['id']}] Season: {season_info.get('session', 'Unknown')}")
+    print(f"[{league['id']}] Last Updated: {season_info.get('updated', 'Unknown')}")
+    
+    if not players:
+        print(f"[{league['id']}] No player data found. Check the page structure or authentication.")
+        journal.record_failure(url, "no player rows parsed")
+        return
+    
+    journal.record_page(url, [player.to_dict() for player in players])
+    save_league_stats(league, players, current_season)
+
+def run(leagues, scheduler, resume=False):
+    """Scrape standings for all leagues concurrently through one scheduler"""
+    # Determine current season
+    current_season = determine_current_season()
+    print(f"Current season: {current_season['name']} {current_season['year']}")
+    
+    # Verify authentication cookie is present
+    if not AUTH_COOKIE:
+        print("WARNING: Authentication cookie is missing. Results may be limited.")
+    
+    # A journal from another season can't be resumed into this one
+    run_key = f"{current_season['name'].lower()}_{current_season['year']}"
+    journals = {league['id']: CrawlJournal.open(league['id'], 'standings', run_key, resume) for league in leagues}
+    
+    futures = [(league, scheduler.submit(scrape_league, league, scheduler, current_season, journals[league['id']]))
+               for league in leagues]
+    for league, future in futures:
+        try:
+            future.result()
+        except Exception as e:
+            print(f"Error scraping standings for league {league['id']}: {str(e)}")
+            # The checkpoint is only dropped once the standings are written
+            journals[league['id']].close(keep=True)
+        else:
+            journals[league['id']].close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape individual standings for every configured league")
+    parser.add_argument('--leagues', help="Path to the league config (default: scrapers/leagues.json)")
+    parser.add_argument('--league', action='append', help="Only crawl this league id (repeatable)")
+    parser.add_argument('--resume', action='store_true', help="Reuse the standings page journaled by an interrupted run")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiling.from_args(args)
+    
+    config = load_config(args.leagues)
+    leagues = select_leagues(config, args.league)
+    
+    with CrawlScheduler.from_config(config) as scheduler, profiler.stage('scrape_standings'):
+        run(leagues, scheduler, resume=args.resume)
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,131 @@
+"""
+Opt-in profiling for pipeline stages (--profile on run_pipeline.py, the
+scrapers and the combiner).
+
+Each stage wrapped in StageProfiler.stage() produces, in the profile folder:
+  <stage>.prof        cProfile stats (pstats / snakeviz / gprof2dot)
+  <stage>.collapsed   sampled stacks of every thread, one "a;b;c count" line
+                      per stack, ready for flamegraph.pl or speedscope
+  <stage>.tracemalloc tracemalloc snapshot (tracemalloc.Snapshot.load)
+and prints the top N functions by own time and the top N allocation sites.
+cProfile only sees the thread that entered the stage; the stack sampler
+covers the scrapers' worker threads too.
+"""
+import os
+import sys
+import time
+import pstats
+import cProfile
+import threading
+import tracemalloc
+from contextlib import contextmanager
+
+DEFAULT_PROFILE_DIR = "profiles"
+DEFAULT_TOP_N = 15
+SAMPLE_INTERVAL = 0.005
+
+def add_profile_arguments(parser):
+    """Add the shared --profile/--profile-top options to an argparse parser"""
+    parser.add_argument('--profile', nargs='?', const=DEFAULT_PROFILE_DIR, default=None, metavar='DIR',
+                        help=f"Profile each stage and write the results to DIR (default: {DEFAULT_PROFILE_DIR})")
+    parser.add_argument('--profile-top', type=int, default=DEFAULT_TOP_N, metavar='N',
+                        help=f"Hot functions and allocation sites to print per stage (default: {DEFAULT_TOP_N})")
+
+def from_args(args):
+    """A StageProfiler for --profile, or a no-op one when it wasn't given"""
+    return StageProfiler(args.profile, args.profile_top)
+
+class StackSampler(threading.Thread):
+    """Background thread that counts the stacks of all other threads"""
+
+    def __init__(self, interval=SAMPLE_INTERVAL):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.counts = {}
+        self.stopped = threading.Event()
+
+    def run(self):
+        own_id = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                key = ';'.join(reversed(stack))
+                self.counts[key] = self.counts.get(key, 0) + 1
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+
+    def write_collapsed(self, path):
+        with open(path, 'w') as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+class StageProfiler:
+    def __init__(self, output_dir=None, top_n=DEFAULT_TOP_N):
+        self.output_dir = output_dir
+        self.top_n = top_n
+
+    @property
+    def enabled(self):
+        return self.output_dir is not None
+
+    @contextmanager
+    def stage(self, name):
+        """Profile the wrapped block as one stage (does nothing when profiling is off)"""
+        if not self.enabled:
+            yield
+            return
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        base = os.path.join(self.output_dir, name)
+
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start(25)
+        sampler = StackSampler()
+        sampler.start()
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed = time.perf_counter() - start
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+            if started_tracing:
+                tracemalloc.stop()
+
+            profiler.dump_stats(f"{base}.prof")
+            sampler.write_collapsed(f"{base}.collapsed")
+            snapshot.dump(f"{base}.tracemalloc")
+            self._report(name, base, profiler, snapshot, elapsed, peak)
+
+    def _report(self, name, base, profiler, snapshot, elapsed, peak):
+        print("\n" + "-" * 50)
+        print(f"PROFILE: {name} ({elapsed:.2f}s, peak traced memory {peak / 1024 / 1024:.1f} MiB)")
+        print("-" * 50)
+        print(f"Top {self.top_n} functions by own time:")
+        pstats.Stats(profiler).sort_stats('tottime').print_stats(self.top_n)
+
+        print(f"Top {self.top_n} allocation sites:")
+        snapshot = snapshot.filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        for stat in snapshot.statistics('lineno')[:self.top_n]:
+            frame = stat.traceback[0]
+            print(f"  {stat.size / 1024:10.1f} KiB  {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+
+        print(f"Profile files: {base}.prof, {base}.collapsed, {base}.tracemalloc")
@@ -0,0 +1,333 @@
+#!/usr/bin/env python3
+"""
+Local read-only JSON query server over the league data.
+
+Serves exactly the slice a client needs instead of whole static files:
+
+    /player?name=...                         profile (summary + season stats)
+    /matches?name=...&page=1&per_page=20     paginated match history, newest first
+    /head-to-head?player1=...&player2=...    head-to-head record and games
+    /team?name=...                           current roster with ratings
+    /matchup?home=...&away=...               win probability for one pairing
+    /matchup?home_team=...&away_team=...     probabilities for every roster pairing
+
+Responses are cached in an LRU keyed by endpoint and parameters. The cache is
+dropped as soon as the data source reports a new generation, i.e. when a
+pipeline run has rewritten the combined output files.
+"""
+import os
+import json
+import argparse
+import functools
+import threading
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import json_backend
+from match_keys import dedupe_matches
+from season_catalog import date_sort_key, real_season_name
+from season_combiner import SeasonDataCombiner
+from matchup_probability import (MatchIndex, enrich_player_stats, calculate_win_probability,
+                                 get_head_to_head_record)
+
+MAX_PER_PAGE = 100
+
+class QueryError(Exception):
+    """A request that can't be answered, with the HTTP status to report"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+class LeagueData:
+    """Immutable in-memory indexes over one generation of league data"""
+
+    def __init__(self, seasons, player_matches, player_stats, current_stats, current_matches, player_summary):
+        self.seasons = seasons
+        self.player_matches = player_matches
+        self.player_stats = player_stats
+        self.player_summary = player_summary
+        self.current_stats = enrich_player_stats(current_stats, player_summary)
+        self.players_by_name = {p['name']: p for p in self.current_stats}
+        self.current_match_index = MatchIndex(current_matches)
+        self.rosters = {}
+        for player in self.current_stats:
+            self.rosters.setdefault(player.get('team'), []).append(player)
+
+    @classmethod
+    def from_records(cls, records, player_summary):
+        """Build indexes from a (record_type, season, record) stream like SeasonDataCombiner's"""
+        seasons = []
+        player_matches = {}
+        player_stats = {}
+        season_stats = {}
+        season_matches = {}
+
+        for record_type, season, record in records:
+            if not seasons or seasons[-1] is not season:
+                seasons.append(season)
+            position = len(seasons) - 1
+            if record_type == 'match':
+                season_matches.setdefault(position, []).append(record)
+            else:
+                season_stats.setdefault(position, []).append(record)
+                row = dict(record, season_name=season['name'], season_year=season['year'])
+                player_stats.setdefault(record.get('name'), []).append(row)
+
+        # Each game once per season, annotated with where it sits chronologically
+        for position, matches in season_matches.items():
+            season = seasons[position]
+            for match in dedupe_matches(matches):
+                row = dict(match, season_name=season['name'], season_year=season['year'])
+                order = (position, date_sort_key(match.get('date'), real_season_name(season)) or (0, 0))
+                for player in {match.get('homePlayer'), match.get('awayPlayer')}:
+                    if player:
+                        player_matches.setdefault(player, []).append((order, row))
+
+        for name, rows in player_matches.items():
+            rows.sort(key=lambda item: item[0], reverse=True)
+            player_matches[name] = [row for _, row in rows]
+
+        # The app works off the latest season's raw rows with forfeits removed
+        current = len(seasons) - 1
+        current_matches = [m for m in season_matches.get(current, []) if not m.get('forfeit')]
+
+        return cls(seasons, player_matches, player_stats, season_stats.get(current, []),
+                   current_matches, player_summary)
+
+class CombinerDataSource:
+    """Data source backed by the pipeline's files and SeasonDataCombiner"""
+
+    def __init__(self, data_dir="public/data", archives_dir="public/data/archives",
+                 combined_dir="public/data/combined"):
+        self.data_dir = data_dir
+        self.archives_dir = archives_dir
+        self.summary_path = os.path.join(combined_dir, "player_summary.json")
+        self.watched_paths = [
+            self.summary_path,
+            os.path.join(combined_dir, "player_history.json"),
+            os.path.join(archives_dir, "catalog.json"),
+            os.path.join(data_dir, "all_matches_latest.json"),
+            os.path.join(data_dir, "player_stats_latest.json")
+        ]
+
+    def generation(self):
+        """Changes whenever a pipeline run rewrites any of the watched files"""
+        stamp = []
+        for path in self.watched_paths:
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def load(self):
+        combiner = SeasonDataCombiner(data_dir=self.data_dir, archives_dir=self.archives_dir)
+        summary = json_backend.load_file(self.summary_path) if os.path.exists(self.summary_path) else {}
+        return LeagueData.from_records(combiner.iter_season_records(), summary)
+
+class StaticDataSource:
+    """In-memory stand-in data source; call bump() to simulate a new pipeline run"""
+
+    def __init__(self, records, player_summary=None):
+        self.records = list(records)
+        self.player_summary = player_summary or {}
+        self._generation = 0
+
+    def bump(self, records=None, player_summary=None):
+        if records is not None:
+            self.records = list(records)
+        if player_summary is not None:
+            self.player_summary = player_summary
+        self._generation += 1
+
+    def generation(self):
+        return self._generation
+
+    def load(self):
+        return LeagueData.from_records(self.records, self.player_summary)
+
+class LeagueQueryService:
+    """Endpoint logic plus the generation-aware LRU response cache"""
+
+    def __init__(self, source, cache_size=1024):
+        self.source = source
+        self._generation = object()
+        self._data = None
+        self._lock = threading.Lock()
+        self._cached = functools.lru_cache(maxsize=cache_size)(self._execute)
+        self.endpoints = {
+            'player': self.player_profile,
+            'matches': self.match_history,
+            'head-to-head': self.head_to_head,
+            'team': self.team_roster,
+            'matchup': self.matchup
+        }
+
+    def _current(self):
+        """(generation, data) read together, reloading first if the source has moved on"""
+        generation = self.source.generation()
+        with self._lock:
+            if generation != self._generation:
+                self._data = self.source.load()
+                self._generation = generation
+                self._cached.cache_clear()
+            return self._generation, self._data
+
+    def query(self, endpoint, params):
+        """Answer a request as encoded JSON bytes"""
+        if endpoint not in self.endpoints:
+            raise QueryError(404, f"Unknown endpoint: {endpoint}")
+        generation, data = self._current()
+        # A request that started before a reload can't fill the cache for the new generation
+        return self._cached(generation, data, endpoint, tuple(sorted(params.items())))
+
+    def cache_info(self):
+        return self._cached.cache_info()
+
+    def _execute(self, generation, data, endpoint, params):
+        result = self.endpoints[endpoint](data, dict(params))
+        return json.dumps(result).encode('utf-8')
+
+    def _require(self, params, *names):
+        values = []
+        for name in names:
+            value = params.get(name)
+            if not value:
+                raise QueryError(400, f"Missing parameter: {name}")
+            values.append(value)
+        return values
+
+    def player_profile(self, data, params):
+        name, = self._require(params, 'name')
+        if name not in data.player_summary and name not in data.player_stats and name not in data.player_matches:
+            raise QueryError(404, f"Unknown player: {name}")
+
+        return {
+            'name': name,
+            'summary': data.player_summary.get(name),
+            'current': data.players_by_name.get(name),
+            'seasons': data.player_stats.get(name, []),
+            'match_count': len(data.player_matches.get(name, []))
+        }
+
+    def match_history(self, data, params):
+        name, = self._require(params, 'name')
+        try:
+            page = max(1, int(params.get('page', 1)))
+            per_page = min(MAX_PER_PAGE, max(1, int(params.get('per_page', 20))))
+        except ValueError:
+            raise QueryError(400, "page and per_page must be integers")
+
+        matches = data.player_matches.get(name)
+        if matches is None:
+            raise QueryError(404, f"No matches for player: {name}")
+
+        start = (page - 1) * per_page
+        return {
+            'name': name,
+            'page': page,
+            'per_page': per_page,
+            'total': len(matches),
+            'pages': (len(matches) + per_page - 1) // per_page,
+            'matches': matches[start:start + per_page]
+        }
+
+    def head_to_head(self, data, params):
+        player1, player2 = self._require(params, 'player1', 'player2')
+        games = [m for m in data.player_matches.get(player1, [])
+                 if {m.get('homePlayer'), m.get('awayPlayer')} == {player1, player2}]
+
+        record = get_head_to_head_record(player1, player2, MatchIndex(games))
+        record.update({'player1': player1, 'player2': player2, 'matches': games})
+        return record
+
+    def team_roster(self, data, params):
+        name, = self._require(params, 'name')
+        roster = data.rosters.get(name)
+        if roster is None:
+            raise QueryError(404, f"Unknown team: {name}")
+        return {'team': name, 'players': roster}
+
+    def matchup(self, data, params):
+        if params.get('home_team') or params.get('away_team'):
+            home_team, away_team = self._require(params, 'home_team', 'away_team')
+            home_roster = data.rosters.get(home_team)
+            away_roster = data.rosters.get(away_team)
+            if home_roster is None or away_roster is None:
+                raise QueryError(404, "Unknown team")
+
+            probabilities = {}
+            for home in home_roster:
+                probabilities[home['name']] = {
+                    away['name']: calculate_win_probability(
+                        home['name'], away['name'], data.players_by_name, data.current_match_index)
+                    for away in away_roster
+                }
+            return {'home_team': home_team, 'away_team': away_team, 'probabilities': probabilities}
+
+        home, away = self._require(params, 'home', 'away')
+        return {
+            'home': home,
+            'away': away,
+            'probability': calculate_win_probability(home, away, data.players_by_name, data.current_match_index)
+        }
+
+def make_handler(service):
+    """Request handler class bound to a query service"""
+
+    class QueryHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urllib.parse.urlparse(self.path)
+            endpoint = parsed.path.strip('/')
+            params = {key: values[0] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+
+            try:
+                body = service.query(endpoint, params)
+                status = 200
+            except QueryError as e:
+                body = json.dumps({'error': e.message}).encode('utf-8')
+                status = e.status
+            except Exception as e:
+                print(f"Error answering {self.path}: {str(e)}")
+                body = json.dumps({'error': "Internal server error"}).encode('utf-8')
+                status = 500
+
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    return QueryHandler
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve league data queries over local HTTP")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--data-dir', default='public/data')
+    parser.add_argument('--archives-dir', default='public/data/archives')
+    parser.add_argument('--combined-dir', default='public/data/combined')
+    parser.add_argument('--cache-size', type=int, default=1024)
+    args = parser.parse_args()
+
+    source = CombinerDataSource(args.data_dir, args.archives_dir, args.combined_dir)
+    service = LeagueQueryService(source, cache_size=args.cache_size)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service))
+
+    print(f"Serving league data on http://{args.host}:{args.port}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Shutting down query server.")
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,211 @@
+"""
+Compact record types used inside the scrapers and the combiner.
+
+Matches and stat rows are held as __slots__ objects instead of per-row dicts,
+which cuts per-record memory several-fold and makes attribute access in the
+hot loops cheaper. They are only turned into dicts when written out, either
+explicitly with to_dict() or through to_json() as a json.dump default hook.
+"""
+
+class MatchRecord:
+    """One scraped game row, as seen from the page of the team it was scraped from"""
+
+    __slots__ = ('home_team', 'away_team', 'home_player', 'home_hcp', 'home_score',
+                 'away_player', 'away_hcp', 'away_score', 'date', 'forfeit', 'winner',
+                 'winner_team', 'winner_hcp', 'season_id', 'season_title',
+                 'home_team_id', 'away_team_id', 'home_player_id', 'away_player_id')
+
+    def __init__(self, home_team, away_team, home_player, home_hcp, home_score,
+                 away_player, away_hcp, away_score, date, forfeit, winner,
+                 winner_team, winner_hcp, season_id, season_title=None,
+                 home_team_id=None, away_team_id=None, home_player_id=None, away_player_id=None):
+        self.home_team = home_team
+        self.away_team = away_team
+        self.home_player = home_player
+        self.home_hcp = home_hcp
+        self.home_score = home_score
+        self.away_player = away_player
+        self.away_hcp = away_hcp
+        self.away_score = away_score
+        self.date = date
+        self.forfeit = forfeit
+        self.winner = winner
+        self.winner_team = winner_team
+        self.winner_hcp = winner_hcp
+        self.season_id = season_id
+        self.season_title = season_title
+        self.home_team_id = home_team_id
+        self.away_team_id = away_team_id
+        self.home_player_id = home_player_id
+        self.away_player_id = away_player_id
+
+    @classmethod
+    def from_dict(cls, data):
+        """Build a record from the scraper's JSON shape"""
+        return cls(data.get('homeTeam'), data.get('awayTeam'), data.get('homePlayer'),
+                   data.get('homeHCP'), data.get('homeScore'), data.get('awayPlayer'),
+                   data.get('awayHCP'), data.get('awayScore'), data.get('date'),
+                   data.get('forfeit', False), data.get('winner'), data.get('winnerTeam'),
+                   data.get('winnerHCP'), data.get('seasonId'), data.get('seasonTitle'),
+                   data.get('homeTeamId'), data.get('awayTeamId'),
+                   data.get('homePlayerId'), data.get('awayPlayerId'))
+
+    def to_dict(self):
+        """The scraper's JSON shape (optional fields only when set)"""
+        data = {
+            "homeTeam": self.home_team,
+            "awayTeam": self.away_team,
+            "homePlayer": self.home_player,
+            "homeHCP": self.home_hcp,
+            "homeScore": self.home_score,
+            "awayPlayer": self.away_player,
+            "awayHCP": self.away_hcp,
+            "awayScore": self.away_score,
+            "date": self.date,
+            "forfeit": self.forfeit,
+            "winner": self.winner,
+            "winnerTeam": self.winner_team,
+            "winnerHCP": self.winner_hcp,
+            "seasonId": self.season_id
+        }
+        if self.season_title is not None:
+            data["seasonTitle"] = self.season_title
+        if self.home_player_id is not None:
+            data["homeTeamId"] = self.home_team_id
+            data["awayTeamId"] = self.away_team_id
+            data["homePlayerId"] = self.home_player_id
+            data["awayPlayerId"] = self.away_player_id
+        return data
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"MatchRecord({self.date!r}, {self.home_player!r} vs {self.away_player!r})"
+
+class PlayerMatchView:
+    """A match from one player's point of view, as kept in their history"""
+
+    __slots__ = ('opponent', 'player_team', 'opponent_team', 'player_hcp', 'player_score',
+                 'opponent_score', 'win', 'forfeit', 'date', 'season_name', 'season_year', 'home',
+                 'calendar_season')
+
+    def __init__(self, opponent, player_team, opponent_team, player_hcp, player_score,
+                 opponent_score, win, forfeit, date, season_name, season_year, home=None,
+                 calendar_season=None):
+        self.opponent = opponent
+        self.player_team = player_team
+        self.opponent_team = opponent_team
+        self.player_hcp = player_hcp
+        self.player_score = player_score
+        self.opponent_score = opponent_score
+        self.win = win
+        self.forfeit = forfeit
+        self.date = date
+        self.season_name = season_name
+        self.season_year = season_year
+        # Whether the player was listed on the home side; internal only, not serialized
+        self.home = home
+        # The season's own name when season_name is the live 'Current' label; internal only
+        self.calendar_season = calendar_season or season_name
+
+    def to_dict(self):
+        return {
+            'opponent': self.opponent,
+            'player_team': self.player_team,
+            'opponent_team': self.opponent_team,
+            'player_hcp': self.player_hcp,
+            'player_score': self.player_score,
+            'opponent_score': self.opponent_score,
+            'win': self.win,
+            'forfeit': self.forfeit,
+            'date': self.date,
+            'season_name': self.season_name,
+            'season_year': self.season_year
+        }
+
+    def __eq__(self, other):
+        return type(other) is type(self) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return f"PlayerMatchView({self.date!r}, vs {self.opponent!r}, win={self.win!r})"
+
+class PlayerSeasonStat:
+    """A player's standings row for one season"""
+
+    __slots__ = ('team', 'name', 'handicap', 'wins', 'losses', 'total', 'win_percentage',
+                 'division', 'season_name', 'season_year', 'team_id', 'player_id')
+
+    def __init__(self, team, name, handicap, wins, losses, total, win_percentage, division,
+                 season_name=None, season_year=None, team_id=None, player_id=None):
+        self.team = team
+        self.name = name
+        self.handicap = handicap
+        self.wins = wins
+        self.losses = losses
+        self.total = total
+        self.win_percentage = win_percentage
+        self.division = division
+        self.season_name = season_name
+        self.season_year = season_year
+        self.team_id = team_id
+        self.player_id = player_id
+
+    @classmethod
+    def from_dict(cls, data, season_name=None, season_year=None):
+        """Build a record from the standings scraper's JSON shape"""
+        return cls(data.get('team'), data.get('name'), data.get('handicap'), data.get('wins'),
+                   data.get('losses'), data.get('total'), data.get('winPercentage'),
+                   data.get('division'), season_name, season_year,
+                   data.get('teamId'), data.get('playerId'))
+
+    def to_dict(self):
+        """The standings scraper's JSON shape"""
+        data = {
+            "team": self.team,
+            "name": self.name,
+            "handicap": self.handicap,
+            "wins": self.wins,
+            "losses": self.losses,
+            "total": self.total,
+            "winPercentage": self.win_percentage,
+            "division": self.division
+        }
+        if self.player_id is not None:
+            data["teamId"] = self.team_id
+            data["playerId"] = self.player_id
+        return data
+
+    def to_history_dict(self):
+        """The per-season shape used in player_history.json"""
+        return {
+            'team': self.team,
+            'handicap': self.handicap,
+            'wins': self.wins,
+            'losses': self.losses,
+            'total': self.total,
+            'win_percentage': self.win_percentage,
+            'division': self.division,
+            'season_name': self.season_name,
+            'season_year': self.season_year
+        }
+
+    def __eq__(self, other):
+        return type(other) is type(self) and all(
+            getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+    def __repr__(self):
+        return f"PlayerSeasonStat({self.name!r}, {self.team!r}, {self.season_name!r} {self.season_year!r})"
+
+def to_json(record):
+    """json.dump default hook for the scrapers' output files"""
+    if isinstance(record, (MatchRecord, PlayerMatchView, PlayerSeasonStat)):
+        return record.to_dict()
+    raise TypeError(f"Object of type {type(record).__name__} is not JSON serializable")
+
+def to_history_json(record):
+    """json.dump default hook for the combiner's player history files"""
+    if isinstance(record, PlayerSeasonStat):
+        return record.to_history_dict()
+    return to_json(record)
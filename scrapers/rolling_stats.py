@@ -0,0 +1,167 @@
+"""
+One-pass rolling statistics over a player's match history.
+
+RollingStats walks a player's matches once, in the order the combiner keeps
+them. During that walk it builds prefix sums (played games, wins, score
+differential, forfeits) and also fills keyed accumulators for the grouped
+windows (season, month, home/away). After that, any "last N games" window
+is O(1) and any grouped window is a lookup. Adding window variants for a
+dashboard costs a few subtractions per player instead of another full pass.
+
+Each window reports:
+  games         matches in the window, forfeits included
+  win_pct       wins / non-forfeit games * 100 (forfeits don't count, as in
+                recent_win_percentage)
+  score_diff    mean (player score - opponent score) over non-forfeit games
+  forfeit_rate  forfeits / games * 100
+
+"Last N" counts the last N non-forfeit games, the same window as
+recent_win_percentage. Its forfeit rate covers every match in that span.
+
+A player's history holds a copy of each game from both teams' pages;
+distinct_games() drops the second copy before the published windows are
+built. For the same reason "home" only says whose page a copy came from, so
+the 'side' grouping is available but not part of the default windows.
+"""
+from season_catalog import date_sort_key
+
+DEFAULT_WINDOWS = {
+    'last': (5, 10, 20),
+    'groups': ('season', 'month')
+}
+
+def distinct_games(matches):
+    """A player's match views with the second scraped copy of each game dropped"""
+    occurrences = {}
+    seen = set()
+    games = []
+    for view in matches:
+        key = (view.date, view.opponent, view.player_team, view.opponent_team, view.player_hcp,
+               view.player_score, view.opponent_score, view.forfeit, view.season_name, view.season_year)
+        # A pairing repeated on one night appears several times per page; pair the copies up by occurrence
+        source = (key, view.home)
+        occurrence = occurrences.get(source, 0)
+        occurrences[source] = occurrence + 1
+        if (key, occurrence) in seen:
+            continue
+        seen.add((key, occurrence))
+        games.append(view)
+    return games
+
+def _month_key(view):
+    """Calendar month of a match as 'YYYY-MM' (Fall's January belongs to the next year)"""
+    key = date_sort_key(view.date, view.calendar_season)
+    year = view.season_year
+    if key is None or year is None:
+        return None
+    month = key[0]
+    # date_sort_key counts a Fall season's new-year months past December
+    if month > 12:
+        month -= 12
+        year += 1
+    return f"{year}-{month:02d}"
+
+GROUP_KEYS = {
+    'season': lambda view: f"{view.season_name} {view.season_year}",
+    'month': _month_key,
+    'side': lambda view: None if view.home is None else ('home' if view.home else 'away')
+}
+
+def _summarize(games, played, wins, diff, forfeits):
+    return {
+        'games': games,
+        'win_pct': round(wins / played * 100, 1) if played else 0,
+        'score_diff': round(diff / played, 2) if played else 0,
+        'forfeit_rate': round(forfeits / games * 100, 1) if games else 0
+    }
+
+class RollingStats:
+    def __init__(self, matches, groups=DEFAULT_WINDOWS['groups']):
+        # Prefix sums over the full match list: index i covers matches[:i]
+        self.played = [0]
+        self.wins = [0]
+        self.diff = [0]
+        self.forfeits = [0]
+        # Position in the full list of each non-forfeit match
+        self.played_at = []
+        self.groups = {group: {} for group in groups}
+        key_fns = [(GROUP_KEYS[group], self.groups[group]) for group in groups]
+
+        played = wins = diff = forfeits = 0
+        for i, match in enumerate(matches):
+            forfeit = bool(match.forfeit)
+            if forfeit:
+                forfeits += 1
+                game = (0, 0, 0, 1)
+            else:
+                margin = (match.player_score or 0) - (match.opponent_score or 0)
+                played += 1
+                wins += 1 if match.win else 0
+                diff += margin
+                self.played_at.append(i)
+                game = (1, 1 if match.win else 0, margin, 0)
+
+            self.played.append(played)
+            self.wins.append(wins)
+            self.diff.append(diff)
+            self.forfeits.append(forfeits)
+
+            for key_fn, totals in key_fns:
+                key = key_fn(match)
+                if key is None:
+                    continue
+                total = totals.get(key)
+                if total is None:
+                    totals[key] = [1, game[0], game[1], game[2], game[3]]
+                else:
+                    total[0] += 1
+                    total[1] += game[0]
+                    total[2] += game[1]
+                    total[3] += game[2]
+                    total[4] += game[3]
+
+        self.count = len(matches)
+
+    def _start_of_last(self, n):
+        """Index where the span holding the last n non-forfeit games begins"""
+        if n >= len(self.played_at):
+            return 0
+        return self.played_at[-n]
+
+    def recent_win_percentage(self, n=10):
+        """Unrounded win % over the last n non-forfeit games (0 when none)"""
+        start = self._start_of_last(n)
+        played = self.played[-1] - self.played[start]
+        if not played:
+            return 0
+        return ((self.wins[-1] - self.wins[start]) / played) * 100
+
+    def recent_net_wins(self, n):
+        """Wins minus losses over the last n non-forfeit games"""
+        start = self._start_of_last(n)
+        played = self.played[-1] - self.played[start]
+        wins = self.wins[-1] - self.wins[start]
+        return wins - (played - wins)
+
+    def last(self, n):
+        """Window over the last n non-forfeit games"""
+        start = self._start_of_last(n)
+        return _summarize(self.count - start,
+                          self.played[-1] - self.played[start],
+                          self.wins[-1] - self.wins[start],
+                          self.diff[-1] - self.diff[start],
+                          self.forfeits[-1] - self.forfeits[start])
+
+    def group(self, group):
+        """Windows for every key of a grouping ('season', 'month' or 'side')"""
+        return {key: _summarize(*totals) for key, totals in self.groups[group].items()}
+
+    def to_dict(self, windows=DEFAULT_WINDOWS):
+        """All configured windows, as stored in the combined files"""
+        data = {
+            'career': _summarize(self.count, self.played[-1], self.wins[-1], self.diff[-1], self.forfeits[-1]),
+            'last': {str(n): self.last(n) for n in windows.get('last', ())}
+        }
+        for group in windows.get('groups', ()):
+            data[group] = self.group(group)
+        return data
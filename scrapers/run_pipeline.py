@@ -3,56 +3,127 @@
 Master script to run both scrapers and then combine data.
 This can be used as the main entry point for GitHub Actions.
 """
+import argparse
 import os
-import subprocess
-import time
 from datetime import datetime
 from season_combiner import SeasonDataCombiner
+from league_store import LeagueStore
+from crawl_scheduler import CrawlScheduler
+from league_config import load_config, select_leagues, archives_dir
+import profiling
+import archive_store
+import scraper
+import player_stats_scraper
+from season_simulator import project_season
+from upcoming_matchups import precompute_matchups
+from name_reconciliation import reconcile_league
+
+def combine_league(league, load_workers=None, combiner=None):
+    """Combine one league's seasons into its combined/ directory.
+
+    A warm combiner kept by the caller (the watch daemon) is reused, registry
+    included, instead of reading every season and the registry again.
+    """
+    output_dir = league['output_dir']
+    if combiner is None:
+        # Aggregate from the SQLite store when LEAGUE_DB_PATH is set
+        store = LeagueStore.for_league(league)
+        if store:
+            # Seasons archived before the store existed are only in the catalog
+            imported = store.import_catalog(archives_dir(league))
+            if imported:
+                print(f"[{league['id']}] Imported {', '.join(imported)} into the league store")
+        # Merge spelling variants first so the combiner groups them under one id
+        reconcile_league(output_dir, archives_dir(league), store=store)
+        combiner = SeasonDataCombiner(data_dir=output_dir, archives_dir=archives_dir(league), store=store,
+                                      load_workers=load_workers)
+    else:
+        reconcile_league(output_dir, archives_dir(league), combiner=combiner)
+    print(f"[{league['id']}] Available seasons:")
+    combiner.list_available_seasons()
+    combiner.save_combined_data(output_dir=f"{output_dir}/combined")
+    # Re-project the rest of the season from the fresh combined files
+    project_season(output_dir, identities=combiner.identities)
+    # Rosters, probabilities and head-to-heads for next week's fixtures only
+    precompute_matchups(output_dir, archives_dir(league), identities=combiner.identities)
 
 def main():
+    parser = argparse.ArgumentParser(description="Run both scrapers and the combiner for every configured league")
+    parser.add_argument('--leagues', help="Path to the league config (default: scrapers/leagues.json)")
+    parser.add_argument('--league', action='append', help="Only run this league id (repeatable)")
+    parser.add_argument('--resume', action='store_true', help="Resume an interrupted crawl from its journal instead of starting over")
+    parser.add_argument('--load-workers', type=int,
+                        help="Seasons the combiner decodes at once (default: chosen from the CPU count and JSON backend)")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiling.from_args(args)
+    
+    config = load_config(args.leagues)
+    leagues = select_leagues(config, args.league)
+    
     print("=" * 50)
     print(f"RUNNING BILLIARDS LEAGUE DATA PIPELINE")
     print(f"Started at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"Leagues: {', '.join(league['id'] for league in leagues)}")
     print("=" * 50)
     
     # Check if AUTH_COOKIE is set
     if not os.environ.get('AUTH_COOKIE'):
         print("WARNING: AUTH_COOKIE environment variable is not set. Scrapers may have limited functionality.")
     
-    # Create data directory if it doesn't exist
-    os.makedirs("public/data", exist_ok=True)
-    os.makedirs("public/data/archives", exist_ok=True)
-    os.makedirs("public/data/combined", exist_ok=True)
-    
-    # Step 1: Run match data scraper
-    print("\n----- Running match data scraper -----")
-    try:
-        subprocess.run(["python", "scrapers/scraper.py"], check=True)
-        print("Match data scraper completed successfully.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running match data scraper: {e}")
-    
-    # Small delay between scrapers to be nice to the server
-    time.sleep(2)
-    
-    # Step 2: Run player stats scraper
-    print("\n----- Running player stats scraper -----")
-    try:
-        subprocess.run(["python", "scrapers/player_stats_scraper.py"], check=True)
-        print("Player stats scraper completed successfully.")
-    except subprocess.CalledProcessError as e:
-        print(f"Error running player stats scraper: {e}")
-    
-    # Step 3: Run data combiner
+    # Create data directories if they don't exist
+    for league in leagues:
+        os.makedirs(league['output_dir'], exist_ok=True)
+        os.makedirs(archives_dir(league), exist_ok=True)
+        os.makedirs(f"{league['output_dir']}/combined", exist_ok=True)
+    
+    # Both scrapers share one scheduler, so every request in the run counts
+    # against the same per-host budget
+    with CrawlScheduler.from_config(config) as scheduler:
+        # Step 1: Run match data scraper
+        print("\n----- Running match data scraper -----")
+        try:
+            if not scraper.AUTH_COOKIE:
+                print("ERROR: Authentication cookie is missing. Skipping match data scraper.")
+            else:
+                with profiler.stage('scrape_matches'):
+                    scraper.run(leagues, scheduler, resume=args.resume)
+                print("Match data scraper completed successfully.")
+        except Exception as e:
+            print(f"Error running match data scraper: {e}")
+        
+        # Step 2: Run player stats scraper
+        print("\n----- Running player stats scraper -----")
+        try:
+            with profiler.stage('scrape_standings'):
+                player_stats_scraper.run(leagues, scheduler, resume=args.resume)
+            print("Player stats scraper completed successfully.")
+        except Exception as e:
+            print(f"Error running player stats scraper: {e}")
+        
+        print(f"Requests issued: {scheduler.request_count}")
+    
+    # Step 3: Fold leftover snapshot copies into the archive store, then drop
+    # blobs no ref points at any more (e.g. superseded latest/ payloads)
+    print("\n----- Compacting archives -----")
+    for league in leagues:
+        try:
+            actions, saved = archive_store.compact(league['output_dir'], archives_dir(league))
+            freed = archive_store.ArchiveStore(archives_dir(league)).gc()
+            print(f"[{league['id']}] Moved {len(actions)} file(s) into the archive store; "
+                  f"{saved + freed} bytes freed")
+        except Exception as e:
+            print(f"Error compacting archives for {league['id']}: {e}")
+    
+    # Step 4: Run data combiner
     print("\n----- Running data combiner -----")
-    try:
-        combiner = SeasonDataCombiner()
-        print("Available seasons:")
-        combiner.list_available_seasons()
-        combiner.save_combined_data()
-        print("Data combiner completed successfully.")
-    except Exception as e:
-        print(f"Error running data combiner: {e}")
+    for league in leagues:
+        try:
+            with profiler.stage(f"combine_{league['id']}"):
+                combine_league(league, args.load_workers)
+            print(f"[{league['id']}] Data combiner completed successfully.")
+        except Exception as e:
+            print(f"Error running data combiner for {league['id']}: {e}")
     
     print("\n" + "=" * 50)
     print(f"DATA PIPELINE COMPLETE")
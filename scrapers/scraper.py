@@ -1,28 +1,26 @@
-import requests
+import argparse
 from bs4 import BeautifulSoup
-import json
 import re
-import time
 import os
 import urllib.parse
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import season_catalog
+import changefeed
+import profiling
+from league_store import LeagueStore
+from identity_registry import IdentityRegistry
+from records import MatchRecord, to_json
+from artifact_writer import ArtifactBatch, encode_json
+from archive_store import archive_season_payload, record_latest_payload, season_ref, latest_ref
+from crawl_scheduler import CrawlScheduler, PageFetchError
+from crawl_journal import CrawlJournal
+from league_config import load_config, select_leagues, league_url, archives_dir as league_archives_dir, build_headers
 
 # Get authentication cookie from environment variable
 AUTH_COOKIE = os.environ.get('AUTH_COOKIE', '')
 
-# Headers with authentication
-HEADERS = {
-    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/135.0.0.0 Safari/537.36',
-    'Referer': 'https://leagues3.amsterdambilliards.com/8ball/abc/index.php?foo=bar',
-    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-    'Accept-Language': 'en-US,en;q=0.9',
-    'Upgrade-Insecure-Requests': '1',
-    'sec-ch-ua': '"Google Chrome";v="135", "Not-A.Brand";v="8", "Chromium";v="135"',
-    'sec-ch-ua-mobile': '?0',
-    'sec-ch-ua-platform': '"macOS"',
-    'Cookie': AUTH_COOKIE
-}
-
 # Season date definitions
 SEASONS = {
     'Spring': {'start': '01-15', 'end': '05-19'},
@@ -72,14 +70,14 @@ def is_season_ending_soon(days_threshold=7):
     
     return 0 <= days_difference <= days_threshold
 
-def fetch_teams_directly():
-    """Directly fetch teams from the standings page as a fallback"""
-    print("Attempting to fetch teams directly from standings page...")
+def fetch_teams_directly(league, scheduler, headers, page="team_standings.php"):
+    """Directly fetch a league's teams from its standings page (or a past season's, via page)"""
+    print(f"[{league['id']}] Fetching teams from standings page...")
     
-    url = "https://leagues3.amsterdambilliards.com/8ball/abc/team_standings.php"
+    url = league_url(league, page)
     
     try:
-        response = requests.get(url, headers=HEADERS)
+        response = scheduler.fetch(url, headers=headers)
         if response.status_code != 200:
             print(f"Error accessing {url}: Status code {response.status_code}")
             return []
@@ -92,11 +90,9 @@ def fetch_teams_directly():
         
         for link in team_links:
             team_name = link.text.strip()
-            team_url = link['href']
             
-            # If it's a relative URL, make it absolute
-            if not team_url.startswith('http'):
-                team_url = f"https://leagues3.amsterdambilliards.com{team_url}" if team_url.startswith('/') else f"https://leagues3.amsterdambilliards.com/8ball/abc/{team_url}"
+            # Resolve relative links against the league root
+            team_url = league_url(league, link['href'])
             
             # Extract team_id 
             team_id_match = re.search(r'team_id=(\d+)', team_url)
@@ -120,51 +116,13 @@ def fetch_teams_directly():
                 "url": fixed_url
             })
         
-        print(f"Successfully fetched {len(teams)} teams directly")
+        print(f"[{league['id']}] Successfully fetched {len(teams)} teams directly")
         return teams
         
     except Exception as e:
         print(f"Error fetching teams directly: {str(e)}")
         return []
 
-# Skip the import attempt and go straight to fetching teams directly
-try:
-    # Fetch teams directly from the standings page
-    TEAMS = fetch_teams_directly()
-    
-    # If direct fetching fails or returns empty list, use static list
-    if not TEAMS:
-        print("Warning: Direct team fetch failed, using fallback static list")
-        TEAMS = [
-            {"name": "Because 7 8 9", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=574"},
-            {"name": "4 Q People", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=507"},
-            {"name": "Alpha Sheep", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=581"},
-            {"name": "Always Going For The Nine", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=234"},
-            {"name": "Ball Busters", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=578"},
-            {"name": "Ball In Hand", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=571"},
-            {"name": "Ball So Hard", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=558"},
-            {"name": "Ballz 2 The Wall", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=254"},
-            {"name": "Bank Run", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=572"},
-            # Add more teams as needed
-        ]
-        print(f"Using static list with {len(TEAMS)} teams")
-    else:
-        print(f"Successfully fetched {len(TEAMS)} teams directly")
-        
-except Exception as e:
-    # In case of any error during direct fetching
-    print(f"Error during team fetch: {str(e)}")
-    print("Falling back to static team list")
-    
-    TEAMS = [
-        {"name": "Because 7 8 9", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=574"},
-        {"name": "4 Q People", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=507"},
-        {"name": "Alpha Sheep", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=581"},
-        {"name": "Always Going For The Nine", "url": "https://leagues3.amsterdambilliards.com/8ball/abc/team_scouting_report.php?season_nameid=234&team_id=234"},
-        # Add more teams for your fallback static list
-    ]
-    print(f"Using static list with {len(TEAMS)} teams")
-
 def extract_season_id(url):
     """Extract the season_id from the URL parameters"""
     parsed_url = urllib.parse.urlparse(url)
@@ -244,28 +202,115 @@ def extract_match_data(table, home_team, match_date, season_id):
         if home_score == 0 or away_score == 0:
             forfeit = True
         
-        match_data = {
-            "homeTeam": home_team,
-            "awayTeam": away_team,
-            "homePlayer": home_player,
-            "homeHCP": home_hcp,
-            "homeScore": home_score,
-            "awayPlayer": away_player,
-            "awayHCP": away_hcp,
-            "awayScore": away_score,
-            "date": match_date,
-            "forfeit": forfeit,
-            "winner": winner,
-            "winnerTeam": winner_team,
-            "winnerHCP": winner_hcp,
-            "seasonId": season_id
-        }
+        match_data = MatchRecord(
+            home_team, away_team, home_player, home_hcp, home_score,
+            away_player, away_hcp, away_score, match_date, forfeit,
+            winner, winner_team, winner_hcp, season_id
+        )
         
         matches.append(match_data)
     
     return matches
 
-def scrape_team_data(team_info):
+def parse_schedule_table(table, team_name, season_id):
+    """Parse a team page's schedule table into fixtures (one per week with an opponent)"""
+    rows = table.find_all('tr')
+    if not rows:
+        return []
+    
+    # Locate the columns by their headers, falling back to Week | Date | Opponent
+    headers = [cell.text.strip().lower() for cell in rows[0].find_all('td')]
+    columns = {'week': 0, 'date': 1, 'opponent': 2}
+    for name in columns:
+        for i, header in enumerate(headers):
+            if header.startswith(name):
+                columns[name] = i
+                break
+    
+    fixtures = []
+    for row in rows[1:]:
+        cells = row.find_all('td')
+        if len(cells) <= max(columns.values()):
+            continue
+        
+        opponent = cells[columns['opponent']].text.strip()
+        date = cells[columns['date']].text.strip()
+        if not opponent or not date or opponent.upper() == 'BYE' or opponent == team_name:
+            continue
+        
+        week = cells[columns['week']].text.strip()
+        fixtures.append({
+            'week': int(week) if week.isdigit() else week,
+            'date': date,
+            'team': team_name,
+            'opponent': opponent,
+            'seasonId': season_id
+        })
+    
+    return fixtures
+
+def dedupe_fixtures(fixtures):
+    """Each fixture once (both teams' pages list it), in first-seen order"""
+    seen = set()
+    unique = []
+    for fixture in fixtures:
+        key = (fixture['date'],) + tuple(sorted((fixture['team'], fixture['opponent'])))
+        if key not in seen:
+            seen.add(key)
+            unique.append(fixture)
+    return unique
+
+def parse_team_page(html, team_name, season_id, schedule=None, parser='html.parser'):
+    """Parse all match results from a team scouting report page.
+    
+    When a schedule list is given, the fixtures from the page's schedule
+    table are appended to it. parser picks the BeautifulSoup tree builder.
+    """
+    soup = BeautifulSoup(html, parser)
+    
+    # Try to extract season information from page content if available
+    season_title = None
+    h4_tags = soup.find_all('h4')
+    for h4 in h4_tags:
+        if 'Season' in h4.text:
+            season_title = h4.text.strip()
+            break
+            
+    # Extract match results tables
+    match_tables = soup.find_all('table', {'class': 'tableteir2'})
+    
+    all_matches = []
+    
+    # The first table is the season schedule; the rest are played matches
+    if schedule is not None and match_tables:
+        schedule.extend(parse_schedule_table(match_tables[0], team_name, season_id))
+    
+    for table in match_tables[1:]:
+        # Get the match date from the header row
+        header_row = table.find('tr')
+        if not header_row:
+            continue
+        
+        header_cells = header_row.find_all('td')
+        if len(header_cells) < 2:
+            continue
+        
+        match_date = header_cells[-1].text.strip()
+        
+        # Extract all matches from this table
+        matches = extract_match_data(table, team_name, match_date, season_id)
+        
+        # Add season title if found
+        if season_title:
+            for match in matches:
+                match.season_title = season_title
+                
+        all_matches.extend(matches)
+    
+    return all_matches
+
+def scrape_team_data(team_info, scheduler, headers):
+    """Fetch and parse one team page, returning (matches, schedule fixtures)"""
     team_name = team_info["name"]
     url = team_info["url"]
     
@@ -277,56 +322,34 @@ def scrape_team_data(team_info):
     
     print(f"Scraping data for team: {team_name} (Season ID: {season_id})")
     
-    try:
-        # Use authenticated session with headers
-        response = requests.get(url, headers=HEADERS)
-        if response.status_code != 200:
-            print(f"Error accessing {url}: Status code {response.status_code}")
-            return []
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Try to extract season information from page content if available
-        season_title = None
-        h4_tags = soup.find_all('h4')
-        for h4 in h4_tags:
-            if 'Season' in h4.text:
-                season_title = h4.text.strip()
-                break
-                
-        # Extract match results tables
-        match_tables = soup.find_all('table', {'class': 'tableteir2'})
-        
-        all_matches = []
-        
-        # Skip the first table (which is usually the schedule)
-        for table in match_tables[1:]:
-            # Get the match date from the header row
-            header_row = table.find('tr')
-            if not header_row:
-                continue
-            
-            header_cells = header_row.find_all('td')
-            if len(header_cells) < 2:
-                continue
-            
-            match_date = header_cells[-1].text.strip()
-            
-            # Extract all matches from this table
-            matches = extract_match_data(table, team_name, match_date, season_id)
-            
-            # Add season title if found
-            if season_title:
-                for match in matches:
-                    match["seasonTitle"] = season_title
-                    
-            all_matches.extend(matches)
-        
-        return all_matches
+    # Authenticated request within the host's crawl budget; failures propagate
+    # so the caller can journal them for a --resume run
+    response = scheduler.fetch(url, headers=headers)
+    if response.status_code != 200:
+        raise PageFetchError(f"Error accessing {url}: Status code {response.status_code}")
     
+    schedule = []
+    matches = parse_team_page(response.text, team_name, season_id, schedule)
+    return matches, schedule
+
+def scrape_team_checkpointed(team_info, scheduler, headers, journal):
+    """Scrape a team page unless the journal already has it, journaling the outcome"""
+    page = journal.completed(team_info["url"])
+    if page is not None:
+        if isinstance(page, list):
+            # Journaled before schedules were kept
+            page = {'matches': page, 'schedule': []}
+        return [MatchRecord.from_dict(row) for row in page['matches']], page['schedule']
+    
+    try:
+        matches, schedule = scrape_team_data(team_info, scheduler, headers)
     except Exception as e:
-        print(f"Error processing {team_name}: {str(e)}")
-        return []
+        print(f"Error processing {team_info['name']}: {str(e)}")
+        journal.record_failure(team_info["url"], str(e))
+        return [], []
+    
+    journal.record_page(team_info["url"], {'matches': [match.to_dict() for match in matches], 'schedule': schedule})
+    return matches, schedule
 
 def create_season_archive_info(current_season):
     """Create metadata JSON for the archived season"""
@@ -338,46 +361,81 @@ def create_season_archive_info(current_season):
         "description": f"Final archive of {current_season['name']} {current_season['year']} season"
     }
 
-def main():
-    # Create output directory
-    os.makedirs("public/data", exist_ok=True)
-    
-    # Create archives directory
-    archives_dir = "public/data/archives"
-    os.makedirs(archives_dir, exist_ok=True)
-    
-    # Determine current season
-    current_season = determine_current_season()
-    print(f"Current season: {current_season['name']} {current_season['year']}")
+def scrape_league(league, scheduler, journal):
+    """Discover a league's teams and scrape every team page through the shared scheduler"""
+    headers = build_headers(league, AUTH_COOKIE)
+    
+    teams_url = league_url(league, "team_standings.php")
+    teams = journal.completed(teams_url)
+    if teams is None:
+        teams = fetch_teams_directly(league, scheduler, headers)
+        if teams:
+            journal.record_page(teams_url, teams)
+        else:
+            teams = league['fallback_teams']
+            print(f"[{league['id']}] Warning: Direct team fetch failed, using static list with {len(teams)} teams")
     
-    # Verify authentication cookie is present
-    if not AUTH_COOKIE:
-        print("ERROR: Authentication cookie is missing. Please set the AUTH_COOKIE environment variable.")
-        return
+    futures = [scheduler.submit(scrape_team_checkpointed, team_info, scheduler, headers, journal)
+               for team_info in teams]
     
+    # Collect in team order so output files are stable between runs
     all_matches = []
-    
-    for team_info in TEAMS:
-        matches = scrape_team_data(team_info)
+    schedule = []
+    for future in futures:
+        matches, fixtures = future.result()
         all_matches.extend(matches)
-        
-        # Be nice to the server with a small delay
-        time.sleep(1)
+        schedule.extend(fixtures)
+    
+    return teams, all_matches, dedupe_fixtures(schedule)
+
+def save_league_matches(league, teams, all_matches, current_season, schedule=None, identities=None):
+    """Write a league's match files, schedule (and season archive) under its output directory"""
+    output_dir = league['output_dir']
+    archives_dir = league_archives_dir(league)
+    os.makedirs(output_dir, exist_ok=True)
+    os.makedirs(archives_dir, exist_ok=True)
+    
+    # Stamp stable player/team ids so later stages join on ints
+    identities = identities or IdentityRegistry.for_data_dir(output_dir)
+    for match in all_matches:
+        identities.annotate_match(match)
+    identities.save()
     
     # Save current season data
     current_season_str = f"{current_season['name'].lower()}_{current_season['year']}"
     
+    # All outputs are staged and written together; unchanged files are skipped
+    batch = ArtifactBatch()
+    all_matches_json = encode_json(all_matches, to_json)
+    
     # Latest version (this is always updated regardless of season ending)
-    with open("public/data/all_matches_latest.json", 'w') as f:
-        json.dump(all_matches, f, indent=2)
+    latest_file = f"{output_dir}/all_matches_latest.json"
+    batch.stage_bytes(latest_file, all_matches_json)
+    
+    # The season's copy lives in the archive store (stored once per distinct payload)
+    record_latest_payload(archives_dir, current_season_str, 'matches', all_matches_json)
     
-    # Save current season version
-    current_season_file = f"public/data/all_matches_{current_season_str}.json"
-    with open(current_season_file, 'w') as f:
-        json.dump(all_matches, f, indent=2)
+    # Season schedule, for projecting the remaining weeks
+    if schedule is not None:
+        batch.stage_json(f"{output_dir}/schedule_latest.json", schedule)
+    
+    # Diff against the snapshot being replaced and append it to the changefeed
+    changefeed.record_delta(output_dir, 'matches', current_season_str,
+                            changefeed.load_snapshot(latest_file), [m.to_dict() for m in all_matches])
+    
+    # Record which season the latest files belong to
+    season_catalog.record_current_season(archives_dir, current_season)
+    
+    # Mirror the scrape into the SQLite store when one is configured
+    store = LeagueStore.for_league(league)
+    if store:
+        store.upsert_season(current_season_str, current_season['name'], current_season['year'])
+        store.replace_season_teams(current_season_str, teams)
+        store.replace_season_matches(current_season_str, current_season['name'], [m.to_dict() for m in all_matches])
     
     # Check if the season is ending soon
-    if is_season_ending_soon():
+    season_ending = is_season_ending_soon()
+    if season_ending:
         print(f"NOTICE: The {current_season['name']} {current_season['year']} season is ending soon!")
         print("Creating final season archive...")
         
@@ -385,22 +443,26 @@ def main():
         season_archive_dir = f"{archives_dir}/{current_season_str}"
         os.makedirs(season_archive_dir, exist_ok=True)
         
-        # Archive the data with FINAL tag
-        archive_file = f"{season_archive_dir}/all_matches_FINAL.json"
-        with open(archive_file, 'w') as f:
-            json.dump(all_matches, f, indent=2)
+        # Archive the data with FINAL tag (stored once in the content-addressed store)
+        archive_ref = season_ref(current_season_str, 'matches')
+        archive_season_payload(archives_dir, current_season_str, 'matches', all_matches_json)
         
         # Create metadata file with archive info
         archive_info = create_season_archive_info(current_season)
-        with open(f"{season_archive_dir}/metadata.json", 'w') as f:
-            json.dump(archive_info, f, indent=2)
+        batch.stage_json(f"{season_archive_dir}/metadata.json", archive_info)
+        batch.commit()
+        
+        # Refresh the season catalog so the combiner picks up the new archive
+        season_catalog.update_season(archives_dir, current_season_str)
+        if store:
+            store.upsert_season(current_season_str, current_season['name'], current_season['year'], status='final')
         
-        print(f"Final season data archived to {archive_file}")
+        print(f"Final season data archived to {archive_ref}")
     
     # Group matches by season
     seasons = {}
     for match in all_matches:
-        season_id = match.get("seasonId", "unknown")
+        season_id = match.season_id or "unknown"
         if season_id not in seasons:
             seasons[season_id] = []
         seasons[season_id].append(match)
@@ -408,21 +470,81 @@ def main():
     # Save each season ID to a separate file
     for season_id, matches in seasons.items():
         # Latest version
-        with open(f"data/season_{season_id}_matches_latest.json", 'w') as f:
-            json.dump(matches, f, indent=2)
+        batch.stage_json(f"{output_dir}/season_{season_id}_matches_latest.json", matches, to_json)
+    
+    batch.commit()
     
     # Print summary
-    print(f"Scraping completed.")
+    print(f"[{league['id']}] Scraping completed.")
     print(f"Total matches collected: {len(all_matches)}")
     print(f"Season IDs found: {list(seasons.keys())}")
+    batch.report()
     print(f"Data saved to:")
-    print(f"  - data/all_matches_latest.json")
-    print(f"  - {current_season_file}")
+    print(f"  - {output_dir}/all_matches_latest.json")
+    print(f"  - {archives_dir}/store ({latest_ref(current_season_str, 'matches')})")
+    if schedule is not None:
+        print(f"  - {output_dir}/schedule_latest.json ({len(schedule)} fixtures)")
     for season_id in seasons.keys():
-        print(f"  - data/season_{season_id}_matches_latest.json")
+        print(f"  - {output_dir}/season_{season_id}_matches_latest.json")
+    
+    if season_ending:
+        print(f"  - {archives_dir}/store ({season_ref(current_season_str, 'matches')}, Season Archive)")
+
+def run(leagues, scheduler, resume=False):
+    """Crawl all leagues concurrently through one scheduler and write each league's outputs"""
+    # Determine current season
+    current_season = determine_current_season()
+    print(f"Current season: {current_season['name']} {current_season['year']}")
+    
+    if not leagues:
+        print("No leagues configured.")
+        return
+    
+    # A journal from another season can't be resumed into this one
+    run_key = f"{current_season['name'].lower()}_{current_season['year']}"
+    journals = {league['id']: CrawlJournal.open(league['id'], 'matches', run_key, resume) for league in leagues}
+    
+    # Each league runs on its own thread; their page fetches share the
+    # scheduler's worker pool and per-host budgets
+    with ThreadPoolExecutor(max_workers=len(leagues)) as pool:
+        futures = [(league, pool.submit(scrape_league, league, scheduler, journals[league['id']]))
+                   for league in leagues]
+    
+    for league, future in futures:
+        try:
+            teams, all_matches, schedule = future.result()
+            # Without the failed teams' pages the latest files would lose their
+            # matches and fixtures; keep the last full snapshot until --resume
+            if journals[league['id']].failures:
+                print(f"[{league['id']}] Some team pages failed; match files left unchanged")
+            else:
+                save_league_matches(league, teams, all_matches, current_season, schedule)
+        except Exception as e:
+            print(f"Error scraping league {league['id']}: {str(e)}")
+            # The checkpoint is only dropped once the outputs are written
+            journals[league['id']].close(keep=True)
+        else:
+            journals[league['id']].close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Scrape team match results for every configured league")
+    parser.add_argument('--leagues', help="Path to the league config (default: scrapers/leagues.json)")
+    parser.add_argument('--league', action='append', help="Only crawl this league id (repeatable)")
+    parser.add_argument('--resume', action='store_true', help="Reuse pages journaled by an interrupted run and retry only the rest")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiling.from_args(args)
+    
+    # Verify authentication cookie is present
+    if not AUTH_COOKIE:
+        print("ERROR: Authentication cookie is missing. Please set the AUTH_COOKIE environment variable.")
+        return
+    
+    config = load_config(args.leagues)
+    leagues = select_leagues(config, args.league)
     
-    if is_season_ending_soon():
-        print(f"  - {archives_dir}/{current_season_str}/all_matches_FINAL.json (Season Archive)")
+    with CrawlScheduler.from_config(config) as scheduler, profiler.stage('scrape_matches'):
+        run(leagues, scheduler, resume=args.resume)
 
 if __name__ == "__main__":
     main()
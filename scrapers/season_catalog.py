@@ -0,0 +1,197 @@
+"""
+Persistent catalog of archived seasons.
+
+The catalog lives at archives/catalog.json and lists every archived season with
+its files, sizes, content hashes, record counts and date range. The scrapers
+update it whenever they archive a season, so SeasonDataCombiner can discover
+seasons with a single small file read instead of globbing the archives folder.
+A season's files may live in the content-addressed archive store instead of
+the season directory; the recorded SHA-256 is then the blob's address.
+"""
+import os
+import sys
+import glob
+from datetime import datetime
+
+import json_backend
+from archive_store import ArchiveStore, season_ref
+from artifact_writer import write_json_atomic, file_sha256
+
+CATALOG_FILE = "catalog.json"
+CATALOG_VERSION = 1
+
+# Archived files tracked for each season directory
+SEASON_FILES = {
+    'matches': "all_matches_FINAL.json",
+    'stats': "player_stats_FINAL.json"
+}
+
+MONTHS = ['january', 'february', 'march', 'april', 'may', 'june', 'july',
+          'august', 'september', 'october', 'november', 'december']
+
+def catalog_path(archives_dir):
+    """Path of the catalog file for an archives directory"""
+    return os.path.join(archives_dir, CATALOG_FILE)
+
+def date_sort_key(date_text, season_name=None):
+    """Sort key for dates like 'April 16th' (Fall's January weeks sort last)"""
+    parts = (date_text or '').replace(',', ' ').split()
+    if len(parts) < 2 or parts[0].lower() not in MONTHS:
+        return None
+
+    month = MONTHS.index(parts[0].lower()) + 1
+    day = ''.join(ch for ch in parts[1] if ch.isdigit())
+    if not day:
+        return None
+
+    if season_name and season_name.lower() == 'fall' and month < 6:
+        month += 12
+    return (month, int(day))
+
+def real_season_name(season):
+    """A combiner season's own name ('Fall', not the live season's 'Current' label)"""
+    return (season.get('metadata') or {}).get('season') or season['name']
+
+def describe_file(path, season_name=None):
+    """Size, hash, record count and date range of an archived JSON file"""
+    records = json_backend.load_file(path)
+
+    info = {
+        'path': os.path.basename(path),
+        'size': os.path.getsize(path),
+        'sha256': file_sha256(path),
+        'records': len(records),
+        'first_date': None,
+        'last_date': None
+    }
+
+    dated = []
+    for record in records:
+        key = date_sort_key(record.get('date'), season_name) if isinstance(record, dict) else None
+        if key:
+            dated.append((key, record.get('date')))
+
+    if dated:
+        info['first_date'] = min(dated)[1]
+        info['last_date'] = max(dated)[1]
+
+    return info
+
+def build_season_entry(season_dir):
+    """Build the catalog entry for one season directory, or None if it is not a valid season"""
+    metadata_path = os.path.join(season_dir, "metadata.json")
+    if not os.path.exists(metadata_path):
+        return None
+
+    metadata = json_backend.load_file(metadata_path)
+    season_name = metadata.get('season')
+    season_year = metadata.get('year')
+    if not season_name or not season_year:
+        return None
+
+    season_dir_name = os.path.basename(os.path.normpath(season_dir))
+    store = ArchiveStore(os.path.dirname(os.path.normpath(season_dir)))
+    files = {}
+    for kind, file_name in SEASON_FILES.items():
+        path = os.path.join(season_dir, file_name)
+        if os.path.exists(path):
+            files[kind] = describe_file(path, season_name)
+        else:
+            blob = store.resolve(season_ref(season_dir_name, kind))
+            if blob and os.path.exists(blob):
+                files[kind] = describe_file(blob, season_name)
+                files[kind]['path'] = file_name
+                files[kind]['stored'] = True
+
+    if not files:
+        return None
+
+    return {
+        'name': season_name,
+        'year': season_year,
+        'dir': season_dir_name,
+        'metadata': metadata,
+        'files': files
+    }
+
+def season_file_path(archives_dir, entry, kind):
+    """Path to read one of a catalogued season's files: the archived file, else its store blob"""
+    file_entry = entry['files'].get(kind)
+    if not file_entry:
+        return None
+    path = os.path.join(archives_dir, entry['dir'], file_entry['path'])
+    if os.path.exists(path):
+        return path
+    return ArchiveStore(archives_dir).blob_path(file_entry['sha256'])
+
+def _empty_catalog():
+    return {'version': CATALOG_VERSION, 'updated': None, 'current': None, 'seasons': {}}
+
+def load_catalog(archives_dir):
+    """Load the catalog, or None if it is missing or from an older version"""
+    path = catalog_path(archives_dir)
+    if not os.path.exists(path):
+        return None
+
+    try:
+        catalog = json_backend.load_file(path)
+    except Exception as e:
+        print(f"Error reading season catalog {path}: {str(e)}")
+        return None
+
+    if catalog.get('version') != CATALOG_VERSION:
+        return None
+    return catalog
+
+def save_catalog(archives_dir, catalog):
+    """Atomically persist the catalog"""
+    catalog['updated'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    write_json_atomic(catalog_path(archives_dir), catalog)
+
+def rebuild_catalog(archives_dir):
+    """Scan every season directory and rewrite the catalog from scratch"""
+    previous = load_catalog(archives_dir) or _empty_catalog()
+    catalog = _empty_catalog()
+    catalog['current'] = previous.get('current')
+
+    for season_dir in sorted(glob.glob(f"{archives_dir}/*_*/")):
+        try:
+            entry = build_season_entry(season_dir)
+        except Exception as e:
+            print(f"Error processing {season_dir}: {str(e)}")
+            continue
+        if entry:
+            catalog['seasons'][entry['dir']] = entry
+
+    save_catalog(archives_dir, catalog)
+    return catalog
+
+def update_season(archives_dir, season_dir_name):
+    """Refresh a single season's catalog entry after it has been archived"""
+    catalog = load_catalog(archives_dir)
+    if catalog is None:
+        return rebuild_catalog(archives_dir)
+
+    entry = build_season_entry(os.path.join(archives_dir, season_dir_name))
+    if entry:
+        catalog['seasons'][entry['dir']] = entry
+    else:
+        catalog['seasons'].pop(season_dir_name, None)
+
+    save_catalog(archives_dir, catalog)
+    return catalog
+
+def record_current_season(archives_dir, current_season):
+    """Remember which season the live *_latest.json files belong to"""
+    catalog = load_catalog(archives_dir) or rebuild_catalog(archives_dir)
+    current = {'name': current_season['name'], 'year': current_season['year']}
+
+    if catalog.get('current') != current:
+        catalog['current'] = current
+        save_catalog(archives_dir, catalog)
+    return catalog
+
+if __name__ == "__main__":
+    archives = sys.argv[1] if len(sys.argv) > 1 else "public/data/archives"
+    rebuilt = rebuild_catalog(archives)
+    print(f"Season catalog rebuilt with {len(rebuilt['seasons'])} seasons: {catalog_path(archives)}")
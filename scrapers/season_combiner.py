@@ -1,54 +1,128 @@
 import os
 import json
-import glob
 from datetime import datetime, timedelta
 import re
 import math
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+import json_backend
+import season_catalog
+from identity_registry import IdentityRegistry
+from records import PlayerMatchView, PlayerSeasonStat, to_history_json
+from artifact_writer import ArtifactBatch
+from team_aggregates import TeamAggregator
+import skill_model
+import leaderboards
+from skill_model import SkillGames
+from rolling_stats import RollingStats, DEFAULT_WINDOWS, distinct_games
+
+def _decode_season_files(matches_path, stats_path):
+    """Decode a season's match and stats files, returning (matches, stats, seconds)"""
+    started = time.perf_counter()
+    matches = json_backend.load_file(matches_path) if matches_path and os.path.exists(matches_path) else []
+    stats = json_backend.load_file(stats_path) if stats_path and os.path.exists(stats_path) else []
+    return matches, stats, time.perf_counter() - started
+
+def _build_player_shard(shard_no, shard_count, seasons, names, rolling_windows, match_rows, stat_rows):
+    """Process-pool worker: build history entries for the players of one shard.
+    
+    Rows arrive in stream order as (season index, record) with player ids set,
+    so each player's views are appended exactly as in a serial run. Entries
+    come back with matches and stats already as JSON-ready dicts.
+    """
+    # Entry building only needs the windows config, not a loaded combiner
+    builder = object.__new__(SeasonDataCombiner)
+    builder.rolling_windows = rolling_windows
+    player_matches = {}
+    player_stats = {}
+    
+    for season_index, match in match_rows:
+        builder._add_match_views(player_matches, match, seasons[season_index])
+    for season_index, stat in stat_rows:
+        builder._add_stat_row(player_stats, stat, seasons[season_index])
+    
+    results = []
+    for player_id in set(player_matches) | set(player_stats):
+        # A match row is shared with the other player's shard; only build our own players
+        if player_id % shard_count != shard_no:
+            continue
+        entry = builder._build_player_entry(names[player_id], player_matches.get(player_id, []),
+                                            player_stats.get(player_id, []), player_id)
+        entry['matches'] = [match.to_dict() for match in entry['matches']]
+        entry['stats'] = [stat.to_history_dict() for stat in entry['stats']]
+        results.append((player_id, entry))
+    return results
 
 class SeasonDataCombiner:
-    def __init__(self, data_dir="public/data", archives_dir="public/data/archives"):
+    def __init__(self, data_dir="public/data", archives_dir="public/data/archives",
+                 load_workers=None, load_executor=None, store=None, identities=None, rolling_windows=None,
+                 history_workers=1, warm=False):
         self.data_dir = data_dir
         self.archives_dir = archives_dir
+        # Players are grouped by their integer id from the shared identity registry
+        self.identities = identities or IdentityRegistry.for_data_dir(data_dir)
+        # Optional LeagueStore; when set, records are read with indexed queries instead of JSON files
+        self.store = store
+        # A single worker streams records incrementally; more workers ('thread' or
+        # 'process') decode whole seasons concurrently, holding up to load_workers
+        # decoded seasons in memory. None picks one (see _default_load_workers).
+        self.load_workers = load_workers
+        self.load_executor = load_executor or 'thread'
+        self.load_timings = {}
+        # Rolling windows reported per player: last-N game counts and groupings (see rolling_stats)
+        self.rolling_windows = rolling_windows or DEFAULT_WINDOWS
+        self.team_aggregates = None
+        self.skill_games = None
+        # Player entries are built across this many processes, sharded by player id
+        self.history_workers = history_workers
+        # A warm combiner (the watch daemon's) decodes each archived season once
+        # and keeps it; the live season is fed in page by page (feed_live_page)
+        self.warm = warm
+        self.season_cache = {}
+        self.live_pages = {}
+        self.live_page_order = None
+        self.live_stats = None
         self.available_seasons = []
         self.discover_available_seasons()
-        
+        if load_workers is None:
+            self.load_workers, self.load_executor = self._default_load_workers(load_executor)
+    
+    def _default_load_workers(self, load_executor):
+        """(workers, executor) for loading seasons when none were asked for.
+        
+        Decoding holds the GIL, so threads never beat a single worker, and
+        unpickling a season decoded in another process costs more than
+        decoding it with orjson. Processes only pay off with the stdlib
+        decoder, one per season up to the CPU count.
+        """
+        workers = min(len(self.available_seasons), os.cpu_count() or 1)
+        if self.store is not None or json_backend.orjson is not None or workers <= 1:
+            return 1, load_executor or 'thread'
+        return workers, load_executor or 'process'
+    
     def discover_available_seasons(self):
-        """Discover all available seasons in the archives directory"""
-        # Look for season directories in the archives folder
-        season_dirs = glob.glob(f"{self.archives_dir}/*_*/")
-        
-        for season_dir in season_dirs:
-            # Check if this is a valid season directory with metadata
-            metadata_path = os.path.join(season_dir, "metadata.json")
-            if os.path.exists(metadata_path):
-                try:
-                    with open(metadata_path, 'r') as f:
-                        metadata = json.load(f)
-                    
-                    season_name = metadata.get('season')
-                    season_year = metadata.get('year')
-                    
-                    if season_name and season_year:
-                        dir_name = os.path.basename(os.path.normpath(season_dir))
-                        matches_path = os.path.join(season_dir, "all_matches_FINAL.json")
-                        player_stats_path = os.path.join(season_dir, "player_stats_FINAL.json")
-                        
-                        has_matches = os.path.exists(matches_path)
-                        has_stats = os.path.exists(player_stats_path)
-                        
-                        if has_matches or has_stats:
-                            self.available_seasons.append({
-                                'name': season_name,
-                                'year': season_year,
-                                'dir': dir_name,
-                                'metadata': metadata,
-                                'has_matches': has_matches,
-                                'has_stats': has_stats,
-                                'matches_path': matches_path if has_matches else None,
-                                'player_stats_path': player_stats_path if has_stats else None
-                            })
-                except Exception as e:
-                    print(f"Error processing {season_dir}: {str(e)}")
+        """Discover all available seasons from the archives catalog"""
+        # The catalog is maintained by the scrapers; build it once if it's missing
+        catalog = season_catalog.load_catalog(self.archives_dir)
+        if catalog is None:
+            catalog = season_catalog.rebuild_catalog(self.archives_dir)
+        self.catalog = catalog
+        
+        for entry in catalog['seasons'].values():
+            matches_file = entry['files'].get('matches')
+            stats_file = entry['files'].get('stats')
+            
+            self.available_seasons.append({
+                'name': entry['name'],
+                'year': entry['year'],
+                'dir': entry['dir'],
+                'metadata': entry['metadata'],
+                'has_matches': matches_file is not None,
+                'has_stats': stats_file is not None,
+                'matches_path': season_catalog.season_file_path(self.archives_dir, entry, 'matches'),
+                'player_stats_path': season_catalog.season_file_path(self.archives_dir, entry, 'stats')
+            })
         
         # Sort seasons chronologically
         self.available_seasons.sort(key=lambda x: (x['year'], self._season_index(x['name'])))
@@ -56,19 +130,57 @@ class SeasonDataCombiner:
         # Add current season if available
         current_matches_path = os.path.join(self.data_dir, "all_matches_latest.json")
         current_stats_path = os.path.join(self.data_dir, "player_stats_latest.json")
+        has_current_matches = os.path.exists(current_matches_path)
+        has_current_stats = os.path.exists(current_stats_path)
         
-        if os.path.exists(current_matches_path) or os.path.exists(current_stats_path):
+        if has_current_matches or has_current_stats:
+            # The scrapers record which season the live files belong to
+            current = catalog.get('current') or {}
+            
             self.available_seasons.append({
                 'name': 'Current',
-                'year': datetime.now().year,
+                'year': current.get('year', datetime.now().year),
                 'dir': 'current',
-                'metadata': {'status': 'active'},
-                'has_matches': os.path.exists(current_matches_path),
-                'has_stats': os.path.exists(current_stats_path),
-                'matches_path': current_matches_path if os.path.exists(current_matches_path) else None,
-                'player_stats_path': current_stats_path if os.path.exists(current_stats_path) else None
+                'metadata': {'status': 'active', 'season': current.get('name')},
+                'has_matches': has_current_matches,
+                'has_stats': has_current_stats,
+                'matches_path': current_matches_path if has_current_matches else None,
+                'player_stats_path': current_stats_path if has_current_stats else None
             })
     
+    def feed_live_page(self, page_key, matches):
+        """Replace the live season's match records scraped from one team page (warm combiners)"""
+        self.live_pages[page_key] = matches
+    
+    def set_live_season(self, page_order, stats):
+        """The live season's team pages in output order, and its standings rows (warm combiners)"""
+        self.live_page_order = list(page_order)
+        self.live_stats = stats
+    
+    def _iter_warm_records(self):
+        """Yield records from memory: cached archived seasons, then the fed live season"""
+        # Archiving a season at season end adds it to the catalog mid-run
+        self.available_seasons = []
+        self.discover_available_seasons()
+        
+        for season in self.available_seasons:
+            live = season['dir'] == 'current'
+            if live and self.live_page_order is not None:
+                matches = [match for key in self.live_page_order for match in self.live_pages.get(key, [])]
+                stats = self.live_stats or []
+            elif not live and season['dir'] in self.season_cache:
+                matches, stats = self.season_cache[season['dir']]
+            else:
+                matches, stats, elapsed = self._decode_season(season)
+                self._record_load_timing(season, len(matches), len(stats), elapsed, json_backend.BACKEND)
+                if not live:
+                    self.season_cache[season['dir']] = (matches, stats)
+            
+            for match in matches:
+                yield 'match', season, match
+            for stat in stats:
+                yield 'stat', season, stat
+    
     def _season_index(self, season_name):
         """Helper to convert season name to a numeric index for sorting"""
         if season_name.lower() == 'spring':
@@ -117,33 +229,223 @@ class SeasonDataCombiner:
         all_matches = []
         all_stats = []
         
-        for season in self.available_seasons:
-            if season['has_matches']:
-                matches = self._load_matches(season['matches_path'])
-                # Add season metadata to each match
-                for match in matches:
-                    match['season_name'] = season['name']
-                    match['season_year'] = season['year']
-                all_matches.extend(matches)
+        for record_type, season, record in self.iter_season_records():
+            # Add season metadata to each match / player stat
+            record['season_name'] = season['name']
+            record['season_year'] = season['year']
             
-            if season['has_stats']:
-                stats = self._load_stats(season['player_stats_path'])
-                # Add season metadata to each player stat
-                for stat in stats:
-                    stat['season_name'] = season['name']
-                    stat['season_year'] = season['year']
-                all_stats.extend(stats)
+            if record_type == 'match':
+                all_matches.append(record)
+            else:
+                all_stats.append(record)
         
         return all_matches, all_stats
     
+    def iter_season_records(self):
+        """Yield (record_type, season, record) for every match and player stat, one season at a time.
+        
+        Records are not annotated with season info, so callers only hold the
+        record they are currently using. With a single load worker one season
+        is decoded at a time (incrementally when the stdlib decoder is in use,
+        since orjson can only decode whole files); otherwise up to load_workers
+        whole seasons are decoded ahead concurrently and yielded in
+        chronological order. Ids stamped on records before a name
+        reconciliation merge are resolved to the surviving entity.
+        
+        A season file that can't be decoded raises ValueError rather than
+        leaving the season out or cut short.
+        """
+        records = self._iter_raw_season_records()
+        if not self.identities.has_merges():
+            yield from records
+            return
+        
+        for record_type, season, record in records:
+            yield record_type, season, self.identities.resolve_record_ids(record)
+    
+    def _iter_raw_season_records(self):
+        self.load_timings = {}
+        
+        if self.store is not None:
+            yield from self._iter_store_records()
+            return
+        
+        if self.warm:
+            yield from self._iter_warm_records()
+            return
+        
+        if not self.load_workers or self.load_workers <= 1 or len(self.available_seasons) <= 1:
+            for season in self.available_seasons:
+                started = time.perf_counter()
+                match_count = stat_count = 0
+                
+                if json_backend.orjson is not None:
+                    matches, stats, elapsed = self._decode_season(season)
+                    self._record_load_timing(season, len(matches), len(stats), elapsed, json_backend.BACKEND)
+                    for match in matches:
+                        yield 'match', season, match
+                    for stat in stats:
+                        yield 'stat', season, stat
+                    continue
+                
+                if season['has_matches']:
+                    for match in self._iter_json_array(season['matches_path']):
+                        match_count += 1
+                        yield 'match', season, match
+                
+                if season['has_stats']:
+                    for stat in self._iter_json_array(season['player_stats_path']):
+                        stat_count += 1
+                        yield 'stat', season, stat
+                
+                self._record_load_timing(season, match_count, stat_count,
+                                         time.perf_counter() - started, 'stream')
+            return
+        
+        executor_class = ProcessPoolExecutor if self.load_executor == 'process' else ThreadPoolExecutor
+        
+        with executor_class(max_workers=self.load_workers) as executor:
+            pending = []
+            seasons = iter(self.available_seasons)
+            
+            def submit_next():
+                season = next(seasons, None)
+                if season is not None:
+                    pending.append((season, executor.submit(
+                        _decode_season_files,
+                        season['matches_path'] if season['has_matches'] else None,
+                        season['player_stats_path'] if season['has_stats'] else None)))
+            
+            # Keep at most load_workers seasons decoded ahead of the consumer
+            for _ in range(self.load_workers):
+                submit_next()
+            
+            while pending:
+                season, future = pending.pop(0)
+                try:
+                    matches, stats, elapsed = future.result()
+                except Exception as e:
+                    raise ValueError(f"Error loading season {season['name']} {season['year']}: {str(e)}") from e
+                submit_next()
+                
+                self._record_load_timing(season, len(matches), len(stats), elapsed, json_backend.BACKEND)
+                
+                for match in matches:
+                    yield 'match', season, match
+                for stat in stats:
+                    yield 'stat', season, stat
+    
+    def _decode_season(self, season):
+        """A whole season's (matches, stats, seconds) with the configured JSON backend"""
+        try:
+            return _decode_season_files(season['matches_path'] if season['has_matches'] else None,
+                                        season['player_stats_path'] if season['has_stats'] else None)
+        except Exception as e:
+            raise ValueError(f"Error loading season {season['name']} {season['year']}: {str(e)}") from e
+    
+    def _store_seasons(self):
+        """Season dicts for the store's seasons, labelled the same way as catalog seasons"""
+        seasons = []
+        for row in self.store.list_seasons():
+            active = row['status'] == 'active'
+            seasons.append({
+                'key': row['season_key'],
+                'name': 'Current' if active else row['name'],
+                'year': row['year'],
+                'dir': 'current' if active else row['season_key'],
+                'metadata': {'status': row['status'], 'season': row['name']}
+            })
+        return seasons
+    
+    def _iter_store_records(self):
+        """Yield (record_type, season, record) from the SQLite store, season by season"""
+        for season in self._store_seasons():
+            started = time.perf_counter()
+            match_count = stat_count = 0
+            
+            for match in self.store.iter_matches(season['key']):
+                match_count += 1
+                yield 'match', season, match
+            
+            for stat in self.store.iter_player_stats(season['key']):
+                stat_count += 1
+                yield 'stat', season, stat
+            
+            self._record_load_timing(season, match_count, stat_count,
+                                     time.perf_counter() - started, 'sqlite')
+    
+    def _record_load_timing(self, season, match_count, stat_count, elapsed, backend):
+        """Remember and report how long a season took to load"""
+        self.load_timings[season['dir']] = elapsed
+        print(f"Loaded {season['name']} {season['year']}: {match_count} matches, "
+              f"{stat_count} player stats in {elapsed * 1000:.1f} ms ({backend})")
+    
+    def _iter_json_array(self, path, chunk_size=65536):
+        """Incrementally decode the elements of a top-level JSON array file"""
+        if not path or not os.path.exists(path):
+            return
+        
+        decoder = json.JSONDecoder()
+        
+        try:
+            with open(path, 'r') as f:
+                buffer = ''
+                pos = 0
+                eof = False
+                started = False
+                
+                while True:
+                    # Skip whitespace and separators between elements
+                    while pos < len(buffer) and buffer[pos] in ' \t\r\n,':
+                        pos += 1
+                    
+                    if pos >= len(buffer):
+                        if eof:
+                            break
+                        buffer = f.read(chunk_size)
+                        pos = 0
+                        eof = not buffer
+                        continue
+                    
+                    if not started:
+                        if buffer[pos] != '[':
+                            raise ValueError("expected a JSON array")
+                        started = True
+                        pos += 1
+                        continue
+                    
+                    if buffer[pos] == ']':
+                        break
+                    
+                    try:
+                        element, end = decoder.raw_decode(buffer, pos)
+                    except json.JSONDecodeError:
+                        element, end = None, None
+                    
+                    # Only trust the element once it is terminated by more input,
+                    # otherwise it may be cut off at the chunk boundary
+                    if end is None or (end >= len(buffer) and not eof):
+                        if eof:
+                            raise ValueError(f"truncated JSON array at offset {pos}")
+                        chunk = f.read(chunk_size)
+                        eof = not chunk
+                        buffer = buffer[pos:] + chunk
+                        pos = 0
+                        continue
+                    
+                    yield element
+                    pos = end
+        except Exception as e:
+            # Records already yielded can't be taken back; fail the whole run instead of a partial season
+            raise ValueError(f"Error streaming records from {path}: {str(e)}") from e
+    
     def _load_matches(self, path):
         """Load match data from file"""
         if not path or not os.path.exists(path):
             return []
             
         try:
-            with open(path, 'r') as f:
-                return json.load(f)
+            return json_backend.load_file(path)
         except Exception as e:
             print(f"Error loading matches from {path}: {str(e)}")
             return []
@@ -154,85 +456,87 @@ class SeasonDataCombiner:
             return []
             
         try:
-            with open(path, 'r') as f:
-                return json.load(f)
+            return json_backend.load_file(path)
         except Exception as e:
             print(f"Error loading stats from {path}: {str(e)}")
             return []
     
+    def _add_match_views(self, player_matches, match, season):
+        """Append the home and away player's view of a match to their histories (keyed by player id)"""
+        home_player = match.get('homePlayer')
+        away_player = match.get('awayPlayer')
+        winner = match.get('winner')
+        forfeit = match.get('forfeit', False)
+        date = match.get('date')
+        calendar_season = season_catalog.real_season_name(season)
+        
+        # Process home player
+        if home_player:
+            home_id = match.get('homePlayerId') or self.identities.player_id(home_player)
+            if home_id not in player_matches:
+                player_matches[home_id] = []
+            
+            player_matches[home_id].append(PlayerMatchView(
+                away_player, match.get('homeTeam'), match.get('awayTeam'),
+                match.get('homeHCP'), match.get('homeScore'), match.get('awayScore'),
+                winner == home_player, forfeit, date, season['name'], season['year'], True, calendar_season))
+        
+        # Process away player
+        if away_player:
+            away_id = match.get('awayPlayerId') or self.identities.player_id(away_player)
+            if away_id not in player_matches:
+                player_matches[away_id] = []
+            
+            player_matches[away_id].append(PlayerMatchView(
+                home_player, match.get('awayTeam'), match.get('homeTeam'),
+                match.get('awayHCP'), match.get('awayScore'), match.get('homeScore'),
+                winner == away_player, forfeit, date, season['name'], season['year'], False, calendar_season))
+    
+    def _add_stat_row(self, player_stats, stat, season):
+        """Append a season stat row to the player's stat history (keyed by player id)"""
+        player_name = stat.get('name')
+        if not player_name:
+            return
+        
+        player_id = stat.get('playerId') or self.identities.player_id(player_name)
+        if player_id not in player_stats:
+            player_stats[player_id] = []
+        
+        player_stats[player_id].append(PlayerSeasonStat.from_dict(stat, season['name'], season['year']))
+    
     def generate_player_history(self):
         """Generate a comprehensive player history across all seasons"""
-        all_matches, all_stats = self.load_season_data()
-        if not all_matches and not all_stats:
+        if not self.available_seasons and self.store is None:
+            print("No season data available.")
             print("No data available to generate player history.")
             return None
-            
-        # Group match data by player
-        player_matches = {}
         
-        for match in all_matches:
-            # Process home player
-            home_player = match.get('homePlayer')
-            if home_player:
-                if home_player not in player_matches:
-                    player_matches[home_player] = []
-                
-                player_matches[home_player].append({
-                    'opponent': match.get('awayPlayer'),
-                    'player_team': match.get('homeTeam'),
-                    'opponent_team': match.get('awayTeam'),
-                    'player_hcp': match.get('homeHCP'),
-                    'player_score': match.get('homeScore'),
-                    'opponent_score': match.get('awayScore'),
-                    'win': match.get('winner') == home_player,
-                    'forfeit': match.get('forfeit', False),
-                    'date': match.get('date'),
-                    'season_name': match.get('season_name'),
-                    'season_year': match.get('season_year')
-                })
-            
-            # Process away player
-            away_player = match.get('awayPlayer')
-            if away_player:
-                if away_player not in player_matches:
-                    player_matches[away_player] = []
-                
-                player_matches[away_player].append({
-                    'opponent': match.get('homePlayer'),
-                    'player_team': match.get('awayTeam'),
-                    'opponent_team': match.get('homeTeam'),
-                    'player_hcp': match.get('awayHCP'),
-                    'player_score': match.get('awayScore'),
-                    'opponent_score': match.get('homeScore'),
-                    'win': match.get('winner') == away_player,
-                    'forfeit': match.get('forfeit', False),
-                    'date': match.get('date'),
-                    'season_name': match.get('season_name'),
-                    'season_year': match.get('season_year')
-                })
-        
-        # Group stats by player
+        if self.history_workers > 1:
+            return self._generate_player_history_sharded()
+        
+        # Group match data and stats by player straight off the record stream,
+        # so only the per-player views are held in memory
+        player_matches = {}
         player_stats = {}
+        has_records = False
+        
+        # Team aggregates and the skill model's games are folded in during the same pass
+        self.team_aggregates = TeamAggregator(self.identities)
+        self.skill_games = SkillGames(self.identities)
+        
+        for record_type, season, record in self.iter_season_records():
+            has_records = True
+            if record_type == 'match':
+                self._add_match_views(player_matches, record, season)
+                self.team_aggregates.add_match(record, season)
+                self.skill_games.add_match(record, season)
+            else:
+                self._add_stat_row(player_stats, record, season)
+                self.team_aggregates.add_stat(record, season)
         
-        for stat in all_stats:
-            player_name = stat.get('name')
-            if not player_name:
-                continue
-                
-            if player_name not in player_stats:
-                player_stats[player_name] = []
-            
-            player_stats[player_name].append({
-                'team': stat.get('team'),
-                'handicap': stat.get('handicap'),
-                'wins': stat.get('wins'),
-                'losses': stat.get('losses'),
-                'total': stat.get('total'),
-                'win_percentage': stat.get('winPercentage'),
-                'division': stat.get('division'),
-                'season_name': stat.get('season_name'),
-                'season_year': stat.get('season_year')
-            })
+        if not has_records:
+            print("No data available to generate player history.")
+            return None
         
         # Combine matches and stats for each player
         player_history = {}
@@ -240,52 +544,168 @@ class SeasonDataCombiner:
         # Process all players from both matches and stats
         all_players = set(list(player_matches.keys()) + list(player_stats.keys()))
         
-        for player_name in all_players:
-            matches = player_matches.get(player_name, [])
-            stats = player_stats.get(player_name, [])
-            
-            # Sort matches by date (if available)
-            matches.sort(key=lambda x: x.get('date', '0000-00-00'))
-            
-            # Sort stats by season year and season index
-            stats.sort(key=lambda x: (x.get('season_year', 0), self._season_index(x.get('season_name', ''))))
-            
-            # Calculate trends for handicap
-            handicap_trend = self._calculate_handicap_trend(stats)
-            
-            # Calculate win percentage trend
-            recent_win_percentage = self._calculate_recent_win_percentage(matches)
-            
-            # Track team changes
-            team_history = self._track_team_history(stats, matches)
-            
-            # Calculate ELO-like rating based on match performance
-            elo_rating, rating_trend = self._calculate_player_rating(matches)
+        for player_id in all_players:
+            player_name = self.identities.player_name(player_id)
+            player_history[player_name] = self._build_player_entry(
+                player_name, player_matches.get(player_id, []), player_stats.get(player_id, []), player_id)
+        
+        return player_history
+    
+    def _generate_player_history_sharded(self):
+        """generate_player_history across a process pool, with players partitioned by id.
+        
+        The parent streams the records once, stamps player ids, feeds the team
+        aggregates and routes each record to the shard of every player it
+        involves. Workers build the views and entries, and the results are
+        merged in serial order, so the files are byte-identical to a serial
+        run. Entries hold plain dicts instead of record objects.
+        """
+        # A few shards per worker evens out players with long histories
+        shard_count = self.history_workers * 4
+        match_rows = [[] for _ in range(shard_count)]
+        stat_rows = [[] for _ in range(shard_count)]
+        seasons = []
+        season_indexes = {}
+        # First-seen order of player ids, mirroring the serial path's dict keys
+        match_players = {}
+        stat_players = {}
+        self.team_aggregates = TeamAggregator(self.identities)
+        self.skill_games = SkillGames(self.identities)
+        
+        for record_type, season, record in self.iter_season_records():
+            season_index = season_indexes.get(id(season))
+            if season_index is None:
+                season_index = season_indexes[id(season)] = len(seasons)
+                seasons.append({'name': season['name'], 'year': season['year'],
+                                'metadata': {'season': season_catalog.real_season_name(season)}})
             
-            player_history[player_name] = {
-                'name': player_name,
-                'matches': matches,
-                'stats': stats,
-                'handicap_trend': handicap_trend,
-                'recent_win_percentage': recent_win_percentage,
-                'team_history': team_history,
-                'elo_rating': elo_rating,
-                'rating_trend': rating_trend,
-                'current_team': team_history[-1] if team_history else None,
-                'current_handicap': stats[-1].get('handicap') if stats else None,
-                'handicap_changed_recently': self._has_handicap_changed_recently(stats),
-                'seasons_played': len(set([(s.get('season_name'), s.get('season_year')) for s in stats]))
-            }
+            if record_type == 'match':
+                self.team_aggregates.add_match(record, season)
+                self.skill_games.add_match(record, season)
+                ids = {}
+                for side in ('home', 'away'):
+                    name = record.get(f'{side}Player')
+                    if name:
+                        ids[f'{side}PlayerId'] = record.get(f'{side}PlayerId') or self.identities.player_id(name)
+                        match_players.setdefault(ids[f'{side}PlayerId'], None)
+                record = dict(record, **ids)
+                for shard in {player_id % shard_count for player_id in ids.values()}:
+                    match_rows[shard].append((season_index, record))
+            else:
+                self.team_aggregates.add_stat(record, season)
+                name = record.get('name')
+                if not name:
+                    continue
+                player_id = record.get('playerId') or self.identities.player_id(name)
+                stat_players.setdefault(player_id, None)
+                stat_rows[player_id % shard_count].append((season_index, dict(record, playerId=player_id)))
+        
+        if not match_players and not stat_players:
+            print("No data available to generate player history.")
+            return None
         
+        all_players = set(list(match_players.keys()) + list(stat_players.keys()))
+        names = {player_id: self.identities.player_name(player_id) for player_id in all_players}
+        
+        entries = {}
+        with ProcessPoolExecutor(max_workers=self.history_workers) as pool:
+            futures = []
+            for shard in range(shard_count):
+                if not match_rows[shard] and not stat_rows[shard]:
+                    continue
+                shard_names = {player_id: name for player_id, name in names.items() if player_id % shard_count == shard}
+                futures.append(pool.submit(_build_player_shard, shard, shard_count, seasons, shard_names,
+                                           self.rolling_windows, match_rows[shard], stat_rows[shard]))
+            for future in futures:
+                entries.update(future.result())
+        
+        # Merge in the same order as a serial run
+        player_history = {}
+        for player_id in all_players:
+            player_history[names[player_id]] = entries[player_id]
         return player_history
     
+    def _build_player_entry(self, player_name, matches, stats, player_id=None):
+        """Build a player's history entry from their match views and stat rows"""
+        # Sort matches by date (if available); undated matches go first
+        matches.sort(key=lambda x: x.date or '0000-00-00')
+        
+        # Sort stats by season year and season index
+        stats.sort(key=lambda x: (x.season_year, self._season_index(x.season_name)))
+        
+        # Calculate trends for handicap
+        handicap_trend = self._calculate_handicap_trend(stats)
+        
+        # Prefix sums over the stored history back the legacy recent/rating fields
+        rolling = RollingStats(matches, groups=())
+        
+        # Calculate win percentage trend
+        recent_win_percentage = self._calculate_recent_win_percentage(matches, rolling=rolling)
+        
+        # Track team changes
+        team_history = self._track_team_history(stats, matches)
+        
+        # Calculate ELO-like rating based on match performance
+        elo_rating, rating_trend = self._calculate_player_rating(matches, rolling=rolling)
+        
+        return {
+            'name': player_name,
+            'id': player_id,
+            'matches': matches,
+            'stats': stats,
+            'handicap_trend': handicap_trend,
+            'recent_win_percentage': recent_win_percentage,
+            'team_history': team_history,
+            'elo_rating': elo_rating,
+            'rating_trend': rating_trend,
+            'rating_change': self._calculate_rating_change(rolling),
+            # One pass over the distinct games serves every configured window
+            'rolling': RollingStats(distinct_games(matches), self.rolling_windows.get('groups', ())).to_dict(self.rolling_windows),
+            'current_team': team_history[-1] if team_history else None,
+            'current_handicap': stats[-1].handicap if stats else None,
+            'handicap_changed_recently': self._has_handicap_changed_recently(stats),
+            'seasons_played': len(set([(s.season_name, s.season_year) for s in stats]))
+        }
+    
+    def generate_player_entry(self, player_name):
+        """Generate a single player's history entry.
+        
+        With a store this only reads the player's own rows via the player indexes;
+        otherwise it falls back to a full pass over the season files.
+        """
+        if self.store is None:
+            return (self.generate_player_history() or {}).get(player_name)
+        
+        player_id = self.identities.player_id(player_name)
+        spellings = tuple(self.identities.spellings('players', player_id))
+        seasons = {season['key']: season for season in self._store_seasons()}
+        order = list(seasons)
+        player_matches = {}
+        player_stats = {}
+        
+        # Visit rows in the same season order as a full pass so ties sort identically
+        for season_key, match in sorted(self.store.player_matches(*spellings),
+                                        key=lambda item: order.index(item[0])):
+            self._add_match_views(player_matches, match, seasons[season_key])
+        
+        for season_key, stat in sorted(self.store.player_stats(*spellings),
+                                       key=lambda item: order.index(item[0])):
+            self._add_stat_row(player_stats, stat, seasons[season_key])
+        
+        if player_id not in player_matches and player_id not in player_stats:
+            return None
+        
+        return self._build_player_entry(
+            self.identities.player_name(player_id), player_matches.get(player_id, []),
+            player_stats.get(player_id, []), player_id)
+    
     def _calculate_handicap_trend(self, stats):
         """Calculate handicap trend over time"""
         if not stats or len(stats) < 2:
             return 'stable'
             
         # Get handicaps in chronological order
-        handicaps = [s.get('handicap') for s in stats if s.get('handicap') is not None]
+        handicaps = [s.handicap for s in stats if s.handicap is not None]
         
         if not handicaps or len(handicaps) < 2:
             return 'stable'
@@ -303,32 +723,17 @@ class SeasonDataCombiner:
             return False
             
         # Get the two most recent stats
-        recent_stats = sorted(stats, key=lambda x: (x.get('season_year', 0), self._season_index(x.get('season_name', ''))))[-2:]
+        recent_stats = sorted(stats, key=lambda x: (x.season_year, self._season_index(x.season_name)))[-2:]
         
         if len(recent_stats) < 2:
             return False
             
-        return recent_stats[0].get('handicap') != recent_stats[1].get('handicap')
+        return recent_stats[0].handicap != recent_stats[1].handicap
     
-    def _calculate_recent_win_percentage(self, matches, recent_matches=10):
-        """Calculate win percentage for recent matches"""
-        if not matches:
-            return 0
-            
-        # Filter out forfeit matches
-        valid_matches = [m for m in matches if not m.get('forfeit', False)]
-        
-        if not valid_matches:
-            return 0
-            
-        # Get most recent matches
-        recent = valid_matches[-min(recent_matches, len(valid_matches)):]
-        
-        if not recent:
-            return 0
-            
-        wins = sum(1 for m in recent if m.get('win', False))
-        return (wins / len(recent)) * 100
+    def _calculate_recent_win_percentage(self, matches, recent_matches=10, rolling=None):
+        """Calculate win percentage for recent matches (forfeits excluded)"""
+        rolling = rolling or RollingStats(matches, groups=())
+        return rolling.recent_win_percentage(recent_matches)
     
     def _track_team_history(self, stats, matches):
         """Track player's team history"""
@@ -337,7 +742,7 @@ class SeasonDataCombiner:
         # First, try to extract from stats which has explicit team info
         if stats:
             for stat in stats:
-                team = stat.get('team')
+                team = stat.team
                 if team and (not team_history or team_history[-1] != team):
                     team_history.append(team)
         
@@ -345,53 +750,45 @@ class SeasonDataCombiner:
         if not team_history and matches:
             seen_teams = set()
             for match in matches:
-                team = match.get('player_team')
+                team = match.player_team
                 if team and team not in seen_teams:
                     seen_teams.add(team)
                     team_history.append(team)
         
         return team_history
     
-    def _calculate_player_rating(self, matches, base_rating=1500, k_factor=32):
+    def _calculate_player_rating(self, matches, base_rating=1500, k_factor=32, rolling=None):
         """Calculate an ELO-like rating based on match history"""
-        if not matches:
-            return base_rating, 'stable'
-            
-        # Filter out forfeit matches
-        valid_matches = [m for m in matches if not m.get('forfeit', False)]
+        rolling = rolling or RollingStats(matches, groups=())
+        played = rolling.played[-1]
         
-        if not valid_matches:
+        # Forfeits don't count towards the rating
+        if not played:
             return base_rating, 'stable'
-            
-        # Start with base rating
-        rating = base_rating
-        rating_history = [base_rating]
-        
-        for match in valid_matches:
-            # Simple win/loss rating adjustment
-            if match.get('win', False):
-                rating += k_factor
-            else:
-                rating -= k_factor
-            
-            rating_history.append(rating)
+        
+        # Simple win/loss adjustment per game, so the rating is a prefix sum of net wins
+        rating = base_rating + k_factor * rolling.recent_net_wins(played)
         
         # Determine trend
-        if len(rating_history) < 3:
+        if played < 2:
             trend = 'stable'
         else:
-            # Look at the trend over the last 5 matches or fewer if not available
-            recent = rating_history[-min(5, len(rating_history)):]
+            # Look at the trend over the last 5 ratings (the last 4 games) or fewer if not available
+            change = k_factor * rolling.recent_net_wins(4)
             
-            if recent[-1] > recent[0] + 20:  # Significant improvement
+            if change > 20:  # Significant improvement
                 trend = 'improving'
-            elif recent[-1] < recent[0] - 20:  # Significant decline
+            elif change < -20:  # Significant decline
                 trend = 'declining'
             else:
                 trend = 'stable'
         
         return rating, trend
     
+    def _calculate_rating_change(self, rolling, recent_games=10, k_factor=32):
+        """Change in the ELO-like rating over the last recent_games non-forfeit games"""
+        return k_factor * rolling.recent_net_wins(recent_games)
+    
     def save_combined_data(self, output_dir="public/data/combined"):
         """Save combined player history data"""
         os.makedirs(output_dir, exist_ok=True)
@@ -401,9 +798,16 @@ class SeasonDataCombiner:
             print("No player history data to save.")
             return
         
+        # Both files are written atomically and skipped when unchanged
+        batch = ArtifactBatch()
+        
         # Save full player history
-        with open(f"{output_dir}/player_history.json", 'w') as f:
-            json.dump(player_history, f, indent=2)
+        batch.stage_json(f"{output_dir}/player_history.json", player_history, to_history_json)
+        
+        # Refit the skill model, warm-started from the previous run's parameters
+        model = skill_model.fit_games(self.skill_games, skill_model.load_model(output_dir))
+        if model:
+            batch.stage_json(f"{output_dir}/{skill_model.MODEL_FILE}", model)
         
         # Create summary data with essential stats only
         player_summary = {}
@@ -411,6 +815,7 @@ class SeasonDataCombiner:
         for player_name, history in player_history.items():
             player_summary[player_name] = {
                 'name': player_name,
+                'id': history['id'],
                 'current_team': history['current_team'],
                 'current_handicap': history['current_handicap'],
                 'handicap_trend': history['handicap_trend'],
@@ -418,20 +823,58 @@ class SeasonDataCombiner:
                 'recent_win_percentage': history['recent_win_percentage'],
                 'elo_rating': history['elo_rating'],
                 'rating_trend': history['rating_trend'],
+                'rating_change': history['rating_change'],
+                'rolling': history['rolling'],
+                'skill': skill_model.player_skill(model, history['id']),
                 'seasons_played': history['seasons_played'],
                 'team_history': history['team_history']
             }
         
         # Save summary data
-        with open(f"{output_dir}/player_summary.json", 'w') as f:
-            json.dump(player_summary, f, indent=2)
+        batch.stage_json(f"{output_dir}/player_summary.json", player_summary)
+        
+        # Team-level aggregates from the same pass
+        batch.stage_json(f"{output_dir}/team_summary.json", self.team_aggregates.team_summary())
+        batch.stage_json(f"{output_dir}/team_pairs.json", self.team_aggregates.team_pairs())
+        
+        # Sorted, paged leaderboards, updated from the previous run's pages
+        stale_pages = leaderboards.stage_leaderboards(batch, output_dir, player_summary)
+        batch.commit()
+        leaderboards.remove_stale_pages(stale_pages)
+        batch.report()
+        
+        # Persist any ids assigned to names first seen in this run
+        self.identities.save()
+        
+        # Keep the store's ratings table in step with the published summary
+        if self.store is not None:
+            self.store.upsert_ratings(player_history)
         
         print(f"Combined data saved to:")
         print(f"  - {output_dir}/player_history.json")
         print(f"  - {output_dir}/player_summary.json")
+        print(f"  - {output_dir}/team_summary.json")
+        print(f"  - {output_dir}/team_pairs.json")
+        print(f"  - {output_dir}/{leaderboards.LEADERBOARD_DIR}/")
+        if model:
+            print(f"  - {output_dir}/{skill_model.MODEL_FILE} ({model['games']} games, {model['iterations']} iterations)")
 
 # Example usage
 if __name__ == "__main__":
-    combiner = SeasonDataCombiner()
+    import argparse
+    import profiling
+    
+    parser = argparse.ArgumentParser(description="Combine all seasons into player history and summary files")
+    parser.add_argument('--history-workers', type=int, default=1,
+                        help="Build player histories on this many processes (default: 1)")
+    parser.add_argument('--load-workers', type=int,
+                        help="Decode this many whole seasons at once instead of streaming them "
+                             "(default: one process per season and CPU without orjson, otherwise 1)")
+    profiling.add_profile_arguments(parser)
+    args = parser.parse_args()
+    profiler = profiling.from_args(args)
+    
+    combiner = SeasonDataCombiner(load_workers=args.load_workers, history_workers=args.history_workers)
     combiner.list_available_seasons()
-    combiner.save_combined_data()
+    with profiler.stage('combine'):
+        combiner.save_combined_data()
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Monte Carlo projection of the rest of the current season.
+
+Reads the season schedule (schedule_latest.json, from the first table on each
+team page) and the combined outputs, then plays every remaining fixture many
+times with batched NumPy draws:
+
+  - a team night is GAMES_PER_NIGHT games (the most common count in the
+    league's history); the games a team wins are Binomial(games, p)
+  - p is the skill model's mean win probability over every pairing of the
+    two current rosters (strength plus handicap effect, see skill_model)
+  - points per game won and lost are fitted from past team nights
+
+Teams are ranked by season points, then team nights won, with remaining ties
+broken at random. The result is each team's finishing-position distribution
+and playoff odds, written to combined/season_projection.json. Draws use a
+fixed seed, so unchanged inputs give an unchanged file. Chunks of simulations
+run on a process pool when more than one worker is available.
+"""
+import os
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import json_backend
+import skill_model
+from identity_registry import IdentityRegistry
+from season_catalog import date_sort_key
+from artifact_writer import write_json_atomic
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+PROJECTION_FILE = "season_projection.json"
+DEFAULT_SIMULATIONS = 20000
+DEFAULT_PLAYOFF_SPOTS = 4
+CHUNK_SIZE = 5000
+SEED = 2025
+
+def _load(path):
+    return json_backend.load_file(path) if os.path.exists(path) else None
+
+def current_season_label(team_summary):
+    """Label of the live season in team_summary.json ('Current <year>')"""
+    labels = {label for team in team_summary.values() for label in team['seasons']}
+    current = sorted(label for label in labels if label.startswith('Current'))
+    return current[-1] if current else None
+
+def night_model(team_summary):
+    """(games per night, points per game won, points per game lost) fitted from past team nights"""
+    games, won, lost, points = [], [], [], []
+    for team in team_summary.values():
+        for season in team['seasons'].values():
+            for week in season['weeks']:
+                if week['games_won'] + week['games_lost']:
+                    games.append(week['games_won'] + week['games_lost'])
+                    won.append(week['games_won'])
+                    lost.append(week['games_lost'])
+                    points.append(week['points_for'])
+    if not games:
+        return 4, 5.0, 2.0
+
+    games_per_night = int(np.bincount(games).argmax())
+    # points_for ~ won * points_per_win + lost * points_per_loss
+    design = np.column_stack([won, lost]).astype(np.float64)
+    (per_win, per_loss), *_ = np.linalg.lstsq(design, np.asarray(points, dtype=np.float64), rcond=None)
+    return games_per_night, float(per_win), float(per_loss)
+
+def game_probability(model, roster_a, roster_b):
+    """Mean probability that a player of roster A beats one of roster B (rosters: [(strength, handicap)])"""
+    if not roster_a or not roster_b:
+        return 0.5
+    a = np.asarray(roster_a, dtype=np.float64)
+    b = np.asarray(roster_b, dtype=np.float64)
+    handicap_effect = model['handicap_effect'] if model else 0.0
+    margin = a[:, None, 0] - b[None, :, 0] + handicap_effect * (a[:, None, 1] - b[None, :, 1])
+    return float((1.0 / (1.0 + np.exp(-margin))).mean())
+
+def team_rosters(player_summary, model, identities):
+    """Current roster per team id as (strength, handicap) pairs"""
+    rosters = {}
+    for player in player_summary.values():
+        team = player.get('current_team')
+        if not team:
+            continue
+        skill = player.get('skill') if model else None
+        rosters.setdefault(identities.team_id(team), []).append(
+            (skill['strength'] if skill else 0.0, player.get('current_handicap') or 0))
+    return rosters
+
+def _simulate_chunk(seed, simulations, probabilities, games, per_win, per_loss,
+                    home, away, base_points, base_nights):
+    """Play the remaining fixtures `simulations` times; returns (position counts, points sum)"""
+    rng = np.random.default_rng(seed)
+    team_count = len(base_points)
+    fixture_count = len(probabilities)
+
+    home_wins = rng.binomial(games, probabilities, size=(simulations, fixture_count))
+    home_points = home_wins * per_win + (games - home_wins) * per_loss
+    away_points = (games - home_wins) * per_win + home_wins * per_loss
+
+    # Scatter each fixture's result onto its two teams with one incidence product
+    home_incidence = np.zeros((fixture_count, team_count))
+    home_incidence[np.arange(fixture_count), home] = 1.0
+    away_incidence = np.zeros((fixture_count, team_count))
+    away_incidence[np.arange(fixture_count), away] = 1.0
+
+    points = base_points + home_points @ home_incidence + away_points @ away_incidence
+    nights = (base_nights + (home_points > away_points) @ home_incidence
+              + (away_points > home_points) @ away_incidence)
+
+    # Points first, nights won second, coin flip last
+    key = points * 1000.0 + nights + rng.random((simulations, team_count)) * 0.5
+    order = np.argsort(-key, axis=1)
+    positions = np.empty_like(order)
+    positions[np.arange(simulations)[:, None], order] = np.arange(team_count)
+
+    counts = np.bincount((np.arange(team_count) * team_count + positions).ravel(),
+                         minlength=team_count * team_count).reshape(team_count, team_count)
+    return counts, points.sum(axis=0)
+
+def fixture_key(identities, date, team, opponent):
+    """(date, team ids) of a fixture, the same however its team names and date are written"""
+    day = date_sort_key(date) or (date or '').strip().casefold()
+    return (day,) + tuple(sorted((identities.team_id(team) or 0, identities.team_id(opponent) or 0)))
+
+def remaining_fixtures(schedule, team_summary, season_label, identities=None):
+    """Scheduled fixtures with no result yet in the live season"""
+    identities = identities or IdentityRegistry()
+    played = set()
+    for name, team in team_summary.items():
+        season = team['seasons'].get(season_label) if season_label else None
+        for week in (season or {}).get('weeks', []):
+            played.add(fixture_key(identities, week['date'], name, week['opponent']))
+    return [fixture for fixture in schedule
+            if fixture_key(identities, fixture['date'], fixture['team'], fixture['opponent']) not in played]
+
+def simulate_season(schedule, team_summary, player_summary, model, simulations=DEFAULT_SIMULATIONS,
+                    playoff_spots=DEFAULT_PLAYOFF_SPOTS, workers=1, seed=SEED, identities=None):
+    """Projection dict for the live season, or None when there is nothing to simulate"""
+    # Schedule, summary and roster spellings of a team are matched by id
+    identities = identities or IdentityRegistry()
+    season_label = current_season_label(team_summary)
+    fixtures = remaining_fixtures(schedule, team_summary, season_label, identities)
+
+    teams = sorted({fixture['team'] for fixture in schedule} | {fixture['opponent'] for fixture in schedule})
+    if not teams:
+        return None
+    team_index = {team: i for i, team in enumerate(teams)}
+
+    summaries = {identities.team_id(name): team for name, team in team_summary.items()}
+    base_points = np.zeros(len(teams))
+    base_nights = np.zeros(len(teams))
+    for team in teams:
+        summary = summaries.get(identities.team_id(team), {})
+        season = summary.get('seasons', {}).get(season_label) if season_label else None
+        if season:
+            base_points[team_index[team]] = season['points_for']
+            base_nights[team_index[team]] = season['wins']
+
+    games, per_win, per_loss = night_model(team_summary)
+    rosters = team_rosters(player_summary, model, identities)
+    probabilities = np.array([game_probability(model, rosters.get(identities.team_id(fixture['team'])),
+                                               rosters.get(identities.team_id(fixture['opponent'])))
+                              for fixture in fixtures])
+    home = np.array([team_index[fixture['team']] for fixture in fixtures], dtype=np.int64)
+    away = np.array([team_index[fixture['opponent']] for fixture in fixtures], dtype=np.int64)
+
+    # Fixed-size chunks with spawned seeds give the same draws for any worker count
+    chunk_sizes = [min(CHUNK_SIZE, simulations - start) for start in range(0, simulations, CHUNK_SIZE)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    args = [(chunk_seed, size, probabilities, games, per_win, per_loss, home, away, base_points, base_nights)
+            for chunk_seed, size in zip(seeds, chunk_sizes)]
+
+    counts = np.zeros((len(teams), len(teams)), dtype=np.int64)
+    points_sum = np.zeros(len(teams))
+    if workers > 1 and len(args) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_simulate_chunk, *zip(*args)))
+    else:
+        results = [_simulate_chunk(*chunk_args) for chunk_args in args]
+    for chunk_counts, chunk_points in results:
+        counts += chunk_counts
+        points_sum += chunk_points
+
+    distribution = counts / simulations
+    expected = distribution @ np.arange(1, len(teams) + 1)
+    projection = {
+        'season': season_label,
+        'simulations': simulations,
+        'remaining_fixtures': len(fixtures),
+        'games_per_night': games,
+        'points_per_game_won': round(per_win, 3),
+        'points_per_game_lost': round(per_loss, 3),
+        'playoff_spots': playoff_spots,
+        'teams': {}
+    }
+    for i in np.argsort(expected, kind='stable').tolist():
+        projection['teams'][teams[i]] = {
+            'points': int(base_points[i]),
+            'projected_points': round(float(points_sum[i] / simulations), 1),
+            'expected_position': round(float(expected[i]), 2),
+            'playoff_odds': round(float(distribution[i, :playoff_spots].sum()), 4),
+            'positions': [round(float(p), 4) for p in distribution[i]]
+        }
+    return projection
+
+def project_season(data_dir, simulations=DEFAULT_SIMULATIONS, playoff_spots=DEFAULT_PLAYOFF_SPOTS, workers=None,
+                   identities=None):
+    """Simulate the rest of a league's season from its data folder and write the projection"""
+    if np is None:
+        print("NumPy is not installed; skipping the season projection.")
+        return None
+
+    combined_dir = os.path.join(data_dir, "combined")
+    schedule = _load(os.path.join(data_dir, "schedule_latest.json"))
+    team_summary = _load(os.path.join(combined_dir, "team_summary.json"))
+    if not schedule or team_summary is None:
+        print("No schedule or team summary available; skipping the season projection.")
+        return None
+
+    player_summary = _load(os.path.join(combined_dir, "player_summary.json")) or {}
+    model = skill_model.load_model(combined_dir)
+    projection = simulate_season(schedule, team_summary, player_summary, model, simulations,
+                                 playoff_spots, workers or os.cpu_count() or 1,
+                                 identities=identities or IdentityRegistry.for_data_dir(data_dir))
+    if projection is None:
+        return None
+
+    path = os.path.join(combined_dir, PROJECTION_FILE)
+    write_json_atomic(path, projection)
+    print(f"Season projection ({projection['remaining_fixtures']} fixtures left, "
+          f"{simulations} simulations) saved to {path}")
+    return projection
+
+def main():
+    parser = argparse.ArgumentParser(description="Project the rest of the season by Monte Carlo simulation")
+    parser.add_argument('--data-dir', default="public/data")
+    parser.add_argument('--simulations', type=int, default=DEFAULT_SIMULATIONS)
+    parser.add_argument('--playoff-spots', type=int, default=DEFAULT_PLAYOFF_SPOTS)
+    parser.add_argument('--workers', type=int, help="Simulation processes (default: CPU count)")
+    args = parser.parse_args()
+    project_season(args.data_dir, args.simulations, args.playoff_spots, args.workers)
+
+if __name__ == "__main__":
+    main()
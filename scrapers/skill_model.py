@@ -0,0 +1,214 @@
+"""
+Bradley-Terry skill model fitted over the full match history.
+
+Every distinct non-forfeit game is one row (player, opponent, outcome,
+handicap difference), and the model is
+
+  P(player beats opponent) = 1 / (1 + exp(-(s_player - s_opponent + b * hcp_diff)))
+
+with a per-player strength s, a league-wide handicap effect b, and a normal
+prior on s (sd PRIOR_SD) that keeps players with few games near average.
+The fit runs Newton iterations over NumPy arrays. Each Newton system is
+solved with conjugate gradients, where gradients and Hessian-vector products
+are bincounts over the game rows. Each player's uncertainty comes from the
+curvature at the optimum, like a Glicko rating deviation.
+
+A fit can warm-start from the previous run's parameters (skill_model.json),
+so a nightly refit only needs a few iterations. NumPy is optional. Without
+it the fit is skipped and player_summary.json has no 'skill' fields.
+"""
+import os
+import math
+
+import json_backend
+from match_keys import canonical_match_key
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+MODEL_FILE = "skill_model.json"
+MODEL_VERSION = 1
+PRIOR_SD = 1.0
+# A very weak prior on the handicap effect keeps it defined when no game has a handicap gap
+HANDICAP_PRECISION = 1e-3
+MAX_ITERATIONS = 25
+TOLERANCE = 1e-9
+# Displayed ratings use the Elo scale, so 200 points is roughly 76% to win
+RATING_BASE = 1500
+RATING_SCALE = 400 / math.log(10)
+
+class SkillGames:
+    """Distinct non-forfeit games collected from the combiner's record stream"""
+
+    def __init__(self, identities):
+        self.identities = identities
+        # Per-season dedupe state, as in match_keys.iter_keyed_matches
+        self.occurrences = {}
+        self.seen = set()
+        self.players = []
+        self.opponents = []
+        self.outcomes = []
+        self.handicap_diffs = []
+
+    def add_match(self, match, season):
+        """Add one scraped match (second copies and forfeits are skipped)"""
+        home_player = match.get('homePlayer')
+        away_player = match.get('awayPlayer')
+        winner = match.get('winner')
+        if not home_player or not away_player or match.get('forfeit') or winner not in (home_player, away_player):
+            return
+
+        key = (season['name'], season['year']) + canonical_match_key(match)
+        source = (key, match.get('homeTeam'))
+        occurrence = self.occurrences.get(source, 0)
+        self.occurrences[source] = occurrence + 1
+        if (key, occurrence) in self.seen:
+            return
+        self.seen.add((key, occurrence))
+
+        self.players.append(match.get('homePlayerId') or self.identities.player_id(home_player))
+        self.opponents.append(match.get('awayPlayerId') or self.identities.player_id(away_player))
+        self.outcomes.append(1.0 if winner == home_player else 0.0)
+        self.handicap_diffs.append((match.get('homeHCP') or 0) - (match.get('awayHCP') or 0))
+
+    def __len__(self):
+        return len(self.outcomes)
+
+def _win_probabilities(strength, handicap_effect, i, j, d):
+    margin = np.clip(strength[i] - strength[j] + handicap_effect * d, -30.0, 30.0)
+    return 1.0 / (1.0 + np.exp(-margin))
+
+def _hessian_product(v, weight, i, j, d, n, precision):
+    """Negative log-posterior Hessian times v, where v holds the strengths then the handicap effect"""
+    u = weight * (v[:n][i] - v[:n][j] + d * v[n])
+    return np.append(np.bincount(i, u, n) - np.bincount(j, u, n) + precision * v[:n],
+                     float(np.dot(u, d)) + HANDICAP_PRECISION * v[n])
+
+def _conjugate_gradient(product, b, diagonal, iterations=100):
+    """Solve H x = b for symmetric positive definite H (given as a product function), Jacobi-preconditioned"""
+    # Solve only as exactly as the Newton step needs: looser far from the optimum
+    b_norm = float(np.dot(b, b)) ** 0.5
+    tolerance = (min(0.1, b_norm) * b_norm) ** 2
+    x = np.zeros_like(b)
+    if not b_norm:
+        return x
+    r = b.copy()
+    z = r / diagonal
+    direction = z.copy()
+    rz = float(np.dot(r, z))
+    for _ in range(iterations):
+        hd = product(direction)
+        alpha = rz / float(np.dot(direction, hd))
+        x += alpha * direction
+        r -= alpha * hd
+        if float(np.dot(r, r)) < tolerance:
+            break
+        z = r / diagonal
+        rz_next = float(np.dot(r, z))
+        direction = z + (rz_next / rz) * direction
+        rz = rz_next
+    return x
+
+def fit(players, opponents, outcomes, handicap_diffs, warm_start=None, prior_sd=PRIOR_SD,
+        max_iterations=MAX_ITERATIONS, tolerance=TOLERANCE):
+    """Fit strengths and the handicap effect; returns the model dict keyed by player id.
+
+    players/opponents are integer ids, outcomes 1.0 when the player won, and
+    warm_start a previous model dict to start from.
+    """
+    ids, index = np.unique(np.concatenate([np.asarray(players), np.asarray(opponents)]), return_inverse=True)
+    games = len(outcomes)
+    i = index[:games]
+    j = index[games:]
+    y = np.asarray(outcomes, dtype=np.float64)
+    d = np.asarray(handicap_diffs, dtype=np.float64)
+    n = len(ids)
+    precision = 1.0 / (prior_sd * prior_sd)
+
+    strength = np.zeros(n)
+    handicap_effect = 0.0
+    if warm_start:
+        previous = warm_start.get('players', {})
+        strength = np.array([previous.get(str(player_id), {}).get('strength', 0.0) for player_id in ids.tolist()])
+        handicap_effect = warm_start.get('handicap_effect', 0.0)
+
+    iterations = 0
+    for iterations in range(1, max_iterations + 1):
+        p = _win_probabilities(strength, handicap_effect, i, j, d)
+        residual = y - p
+        weight = p * (1.0 - p)
+
+        # Newton step for all parameters at once, solved by preconditioned conjugate
+        # gradients with Hessian-vector products (the Hessian itself is never built)
+        gradient = np.append(np.bincount(i, residual, n) - np.bincount(j, residual, n) - precision * strength,
+                             float(np.dot(residual, d)) - HANDICAP_PRECISION * handicap_effect)
+        diagonal = np.append(np.bincount(i, weight, n) + np.bincount(j, weight, n) + precision,
+                             float(np.dot(weight, d * d)) + HANDICAP_PRECISION)
+        step = _conjugate_gradient(lambda v: _hessian_product(v, weight, i, j, d, n, precision), gradient, diagonal)
+        strength += step[:n]
+        handicap_effect += float(step[n])
+
+        if float(np.abs(step).max()) < tolerance:
+            break
+
+    # Curvature at the optimum gives each strength's standard error
+    p = _win_probabilities(strength, handicap_effect, i, j, d)
+    weight = p * (1.0 - p)
+    curvature = np.bincount(i, weight, n) + np.bincount(j, weight, n) + precision
+    deviation = 1.0 / np.sqrt(curvature)
+    counts = np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+
+    model = {
+        'version': MODEL_VERSION,
+        'games': games,
+        'iterations': iterations,
+        'prior_sd': prior_sd,
+        'handicap_effect': round(handicap_effect, 6),
+        'rating_scale': round(RATING_SCALE, 6),
+        'players': {}
+    }
+    for player_id, s, sd, count in zip(ids.tolist(), strength.tolist(), deviation.tolist(), counts.tolist()):
+        model['players'][str(player_id)] = {'strength': round(s, 6), 'sd': round(sd, 6), 'games': count}
+    return model
+
+def fit_games(skill_games, warm_start=None):
+    """Fit the model over collected games, or None when NumPy or games are missing"""
+    if np is None:
+        print("NumPy is not installed; skipping the skill model fit.")
+        return None
+    if not len(skill_games):
+        return None
+    return fit(skill_games.players, skill_games.opponents, skill_games.outcomes,
+               skill_games.handicap_diffs, warm_start)
+
+def load_model(output_dir):
+    """The previous run's model (for warm starts), or None"""
+    path = os.path.join(output_dir, MODEL_FILE)
+    if not os.path.exists(path):
+        return None
+    try:
+        model = json_backend.load_file(path)
+    except Exception as e:
+        print(f"Error reading skill model {path}: {str(e)}")
+        return None
+    return model if model.get('version') == MODEL_VERSION else None
+
+def player_skill(model, player_id):
+    """The 'skill' block stored in player_summary.json for one player, or None"""
+    params = model['players'].get(str(player_id)) if model else None
+    if params is None:
+        return None
+    return {
+        'rating': round(RATING_BASE + RATING_SCALE * params['strength']),
+        'deviation': round(RATING_SCALE * params['sd']),
+        'strength': params['strength'],
+        'sd': params['sd'],
+        'games': params['games']
+    }
+
+def win_probability(model, player_skill_a, player_skill_b, handicap_a=0, handicap_b=0):
+    """Model probability that player A beats player B"""
+    margin = player_skill_a['strength'] - player_skill_b['strength'] + model['handicap_effect'] * (handicap_a - handicap_b)
+    return 1.0 / (1.0 + math.exp(-margin))
@@ -0,0 +1,202 @@
+"""
+Team-level aggregates, built in the combiner's single pass over the records.
+
+Matches are fed in as they stream past (each game counted once, using the
+canonical match key), and standings rows are fed in for roster strength.
+The results are two compact files for team pages and matchup previews:
+
+  team_summary.json  per team: per-season standings (team nights won, lost and
+                     tied, games and points), week-by-week results, and the
+                     current roster's handicap spread
+  team_pairs.json    per pair of teams: head-to-head nights, games and points,
+                     plus their most recent meeting
+
+A team night is decided by total points (the TOTALS row on the site).
+"""
+from match_keys import canonical_match_key
+from season_catalog import date_sort_key, real_season_name
+
+def pair_key(team_a, team_b):
+    """Order-independent key for a pair of team names"""
+    return "|".join(sorted((team_a, team_b)))
+
+def _new_night(date, season, opponent):
+    return {'date': date, 'season': season, 'opponent': opponent,
+            'points_for': 0, 'points_against': 0, 'games_won': 0, 'games_lost': 0, 'forfeits': 0}
+
+class TeamAggregator:
+    def __init__(self, identities):
+        self.identities = identities
+        # Per-season dedupe state, as in match_keys.iter_keyed_matches
+        self.occurrences = {}
+        self.seen = set()
+        # (team id, season label, date, opponent id) -> night totals from that team's side
+        self.nights = {}
+        self.season_order = []
+        # season label -> the season's own name, for ordering the live season's dates
+        self.season_names = {}
+        # team id -> (season order, [stat rows]) for the latest season seen
+        self.rosters = {}
+
+    def _season_label(self, season):
+        label = f"{season['name']} {season['year']}"
+        if label not in self.season_order:
+            self.season_order.append(label)
+            self.season_names[label] = real_season_name(season)
+        return label
+
+    def add_match(self, match, season):
+        """Fold one scraped match into the team nights (second copies are skipped)"""
+        home_team = match.get('homeTeam')
+        away_team = match.get('awayTeam')
+        if not home_team or not away_team:
+            return
+
+        label = self._season_label(season)
+        key = (label,) + canonical_match_key(match)
+        source = (key, home_team)
+        occurrence = self.occurrences.get(source, 0)
+        self.occurrences[source] = occurrence + 1
+        if (key, occurrence) in self.seen:
+            return
+        self.seen.add((key, occurrence))
+
+        home_id = match.get('homeTeamId') or self.identities.team_id(home_team)
+        away_id = match.get('awayTeamId') or self.identities.team_id(away_team)
+        date = match.get('date')
+        home_score = match.get('homeScore') or 0
+        away_score = match.get('awayScore') or 0
+        winner_team = match.get('winnerTeam')
+        home_won = winner_team == home_team if winner_team in (home_team, away_team) else None
+        forfeit = 1 if match.get('forfeit') else 0
+
+        for team_id, opponent_id, points_for, points_against, won in (
+                (home_id, away_id, home_score, away_score, home_won),
+                (away_id, home_id, away_score, home_score, None if home_won is None else not home_won)):
+            night_key = (team_id, label, date, opponent_id)
+            night = self.nights.get(night_key)
+            if night is None:
+                night = self.nights[night_key] = _new_night(date, label, opponent_id)
+            night['points_for'] += points_for
+            night['points_against'] += points_against
+            if won is not None:
+                night['games_won' if won else 'games_lost'] += 1
+            night['forfeits'] += forfeit
+
+    def add_stat(self, stat, season):
+        """Track each team's roster from the latest season it appears in"""
+        team = stat.get('team')
+        if not team:
+            return
+        team_id = stat.get('teamId') or self.identities.team_id(team)
+        order = self.season_order.index(self._season_label(season))
+        current = self.rosters.get(team_id)
+        if current is None or order > current[0]:
+            self.rosters[team_id] = (order, [stat])
+        elif order == current[0]:
+            current[1].append(stat)
+
+    def _roster_summary(self, team_id):
+        entry = self.rosters.get(team_id)
+        if not entry:
+            return None
+        handicaps = sorted(stat.get('handicap') for stat in entry[1] if stat.get('handicap') is not None)
+        if not handicaps:
+            return None
+        return {
+            'season': self.season_order[entry[0]],
+            'players': len(entry[1]),
+            'total_handicap': sum(handicaps),
+            'average_handicap': round(sum(handicaps) / len(handicaps), 2),
+            'min_handicap': handicaps[0],
+            'max_handicap': handicaps[-1],
+            'handicaps': handicaps
+        }
+
+    def _sorted_nights(self):
+        season_index = {label: i for i, label in enumerate(self.season_order)}
+        return sorted(self.nights.items(), key=lambda item: (
+            season_index[item[0][1]], date_sort_key(item[0][2], self.season_names[item[0][1]]) or (0, 0)))
+
+    def team_summary(self):
+        """Per-team standings, weekly results and roster strength, keyed by team name"""
+        teams = {}
+        for (team_id, label, _, opponent_id), night in self._sorted_nights():
+            team = teams.get(team_id)
+            if team is None:
+                team = teams[team_id] = {'name': self.identities.team_name(team_id), 'id': team_id, 'seasons': {}}
+            season = team['seasons'].get(label)
+            if season is None:
+                season = team['seasons'][label] = {'nights': 0, 'wins': 0, 'losses': 0, 'ties': 0,
+                                                   'games_won': 0, 'games_lost': 0, 'points_for': 0,
+                                                   'points_against': 0, 'weeks': []}
+
+            if night['points_for'] > night['points_against']:
+                result = 'W'
+                season['wins'] += 1
+            elif night['points_for'] < night['points_against']:
+                result = 'L'
+                season['losses'] += 1
+            else:
+                result = 'T'
+                season['ties'] += 1
+            season['nights'] += 1
+            for field in ('games_won', 'games_lost', 'points_for', 'points_against'):
+                season[field] += night[field]
+
+            season['weeks'].append({
+                'date': night['date'],
+                'opponent': self.identities.team_name(opponent_id),
+                'points_for': night['points_for'],
+                'points_against': night['points_against'],
+                'games_won': night['games_won'],
+                'games_lost': night['games_lost'],
+                'forfeits': night['forfeits'],
+                'result': result
+            })
+
+        for team_id in self.rosters:
+            if team_id not in teams:
+                teams[team_id] = {'name': self.identities.team_name(team_id), 'id': team_id, 'seasons': {}}
+
+        summary = {}
+        for team_id, team in teams.items():
+            for season in team['seasons'].values():
+                games = season['games_won'] + season['games_lost']
+                season['game_win_percentage'] = round(season['games_won'] / games * 100, 1) if games else 0
+            team['roster'] = self._roster_summary(team_id)
+            summary[team['name']] = team
+        return summary
+
+    def team_pairs(self):
+        """Head-to-head records for every pair of teams that have met, keyed by pair_key"""
+        pairs = {}
+        for (team_id, label, date, opponent_id), night in self._sorted_nights():
+            # Each night is stored from both sides; read it from the lower id's side once
+            if team_id > opponent_id:
+                continue
+            team = self.identities.team_name(team_id)
+            opponent = self.identities.team_name(opponent_id)
+            key = pair_key(team, opponent)
+            pair = pairs.get(key)
+            if pair is None:
+                pair = pairs[key] = {'teams': sorted((team, opponent)), 'nights': 0, 'ties': 0,
+                                     'wins': {team: 0, opponent: 0}, 'games': {team: 0, opponent: 0},
+                                     'points': {team: 0, opponent: 0}, 'seasons': [], 'last_met': None}
+
+            pair['nights'] += 1
+            if night['points_for'] > night['points_against']:
+                pair['wins'][team] += 1
+            elif night['points_for'] < night['points_against']:
+                pair['wins'][opponent] += 1
+            else:
+                pair['ties'] += 1
+            pair['games'][team] += night['games_won']
+            pair['games'][opponent] += night['games_lost']
+            pair['points'][team] += night['points_for']
+            pair['points'][opponent] += night['points_against']
+            if label not in pair['seasons']:
+                pair['seasons'].append(label)
+            pair['last_met'] = {'season': label, 'date': date,
+                                'points': {team: night['points_for'], opponent: night['points_against']}}
+        return pairs
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Upcoming fixtures and next week's precomputed matchups.
+
+Runs after the combiner. From the season schedule (schedule_latest.json) it
+writes:
+
+  combined/upcoming_fixtures.json   every scheduled fixture with no result yet
+  combined/next_week_matchups.json  next week's fixtures, each with both
+                                    current rosters, the win probability of
+                                    every roster pairing and head-to-head
+                                    summaries for pairs that have met
+
+Probabilities use the app's model (matchup_probability, a port of
+src/utils/probability.js) on the current season's games, plus the skill
+model's probability when it has been fitted. Only players on next week's
+rosters are indexed, so the work scales with the fixtures actually played
+rather than with the league.
+"""
+import os
+import argparse
+
+import json_backend
+import skill_model
+from identity_registry import IdentityRegistry
+from match_keys import dedupe_matches
+from season_catalog import date_sort_key, load_catalog
+from season_simulator import current_season_label, remaining_fixtures
+from matchup_probability import MatchIndex, enrich_player_stats, calculate_win_probability, get_head_to_head_record
+from artifact_writer import ArtifactBatch
+
+UPCOMING_FILE = "upcoming_fixtures.json"
+MATCHUPS_FILE = "next_week_matchups.json"
+
+def _load(path):
+    return json_backend.load_file(path) if os.path.exists(path) else None
+
+def fixture_order(fixture, season_name=None):
+    """Sort key for fixtures: week number, then date"""
+    week = fixture.get('week')
+    return (week if isinstance(week, int) else 0, date_sort_key(fixture.get('date'), season_name) or (0, 0))
+
+def next_week(fixtures, season_name=None):
+    """The fixtures of the earliest remaining week (or date, when weeks aren't numbered)"""
+    if not fixtures:
+        return []
+    first = min(fixtures, key=lambda fixture: fixture_order(fixture, season_name))
+    if isinstance(first.get('week'), int):
+        return [fixture for fixture in fixtures if fixture.get('week') == first['week']]
+    return [fixture for fixture in fixtures if fixture['date'] == first['date']]
+
+def current_rosters(player_stats, player_summary, identities):
+    """Current standings rows, enriched like the app's, grouped by team id"""
+    rosters = {}
+    for player in enrich_player_stats(player_stats, player_summary):
+        rosters.setdefault(identities.team_id(player.get('team')), []).append(player)
+    return rosters
+
+def collect_matches(records, players):
+    """(current season games, all games) involving any of the given players, each game once"""
+    seasons = []
+    season_matches = []
+    for record_type, season, record in records:
+        if not seasons or seasons[-1] is not season:
+            seasons.append(season)
+            season_matches.append([])
+        if record_type != 'match':
+            continue
+        if record.get('homePlayer') in players or record.get('awayPlayer') in players:
+            season_matches[-1].append(record)
+
+    all_games = [match for matches in season_matches for match in dedupe_matches(matches)]
+    # As in the app (and query_server): the latest season's raw rows with forfeits removed
+    current = [match for match in season_matches[-1] if not match.get('forfeit')] if season_matches else []
+    return current, all_games
+
+def _roster_entry(player, player_summary):
+    summary = player_summary.get(player['name'], {})
+    skill = summary.get('skill')
+    return {
+        'name': player['name'],
+        'handicap': player.get('handicap'),
+        'elo_rating': player.get('eloRating'),
+        'rating_trend': player.get('ratingTrend'),
+        'skill_rating': skill['rating'] if skill else None,
+        'recent_win_percentage': summary.get('recent_win_percentage')
+    }
+
+def build_matchup(fixture, roster, opponent_roster, player_summary, model, current_index, history_index):
+    """Precomputed view of one fixture: rosters, pairwise probabilities and head-to-heads"""
+    players_by_name = {player['name']: player for player in roster + opponent_roster}
+    probabilities = [[round(calculate_win_probability(a['name'], b['name'], players_by_name, current_index), 4)
+                      for b in opponent_roster] for a in roster]
+
+    matchup = {
+        'week': fixture.get('week'),
+        'date': fixture['date'],
+        'team': fixture['team'],
+        'opponent': fixture['opponent'],
+        'roster': [_roster_entry(player, player_summary) for player in roster],
+        'opponent_roster': [_roster_entry(player, player_summary) for player in opponent_roster],
+        # probabilities[i][j]: roster[i] beats opponent_roster[j]
+        'probabilities': probabilities,
+        'skill_probabilities': None,
+        'head_to_head': []
+    }
+
+    if model:
+        skills = {player['name']: player_summary.get(player['name'], {}).get('skill')
+                  for player in roster + opponent_roster}
+        matchup['skill_probabilities'] = [
+            [round(skill_model.win_probability(model, skills[a['name']], skills[b['name']],
+                                               a.get('handicap') or 0, b.get('handicap') or 0), 4)
+             if skills[a['name']] and skills[b['name']] else None
+             for b in opponent_roster] for a in roster]
+
+    for a in roster:
+        for b in opponent_roster:
+            record = get_head_to_head_record(a['name'], b['name'], history_index)
+            if record['totalMatches']:
+                matchup['head_to_head'].append({
+                    'player': a['name'],
+                    'opponent': b['name'],
+                    'wins': record['player1Wins'],
+                    'losses': record['player2Wins'],
+                    'matches': record['totalMatches']
+                })
+    return matchup
+
+def precompute_matchups(data_dir, archives_dir=None, identities=None):
+    """Write the upcoming fixtures and next week's matchups for a league's data folder"""
+    combined_dir = os.path.join(data_dir, "combined")
+    schedule = _load(os.path.join(data_dir, "schedule_latest.json"))
+    team_summary = _load(os.path.join(combined_dir, "team_summary.json"))
+    if not schedule or team_summary is None:
+        print("No schedule or team summary available; skipping the matchup precompute.")
+        return None
+
+    # Schedule, summary and standings spellings of a team are matched by id
+    identities = identities or IdentityRegistry.for_data_dir(data_dir)
+    season_label = current_season_label(team_summary)
+    # The live season is labelled 'Current'; its own name decides the Fall date wrap
+    current = (load_catalog(archives_dir) or {}).get('current') if archives_dir else None
+    season_name = (current or {}).get('name') or (season_label.split()[0] if season_label else None)
+    upcoming = sorted(remaining_fixtures(schedule, team_summary, season_label, identities),
+                      key=lambda fixture: fixture_order(fixture, season_name))
+    fixtures = next_week(upcoming, season_name)
+
+    player_summary = _load(os.path.join(combined_dir, "player_summary.json")) or {}
+    rosters = current_rosters(_load(os.path.join(data_dir, "player_stats_latest.json")) or [], player_summary,
+                              identities)
+    fixture_rosters = [(rosters.get(identities.team_id(fixture['team']), []),
+                        rosters.get(identities.team_id(fixture['opponent']), []))
+                       for fixture in fixtures]
+
+    # Only games involving next week's players are kept
+    players = {player['name'] for pair in fixture_rosters for roster in pair for player in roster}
+    current_games, all_games = [], []
+    if players:
+        # Imported here: this stage runs after the combiner and reads through it
+        from season_combiner import SeasonDataCombiner
+        combiner = SeasonDataCombiner(data_dir=data_dir, archives_dir=archives_dir or os.path.join(data_dir, "archives"))
+        current_games, all_games = collect_matches(combiner.iter_season_records(), players)
+    current_index = MatchIndex(current_games)
+    history_index = MatchIndex(all_games)
+
+    model = skill_model.load_model(combined_dir)
+    matchups = {
+        'season': season_label,
+        'week': fixtures[0].get('week') if fixtures else None,
+        'fixtures': [build_matchup(fixture, roster, opponent_roster, player_summary, model, current_index, history_index)
+                     for fixture, (roster, opponent_roster) in zip(fixtures, fixture_rosters)]
+    }
+
+    batch = ArtifactBatch()
+    batch.stage_json(os.path.join(combined_dir, UPCOMING_FILE), {'season': season_label, 'fixtures': upcoming})
+    batch.stage_json(os.path.join(combined_dir, MATCHUPS_FILE), matchups)
+    batch.commit()
+    print(f"Upcoming fixtures: {len(upcoming)}; next week: {len(fixtures)} fixture(s), "
+          f"{len(players)} players")
+    batch.report()
+    return matchups
+
+def main():
+    parser = argparse.ArgumentParser(description="Precompute next week's matchups from the season schedule")
+    parser.add_argument('--data-dir', default="public/data")
+    parser.add_argument('--archives-dir', help="Default: <data-dir>/archives")
+    args = parser.parse_args()
+    precompute_matchups(args.data_dir, args.archives_dir)
+
+if __name__ == "__main__":
+    main()
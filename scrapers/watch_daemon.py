@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Long-running watch mode for the pipeline.
+
+Instead of a cron job that crawls everything on every run, the daemon keeps
+each league's team list and parsed team pages in memory and polls only the
+individual standings page. When its "Updated on" stamp moves, it re-crawls
+just the teams whose standings rows changed (a team that played has new
+win/loss totals, and so does its opponent), reuses every other team's
+matches from memory, then writes the outputs and recombines the league.
+An idle poll costs one request.
+
+Each league also keeps one identity registry and one warm SeasonDataCombiner
+for the season: archived seasons are decoded once, and only the re-crawled
+teams' records are fed into the live season, so a recombine reads nothing
+but the small catalog from disk.
+"""
+import argparse
+import time
+from datetime import datetime
+
+import scraper
+import player_stats_scraper
+from run_pipeline import combine_league
+from season_combiner import SeasonDataCombiner
+from crawl_scheduler import CrawlScheduler
+from identity_registry import IdentityRegistry, canonicalize
+from league_config import load_config, select_leagues, build_headers, archives_dir
+
+DEFAULT_INTERVAL = 300
+
+def team_signatures(players):
+    """Per-team fingerprint of the standings rows, keyed by canonical team name"""
+    signatures = {}
+    for player in players:
+        row = (player.name, player.handicap, player.wins, player.losses, player.total)
+        signatures.setdefault(canonicalize(player.team), []).append(row)
+    return {team: tuple(sorted(rows)) for team, rows in signatures.items()}
+
+class LeagueWatcher:
+    """Warm crawl state for one league"""
+
+    def __init__(self, league, scheduler):
+        self.league = league
+        self.scheduler = scheduler
+        self.headers = build_headers(league, scraper.AUTH_COOKIE)
+        self.season_key = None
+        self.last_updated = None
+        self.teams = []
+        self.team_matches = {}
+        self.team_schedules = {}
+        self.signatures = {}
+        self.combiner = None
+        # Team pages crawled since they were last fed to the combiner
+        self.unfed_pages = set()
+
+    def _reset(self, season_key):
+        self.season_key = season_key
+        self.last_updated = None
+        self.teams = []
+        self.team_matches = {}
+        self.team_schedules = {}
+        self.signatures = {}
+        self.unfed_pages = set()
+        identities = IdentityRegistry.for_data_dir(self.league['output_dir'])
+        self.combiner = SeasonDataCombiner(data_dir=self.league['output_dir'], archives_dir=archives_dir(self.league),
+                                           identities=identities, warm=True)
+
+    def _refresh_teams(self):
+        teams = scraper.fetch_teams_directly(self.league, self.scheduler, self.headers)
+        self.teams = teams or self.teams or self.league['fallback_teams']
+
+    def poll(self, current_season):
+        """Check the standings stamp and refresh the league if it moved; returns True if refreshed"""
+        league_id = self.league['id']
+        season_key = f"{current_season['name'].lower()}_{current_season['year']}"
+        if season_key != self.season_key:
+            # Team links carry the season id, so nothing carries over
+            self._reset(season_key)
+
+        html_content = player_stats_scraper.fetch_individual_standings(self.league, self.scheduler)
+        season_info, players = player_stats_scraper.parse_standings(html_content)
+        updated = season_info.get('updated')
+
+        if updated and updated == self.last_updated:
+            return False
+        if not players:
+            print(f"[{league_id}] No player data found on the standings page; will retry next poll.")
+            return False
+
+        print(f"[{league_id}] Standings updated: {updated or 'Unknown'}")
+        signatures = team_signatures(players)
+        changed = {team for team, signature in signatures.items() if self.signatures.get(team) != signature}
+
+        # A team we don't have a page for means the team list itself changed
+        known = {canonicalize(team['name']) for team in self.teams}
+        if not self.teams or not set(signatures) <= known:
+            self._refresh_teams()
+
+        to_crawl = [team for team in self.teams
+                    if team['url'] not in self.team_matches or canonicalize(team['name']) in changed]
+        print(f"[{league_id}] Crawling {len(to_crawl)} of {len(self.teams)} team pages")
+
+        futures = [(team, self.scheduler.submit(scraper.scrape_team_data, team, self.scheduler, self.headers))
+                   for team in to_crawl]
+        failed = set()
+        for team, future in futures:
+            try:
+                self.team_matches[team['url']], self.team_schedules[team['url']] = future.result()
+                self.unfed_pages.add(team['url'])
+            except Exception as e:
+                print(f"Error processing {team['name']}: {str(e)}")
+                failed.add(canonicalize(team['name']))
+
+        # A team never fetched would show up in the changefeed as all its matches removed
+        missing = [team for team in self.teams if team['url'] not in self.team_matches]
+        if missing:
+            print(f"[{league_id}] No page yet for {len(missing)} team(s); outputs left unchanged")
+        else:
+            all_matches = [match for team in self.teams for match in self.team_matches[team['url']]]
+            schedule = scraper.dedupe_fixtures([fixture for team in self.teams
+                                                for fixture in self.team_schedules[team['url']]])
+            identities = self.combiner.identities
+            scraper.save_league_matches(self.league, self.teams, all_matches, current_season, schedule, identities)
+            player_stats_scraper.save_league_stats(self.league, players, current_season, identities)
+            # The records now carry their stamped ids; the other pages are already in the combiner
+            for url in self.unfed_pages:
+                self.combiner.feed_live_page(url, [match.to_dict() for match in self.team_matches[url]])
+            self.unfed_pages = set()
+            self.combiner.set_live_season([team['url'] for team in self.teams],
+                                          [player.to_dict() for player in players])
+            combine_league(self.league, combiner=self.combiner)
+
+        # Failed teams keep no signature so the next poll crawls them again
+        self.signatures = {team: signature for team, signature in signatures.items() if team not in failed}
+        if not failed:
+            self.last_updated = updated
+        return True
+
+def main():
+    parser = argparse.ArgumentParser(description="Poll the standings page and refresh the data whenever it changes")
+    parser.add_argument('--leagues', help="Path to the league config (default: scrapers/leagues.json)")
+    parser.add_argument('--league', action='append', help="Only watch this league id (repeatable)")
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL, help="Seconds between polls (default: 300)")
+    parser.add_argument('--once', action='store_true', help="Poll once and exit")
+    args = parser.parse_args()
+
+    if not scraper.AUTH_COOKIE:
+        print("ERROR: Authentication cookie is missing. Please set the AUTH_COOKIE environment variable.")
+        return
+
+    config = load_config(args.leagues)
+    leagues = select_leagues(config, args.league)
+
+    with CrawlScheduler.from_config(config) as scheduler:
+        watchers = [LeagueWatcher(league, scheduler) for league in leagues]
+        print(f"Watching {', '.join(league['id'] for league in leagues)} every {args.interval:g}s")
+        try:
+            while True:
+                current_season = scraper.determine_current_season()
+                for watcher in watchers:
+                    try:
+                        if not watcher.poll(current_season):
+                            print(f"[{datetime.now().strftime('%H:%M:%S')}] {watcher.league['id']}: no change")
+                    except Exception as e:
+                        print(f"Error polling league {watcher.league['id']}: {str(e)}")
+                if args.once:
+                    break
+                time.sleep(args.interval)
+        except KeyboardInterrupt:
+            print("Stopping watch.")
+
+if __name__ == "__main__":
+    main()